@@ -0,0 +1,96 @@
+"""Benchmarks the ticks of the merchants' economy. An economy with random stock and prices is built for the given
+number of merchants and items, then players buy random items between the ticks and every tick is timed. The results are
+written as JSON like those of 'benchmarks.run'.
+Run as 'py -m benchmarks.economy --merchants 5000 --items 2000 --out economy_results.json'. Needs NumPy."""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+
+import numpy as np
+
+from src import economy
+from .run import get_latency_figures
+
+log = logging.getLogger(__name__)
+
+
+def create_economy(merchants: int, items: int, share: float, seed=0) -> economy.Economy:
+    """Returns an economy in which every merchant deals in about the given share of the items, with 1 to 20 pieces of
+    each. Merchants and items are only numbers, the economy never looks at them."""
+    rng = np.random.default_rng(seed)
+    rows, columns = np.nonzero(rng.random((merchants, items)) < share)
+    amounts = rng.integers(1, 21, size=len(rows))
+    base_prices = rng.integers(1, 200, size=items)
+    return economy.Economy(list(range(merchants)), list(range(items)), rows, columns, amounts, base_prices)
+
+
+def measure_ticks(trade: economy.Economy, ticks: int, sales: int, seed=0) -> list:
+    """Sells 'sales' random items before every tick, then runs it. Returns the latency of every tick in
+    microseconds."""
+    rng = np.random.default_rng(seed)
+    merchants = len(trade.merchant_index)
+    items = len(trade.items)
+    latencies = []
+    for i in range(ticks):
+        for merchant, item in zip(rng.integers(0, merchants, sales).tolist(), rng.integers(0, items, sales).tolist()):
+            if trade.get_stock(merchant, item) > 0:
+                trade.sell(merchant, item, 1)
+        start = time.perf_counter()
+        trade.tick()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def run_benchmark(merchants: int, items: int, share=0.1, ticks=50, sales=1000, seed=0) -> dict:
+    """Builds the economy and times its ticks. Returns the results."""
+    start = time.perf_counter()
+    trade = create_economy(merchants, items, share, seed)
+    create_seconds = time.perf_counter() - start
+    array_bytes = sum(array.nbytes for array in (trade.row_starts, trade.columns, trade.stock, trade.target_stock,
+                                                 trade.base_prices, trade.prices, trade._work))
+    # the first tick touches the memory of the work array for the first time, it is left out
+    trade.tick()
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'merchants': merchants,
+        'items': items,
+        'share': share,
+        'entries': len(trade.stock),
+        'sales_per_tick': sales,
+        'create_seconds': create_seconds,
+        'array_bytes': array_bytes,
+        'tick': get_latency_figures(measure_ticks(trade, ticks, sales, seed))
+    }
+
+
+def format_result(result: dict) -> str:
+    """Returns a readable summary of the benchmark results."""
+    figures = result['tick']
+    return (f'{result["merchants"]} merchants x {result["items"]} items, {result["entries"]} traded, arrays '
+            f'{result["array_bytes"] / 2 ** 20:.1f} MiB, created in {result["create_seconds"]:.3f} s\n'
+            f'  tick  mean {figures["mean_us"] / 1000:8.2f} ms   p50 {figures["p50_us"] / 1000:8.2f} ms   '
+            f'p95 {figures["p95_us"] / 1000:8.2f} ms   max {figures["max_us"] / 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    parser = argparse.ArgumentParser(description='Benchmark the ticks of the merchants\' economy.')
+    parser.add_argument('--merchants', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--share', type=float, default=0.1, help='share of the items every merchant deals in')
+    parser.add_argument('--ticks', type=int, default=50, help='how many ticks are timed')
+    parser.add_argument('--sales', type=int, default=1000, help='items sold to players before every tick')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='economy_results.json', help='JSON file to write the results to')
+    args = parser.parse_args()
+    benchmark_result = run_benchmark(args.merchants, args.items, args.share, args.ticks, args.sales, args.seed)
+    log.info(format_result(benchmark_result))
+    with open(args.out, 'w') as f:
+        json.dump(benchmark_result, f, indent=2)
+    log.info(f'Results written to {args.out}')
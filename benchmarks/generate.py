@@ -0,0 +1,144 @@
+"""Generates worlds in the format of 'src/init.json' for benchmarks. The rooms are laid out in a grid, neighbouring
+rooms are connected by doors. Every room has a container and a few item stacks, every few rooms there's a merchant.
+Some doors and containers are locked, their keys lie in other containers. A world has about 6 objects per room, so
+170000 rooms make about a million objects. The same seed always gives the same world.
+Run as 'py -m benchmarks.generate <rooms> <output file>', with '--region-size' the output is a directory with the world
+split into regions, see 'src.regions'."""
+import argparse
+import json
+import logging
+import math
+import random
+
+from src import regions
+
+log = logging.getLogger(__name__)
+
+
+def generate_world(rooms: int, seed=0, locked_share=0.3, merchant_every=10, stacks_per_room=2) -> dict:
+    """Returns the JSON content of a world with the given number of rooms. 'locked_share' is the part of doors and
+    containers that is locked. The doors and the container of the first room, where the player starts, are never
+    locked, that room always has a merchant and its chest and merchant never run out of coins and apples, so
+    benchmarks can rely on them."""
+    rng = random.Random(seed)
+    width = math.ceil(math.sqrt(rooms))
+    world = {
+        'Item': {
+            'money': {'description': 'You can buy stuff with this.', 'name': 'Money', 'price': '1'},
+            'apple': {'description': 'An Apple.', 'name': 'Apple', 'price': '15'}
+        },
+        'Key': {},
+        'Door': {},
+        'Barrier': {
+            'wall': {'description': 'A solid wall.'}
+        },
+        'Location': {},
+        'Character': {},
+        'Player': {},
+        'Container': {}
+    }
+    # keys of locked doors and containers, they are put into containers once all exist
+    keys_to_hide = []
+
+    def add_lock(internal_name: str, name: str, can_lock: bool) -> str:
+        """Returns the internal name of the key for a new door or container, or '' if it is not locked."""
+        if not can_lock or rng.random() >= locked_share:
+            return ''
+        key = f'key_{internal_name}'
+        world['Key'][key] = {'description': f'Key that opens the \'{name}\'', 'name': f'Key of {name}', 'price': '1'}
+        keys_to_hide.append(key)
+        return key
+
+    def add_door(internal_name: str, name: str, first_room: int) -> str:
+        """Adds a door between a room and its neighbour and returns its internal name."""
+        world['Door'][internal_name] = {
+            'key': add_lock(internal_name, name, first_room != 0),
+            'name': name,
+            'description': f'A \'{name}\'.'
+        }
+        return internal_name
+
+    for i in range(rooms):
+        world['Item'][f'item_{i}'] = {
+            'description': f'Thing number {i}.',
+            'name': f'Thing {i}',
+            'price': str(rng.randint(1, 50))
+        }
+
+    for i in range(rooms):
+        x, y = i % width, i // width
+        # a door is named after the room west or north of it
+        north_wall = f'door_{i - width}_south' if y > 0 else 'wall'
+        south_wall = add_door(f'door_{i}_south', f'Door {i} South', i) if i + width < rooms else 'wall'
+        west_wall = f'door_{i - 1}_east' if x > 0 else 'wall'
+        east_wall = add_door(f'door_{i}_east', f'Door {i} East', i) if x < width - 1 and i + 1 < rooms else 'wall'
+        inventory = [f'item_{rng.randrange(rooms)}({rng.randint(1, 5)})' for _ in range(stacks_per_room)]
+        world['Location'][f'room_{i}'] = {
+            'north_wall': north_wall,
+            'south_wall': south_wall,
+            'west_wall': west_wall,
+            'east_wall': east_wall,
+            'description': f'You are in room number {i}.',
+            'inv_description': 'On the floor you find',
+            'name': f'Room {i}',
+            'inventory': inventory
+        }
+        world['Container'][f'chest_{i}'] = {
+            'key': add_lock(f'chest_{i}', f'Chest {i}', i != 0),
+            'description': f'A \'Chest {i}\'.',
+            'name': f'Chest {i}',
+            'inventory': [f'money({10 ** 6 if i == 0 else rng.randint(100, 1000)})',
+                          f'item_{rng.randrange(rooms)}({rng.randint(1, 5)})'],
+            'location': f'room_{i}'
+        }
+        if i % merchant_every == 0:
+            world['Character'][f'merchant_{i}'] = {
+                'description': f'Merchant number {i}.',
+                'name': f'Merchant {i}',
+                'text': 'Have a look at my wares!',
+                'inventory': [f'apple({10 ** 6 if i == 0 else 1000})',
+                              f'item_{rng.randrange(rooms)}({rng.randint(1, 5)})'],
+                'location': f'room_{i}'
+            }
+
+    for key in keys_to_hide:
+        world['Container'][f'chest_{rng.randrange(rooms)}']['inventory'].append(key)
+
+    world['Player']['player'] = {
+        'description': 'This is the player',
+        'name': 'Benchmark',
+        'inventory': [],
+        'location': 'room_0',
+        'money': str(10 ** 9)
+    }
+    return world
+
+
+def count_objects(world: dict) -> int:
+    """Returns the number of objects defined in a world's JSON content."""
+    return sum(len(objects) for objects in world.values())
+
+
+def write_world(world: dict, world_file):
+    """Writes a world's JSON content to a file."""
+    with open(world_file, 'w') as f:
+        json.dump(world, f)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description='Generate a world for benchmarks.')
+    parser.add_argument('rooms', type=int, help='number of rooms, a world has about 6 objects per room')
+    parser.add_argument('world_file', help='JSON file to write the world to, or the directory with --region-size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--locked-share', type=float, default=0.3, help='part of doors and containers that is locked')
+    parser.add_argument('--merchant-every', type=int, default=10, help='put a merchant in every Nth room')
+    parser.add_argument('--stacks-per-room', type=int, default=2, help='item stacks lying in every room')
+    parser.add_argument('--region-size', type=int, help='split the world into regions of this many rooms')
+    args = parser.parse_args()
+    generated = generate_world(args.rooms, args.seed, args.locked_share, args.merchant_every, args.stacks_per_room)
+    if args.region_size is not None:
+        regions.write_split_world(generated, args.world_file, args.region_size)
+    else:
+        write_world(generated, args.world_file)
+    log.info(f'{count_objects(generated)} objects written to {args.world_file}')
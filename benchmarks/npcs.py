@@ -0,0 +1,133 @@
+"""Benchmarks the ticks of the NPC movement simulation. A generated world gets a crowd of characters that wander, patrol
+between nearby rooms or follow a schedule, then every tick is timed, split into deciding the moves in the arrays and
+setting the moved characters to their new locations. The results are written as JSON like those of 'benchmarks.run'.
+Run as 'py -m benchmarks.npcs --rooms 20000 --npcs 150000 --out npc_results.json'. Needs NumPy."""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from src import config
+from src import npcs
+from src import output
+from . import generate
+from .run import get_latency_figures
+
+log = logging.getLogger(__name__)
+
+
+def add_npcs(world: dict, rooms: int, count: int, seed=0, patrol_share=0.15, schedule_share=0.05):
+    """Adds characters with a movement to a generated world's JSON content. Patrols and schedules have three stops
+    within a few rooms of where the character starts, everybody else wanders and moves whenever a door is open."""
+    rng = random.Random(seed)
+    width = math.ceil(math.sqrt(rooms))
+
+    def get_nearby_room(room: int) -> str:
+        """Returns the internal name of a random room at most 3 rooms away in both directions."""
+        x = min(max(room % width + rng.randint(-3, 3), 0), width - 1)
+        y = min(max(room // width + rng.randint(-3, 3), 0), (rooms - 1) // width)
+        return f'room_{min(y * width + x, rooms - 1)}'
+
+    for i in range(count):
+        room = rng.randrange(rooms)
+        kind = rng.random()
+        if kind < patrol_share:
+            movement = {'mode': 'patrol', 'route': [get_nearby_room(room) for _ in range(3)]}
+        elif kind < patrol_share + schedule_share:
+            ticks = sorted(rng.sample(range(npcs.DAY_TICKS), 3))
+            movement = {'mode': 'schedule', 'schedule': [[tick, get_nearby_room(room)] for tick in ticks]}
+        else:
+            movement = {'mode': 'wander', 'chance': 1.0}
+        world['Character'][f'npc_{i}'] = {
+            'description': f'Character number {i}.',
+            'name': f'Character {i}',
+            'text': 'Just passing through.',
+            'inventory': [],
+            'location': f'room_{room}',
+            'movement': movement
+        }
+
+
+def run_benchmark(rooms: int, count: int, ticks=20, seed=0) -> dict:
+    """Generates the world with the characters, starts the simulation and times its ticks. Returns the results."""
+    world_json = generate.generate_world(rooms, seed)
+    add_npcs(world_json, rooms, count, seed)
+    previous_sink = output.get_sink()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, 'w') as devnull:
+            # the game's messages are not needed
+            output.set_sink(output.StdoutSink(devnull))
+            world_file = os.path.join(temp_dir, 'world.json')
+            generate.write_world(world_json, world_file)
+            del world_json
+            with config.initialize('Benchmark', world_file) as world:
+                start = time.perf_counter()
+                simulation = npcs.start_simulation(world, seed=seed)
+                start_seconds = time.perf_counter() - start
+                moves = []
+                advance_latencies = []
+                apply_latencies = []
+                for i in range(ticks):
+                    start = time.perf_counter()
+                    moved, targets, doors = simulation.advance()
+                    advanced = time.perf_counter()
+                    simulation.apply_moves(moved, targets, doors)
+                    advance_latencies.append((advanced - start) * 1e6)
+                    apply_latencies.append((time.perf_counter() - advanced) * 1e6)
+                    moves.append(len(moved))
+                # the arrays and the characters' locations must still agree
+                for npc, position in zip(simulation.npcs, simulation.positions.tolist()):
+                    assert npc.location is simulation.locations[position]
+                output.flush()
+    finally:
+        output.set_sink(previous_sink)
+    tick_seconds = (sum(advance_latencies) + sum(apply_latencies)) / 1e6
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rooms': rooms,
+        'npcs': count,
+        'seed': seed,
+        'start_seconds': start_seconds,
+        'moves_per_tick': sum(moves) / len(moves),
+        'moves_per_second': sum(moves) / tick_seconds,
+        'advance': get_latency_figures(advance_latencies),
+        'apply': get_latency_figures(apply_latencies)
+    }
+
+
+def format_result(result: dict) -> str:
+    """Returns a readable summary of the benchmark results."""
+    lines = [f'{result["rooms"]} rooms, {result["npcs"]} characters: simulation started in '
+             f'{result["start_seconds"]:.3f} s, {result["moves_per_tick"]:.0f} moves per tick, '
+             f'{result["moves_per_second"]:.0f} moves/s']
+    for name in ('advance', 'apply'):
+        figures = result[name]
+        lines.append(f'  {name:<8} mean {figures["mean_us"] / 1000:8.2f} ms   p95 {figures["p95_us"] / 1000:8.2f} ms   '
+                     f'max {figures["max_us"] / 1000:8.2f} ms')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    # only the benchmark's own messages are wanted, not the game's
+    logging.getLogger('src').setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description='Benchmark the ticks of the NPC movement simulation.')
+    parser.add_argument('--rooms', type=int, default=20000)
+    parser.add_argument('--npcs', type=int, default=150000, help='characters with a movement')
+    parser.add_argument('--ticks', type=int, default=20, help='how many ticks are timed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='npc_results.json', help='JSON file to write the results to')
+    args = parser.parse_args()
+    benchmark_result = run_benchmark(args.rooms, args.npcs, args.ticks, args.seed)
+    log.info(format_result(benchmark_result))
+    with open(args.out, 'w') as f:
+        json.dump(benchmark_result, f, indent=2)
+    log.info(f'Results written to {args.out}')
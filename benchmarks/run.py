@@ -0,0 +1,144 @@
+"""Benchmarks the game on generated worlds of different sizes. For every size it measures how long 'config.initialize'
+takes, how much memory it needs at most and how long single commands take. The results are written as JSON, so runs
+before and after a change can be compared.
+Run as 'py -m benchmarks.run --rooms 100 1000 10000 --out results.json'."""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.commands import Command
+from src import config
+from src import output
+from . import generate
+
+log = logging.getLogger(__name__)
+
+# Commands measured in every world, by the name they are reported under. All of them work in the first room of a
+# generated world, where the player starts. 'go' alternates between the first room and its eastern neighbour.
+COMMANDS = {
+    'go': ('go east', 'go west'),
+    'look at': ('look at chest 0',),
+    'take ... from': ('take gold coin from chest 0',),
+    'buy': ('buy apple',),
+    'show inventory': ('show inventory',)
+}
+
+
+def measure_initialize(world_file) -> float:
+    """Returns the seconds 'config.initialize' takes to load the world."""
+    start = time.perf_counter()
+    world = config.initialize('Benchmark', world_file)
+    seconds = time.perf_counter() - start
+    world.close()
+    return seconds
+
+
+def measure_peak_memory(world_file) -> int:
+    """Returns the most memory in bytes that was allocated at once while 'config.initialize' loaded the world."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        world = config.initialize('Benchmark', world_file)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    world.close()
+    return peak
+
+
+def measure_commands(world_file, repeat: int) -> dict:
+    """Runs every command 'repeat' times and returns the latency figures in microseconds by command name."""
+    results = {}
+    with config.initialize('Benchmark', world_file) as world:
+        for name, lines in COMMANDS.items():
+            latencies = []
+            for i in range(repeat):
+                command = Command(lines[i % len(lines)], world)
+                start = time.perf_counter()
+                command.analyze()
+                latencies.append((time.perf_counter() - start) * 1e6)
+            results[name] = get_latency_figures(latencies)
+    return results
+
+
+def get_latency_figures(latencies: list) -> dict:
+    """Returns count, mean, median, 95th percentile and maximum of a list of latencies."""
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'mean_us': statistics.fmean(latencies),
+        'p50_us': latencies[len(latencies) // 2],
+        'p95_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'max_us': latencies[-1]
+    }
+
+
+def run_benchmarks(room_counts, seed=0, repeat=200, measure_memory=True) -> dict:
+    """Generates a world for every room count and benchmarks it. Returns the results of all sizes."""
+    results = []
+    previous_sink = output.get_sink()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, 'w') as devnull:
+            # the game's messages are not needed
+            output.set_sink(output.StdoutSink(devnull))
+            for rooms in room_counts:
+                world_file = os.path.join(temp_dir, f'world_{rooms}.json')
+                world_json = generate.generate_world(rooms, seed)
+                generate.write_world(world_json, world_file)
+                result = {
+                    'rooms': rooms,
+                    'objects': generate.count_objects(world_json),
+                    'initialize_seconds': measure_initialize(world_file),
+                    'peak_memory_bytes': measure_peak_memory(world_file) if measure_memory else None,
+                    'commands': measure_commands(world_file, repeat)
+                }
+                del world_json
+                log.info(format_result(result))
+                results.append(result)
+    finally:
+        output.set_sink(previous_sink)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+def format_result(result: dict) -> str:
+    """Returns a readable summary of the benchmark results of one world size."""
+    lines = [f'{result["rooms"]} rooms, {result["objects"]} objects: initialize {result["initialize_seconds"]:.3f} s']
+    if result['peak_memory_bytes'] is not None:
+        lines[0] += f', peak memory {result["peak_memory_bytes"] / 2 ** 20:.1f} MiB'
+    for name, figures in result['commands'].items():
+        lines.append(f'  {name:<15} mean {figures["mean_us"]:9.1f} us   p95 {figures["p95_us"]:9.1f} us   '
+                     f'max {figures["max_us"]:9.1f} us')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    # only the benchmark's own messages are wanted, not the game's
+    logging.getLogger('src').setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description='Benchmark the game on generated worlds.')
+    parser.add_argument('--rooms', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='room counts of the worlds to benchmark, a world has about 6 objects per room')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=200, help='how often every command is run')
+    parser.add_argument('--no-memory', action='store_true', help='skip measuring the peak memory, which is slow')
+    parser.add_argument('--out', default='benchmark_results.json', help='JSON file to write the results to')
+    args = parser.parse_args()
+    benchmark_results = run_benchmarks(args.rooms, args.seed, args.repeat, not args.no_memory)
+    with open(args.out, 'w') as f:
+        json.dump(benchmark_results, f, indent=2)
+    log.info(f'Results written to {args.out}')
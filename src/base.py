@@ -1,12 +1,17 @@
 import logging
+from .texts import get_text
 
 log = logging.getLogger(__name__)
 
 
 class Base:
+    # Attributes are stored in slots instead of a dict per object, which saves a lot of memory in big worlds
+    __slots__ = ('world', '_description', '_name', '_internal_name', '_aliases')
 
-    def __init__(self, description=None, name=None, internal_name=None):
-        """Constructor for Base"""
+    def __init__(self, description=None, name=None, internal_name=None, world=None):
+        """Constructor for Base. Takes the World the object belongs to, if any."""
+        self.world = world
+        self._aliases = ()
         self.description = description
         self.name = name
         self.internal_name = internal_name
@@ -15,7 +20,7 @@ class Base:
     @property
     def description(self) -> str:
         """Returns the description variable of stuff"""
-        return self._description
+        return get_text(self, self._description)
 
     @description.setter
     def description(self, new_description):
@@ -30,10 +35,24 @@ class Base:
     @name.setter
     def name(self, new_name):
         """Allows setting new name for stuff"""
+        old_keys = self._get_name_keys()
         if new_name is None:
             self._name = 'unnamed object'
         else:
             self._name = str(new_name)
+        self._update_name_index(old_keys)
+
+    @property
+    def aliases(self) -> tuple:
+        """Returns the alternative names the object can be referred to by"""
+        return self._aliases
+
+    @aliases.setter
+    def aliases(self, new_aliases):
+        """Sets new alternative names for stuff"""
+        old_keys = self._get_name_keys()
+        self._aliases = tuple(str(alias) for alias in new_aliases or ())
+        self._update_name_index(old_keys)
 
     @property
     def internal_name(self) -> str:
@@ -49,6 +68,24 @@ class Base:
         else:
             self._internal_name = str(new_name)
 
+    def _get_name_keys(self) -> set:
+        """Returns the case-folded name and aliases the object is currently indexed under."""
+        if not hasattr(self, '_name'):
+            return set()
+        return {self._name.casefold()} | {alias.casefold() for alias in self._aliases}
+
+    def _update_name_index(self, old_keys: set):
+        """Moves the object from the world's name index entries of its old name and aliases to the entries of the
+        current ones."""
+        if self.world is not None:
+            self.world.update_name_index(self, old_keys, self._get_name_keys())
+
+    def _get_overlay(self):
+        """Returns the overlay of the session currently playing in the object's world, or None."""
+        if self.world is None:
+            return None
+        return self.world.overlay
+
     def __repr__(self):
         """Returns the object's String."""
         return f'Name: {self.name}, Internal Name: {self.internal_name}'
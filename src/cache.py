@@ -0,0 +1,52 @@
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class RenderCache:
+
+    def __init__(self, max_size=4096):
+        """Constructor for RenderCache. Keeps the texts rendered for the player, e.g. a location's description, so
+        commands that are repeated without anything changing don't have to build them again. The keys contain the
+        version counters of the objects a text was built from, a changed object therefore never hits an old text. Only
+        the 'max_size' most recently used texts are kept."""
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # increased whenever an item's name or price changes, texts listing items have it in their keys
+        self.item_version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the text stored for the key or None if there is none."""
+        text = self.entries.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key, text: str):
+        """Stores the text for the key and drops the least recently used text if the cache is full."""
+        self.entries[key] = text
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def item_changed(self):
+        """Makes all texts listing items outdated, after the name or price of an item changed."""
+        self.item_version += 1
+
+    def clear(self):
+        """Removes all texts, the counters are kept."""
+        self.entries.clear()
+
+    def get_stats(self) -> dict:
+        """Returns the number of stored texts, hits and misses."""
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
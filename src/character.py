@@ -1,19 +1,23 @@
 from . import config
 from . import inventory
+from . import output
 from .components import Component, Item
 from .locations import Door
+from .texts import get_text
 import logging
 
 log = logging.getLogger(__name__)
 
 
 class Character(Component):
+    __slots__ = ('_inventory', '_text', '_movement')
 
-    def __init__(self, description=None, name=None, internal_name=None, location=None, text=None):
+    def __init__(self, description=None, name=None, internal_name=None, location=None, text=None, world=None):
         """Constructor for NPC"""
-        super().__init__(description, name, internal_name, location)
-        self.inventory = inventory.Inventory()
+        super().__init__(description, name, internal_name, location, world)
+        self.inventory = inventory.Inventory(world)
         self.text = text
+        self.movement = None
 
     @property
     def inventory(self):
@@ -28,13 +32,24 @@ class Character(Component):
     @property
     def text(self):
         """Returns 'Voice Line' of the character"""
-        return self._text
+        return get_text(self, self._text)
 
     @text.setter
     def text(self, new_text):
         """Sets new 'Voice Line' of the character"""
         self._text = new_text
 
+    @property
+    def movement(self):
+        """Returns how the character moves around while the world is simulated as the dict from the world's JSON, or
+        None if it stays where it is. See 'npcs.Simulation'."""
+        return self._movement
+
+    @movement.setter
+    def movement(self, new_movement):
+        """Sets how the character moves around"""
+        self._movement = new_movement
+
     def show_inventory(self, needs_price=False):
         """This method simply returns the result of the Inventory object's method of the same name."""
         self._inventory.show_inventory(needs_price, self)
@@ -56,22 +71,51 @@ class Character(Component):
         parameter. Returns True or False."""
         return self.inventory.is_item_in_inventory(item)
 
+    def get_item_amount(self, item) -> int:
+        """This method simply forwards to the Inventory object's method of the same name. Takes Item object as
+        parameter."""
+        return self.inventory.get_item_amount(item)
+
 
 class Player(Character):
+    __slots__ = ('_money',)
 
-    def __init__(self, description=None, name=None, internal_name=None, location=None, money: int = 0):
-        super().__init__(description, name, internal_name, location)
+    def __init__(self, description=None, name=None, internal_name=None, location=None, money: int = 0, world=None):
+        super().__init__(description, name, internal_name, location, world=world)
         self.money = money
 
+    @property
+    def name(self) -> str:
+        """Returns the player's name. Every session sharing a world can give the player its own name."""
+        overlay = self._get_overlay()
+        if overlay is not None and overlay.player_name is not None:
+            return overlay.player_name
+        return self._name
+
+    @name.setter
+    def name(self, new_name):
+        """Allows setting new name for the player"""
+        Character.name.fset(self, new_name)
+
     @property
     def money(self):
-        """Returns player's money-amount"""
+        """Returns player's money-amount, as the current session's overlay sees it"""
+        overlay = self._get_overlay()
+        if overlay is not None and self in overlay.money:
+            return overlay.money[self]
         return self._money
 
     @money.setter
     def money(self, money):
-        """Sets new money amount"""
-        self._money = int(money)
+        """Sets new money amount, only for the current session if there is an overlay"""
+        overlay = self._get_overlay()
+        if overlay is not None:
+            overlay.money[self] = int(money)
+        else:
+            self._money = int(money)
+        journal = self.world.get_journal() if self.world is not None else None
+        if journal is not None:
+            journal.record_money(self, int(money))
     
     def has_enough_money(self, cost) -> bool:
         """Checks if the player has enough money to make a purchase"""
@@ -92,7 +136,7 @@ class Player(Character):
         elif direction == 'east':
             wall_in_direction = self.location.east_wall
         else:
-            log.warning('This is not a valid direction!')
+            output.write('This is not a valid direction!')
             wall_in_direction = None
 
         # checks if the Barrier you want to go through is a Door
@@ -103,17 +147,17 @@ class Player(Character):
                 log.debug(f'Current Location: {self.location.internal_name}; Going through Door')
                 self.location = self.location.get_adjacent_location(wall_in_direction)
                 log.debug(f'New Location: {self.location.internal_name}')
-                log.warning(f'You go through {wall_in_direction.name}')
+                output.write(f'You go through {wall_in_direction.name}')
             else:
-                log.warning(f"'{wall_in_direction.name}' is locked.")
+                output.write(f"'{wall_in_direction.name}' is locked.")
         elif wall_in_direction is None:
             pass
         else:
-            log.warning('You cannot go there!')
+            output.write('You cannot go there!')
 
     def show_inventory(self, needs_price=False):
         """Prints the current amount of money the player has, then calls super class's method."""
-        print(f'Current money: {self.money} {config.CURRENCY}s')
+        output.write(f'Current money: {self.money} {config.CURRENCY}s')
         super(Player, self).show_inventory(needs_price)
 
     def add_item(self, item_obj: Item, amount=1):
@@ -124,3 +168,16 @@ class Player(Character):
             self.money += amount
         else:
             super(Player, self).add_item(item_obj, amount)
+
+    def remove_item(self, item_obj: Item, amount=1):
+        """Same as 'add_item', but removes. Money is taken from the player's money."""
+        if item_obj.internal_name == 'money':
+            self.money -= amount
+        else:
+            super(Player, self).remove_item(item_obj, amount)
+
+    def get_item_amount(self, item) -> int:
+        """Returns how many of the item the player has. For money that's the player's money."""
+        if getattr(item, 'internal_name', None) == 'money':
+            return self.money
+        return super(Player, self).get_item_amount(item)
@@ -1,20 +1,89 @@
+import functools
 import logging
 import re
+import time
 
+from . import character
 from . import components
 from . import config
+from . import fuzzy
 from . import inventory
 from . import locations
-import time
+from . import output
 
 log = logging.getLogger(__name__)
 
 
+# Everything but lower case letters, numbers and spaces is stripped from what the player typed
+_STRIP_PATTERN = re.compile('[^a-z0-9 ]+')
+
+
+class Rule:
+    __slots__ = ('verb', 'particle', 'handler', 'min_words', 'followed_by')
+
+    def __init__(self, verb: str, particle, handler, min_words=2, followed_by=None):
+        """Constructor for Rule, one entry of the grammar. Takes the verb, the word that has to follow it (or None if
+        any word may follow), the function handling the command and the least number of words the command needs. The
+        handler is called with the Command and the player. If 'followed_by' is a tuple of words, the rule is only used
+        when the command ends after the particle or continues with one of them."""
+        self.verb = verb
+        self.particle = particle
+        self.handler = handler
+        self.min_words = min_words
+        self.followed_by = followed_by
+
+    def matches(self, words: tuple) -> bool:
+        """Returns whether the rule handles the command with the given words, which start with its verb and
+        particle."""
+        return self.followed_by is None or len(words) < 3 or words[2] in self.followed_by
+
+
+# Maps (verb, particle) to the Rule handling it. Rules without a particle are stored as (verb, None) and only used when
+# no rule for the verb and the second word exists.
+_dispatch_table = {}
+
+
+def register_verb(verb: str, handler, particle=None, min_words=2, followed_by=None):
+    """Adds a verb to the grammar, e.g. register_verb('drop', drop) or register_verb('look', look_up, 'up'). A rule
+    registered for a verb and particle that already has one replaces it. See 'Rule' for 'followed_by'."""
+    _dispatch_table[(verb, particle)] = Rule(verb, particle, handler, min_words, followed_by)
+    # parsed commands refer to the rules that were there when they were parsed
+    parse.cache_clear()
+    log.debug(f'Registered verb "{verb}"{"" if particle is None else f" {particle}"}.')
+
+
+def tokenize(command: str) -> tuple:
+    """Strips special characters from what the player typed and returns the individual words."""
+    return tuple(_STRIP_PATTERN.sub('', command.lower()).split())
+
+
+@functools.lru_cache(maxsize=1024)
+def parse(command: str) -> tuple:
+    """Returns the words of the command and the Rule handling it, or None if no rule does. Scripted clients send the
+    same lines over and over, so the most recent results are cached."""
+    words = tokenize(command)
+    rule = None
+    if len(words) > 0:
+        if len(words) > 1:
+            rule = _dispatch_table.get((words[0], words[1]))
+            if rule is not None and not rule.matches(words):
+                rule = None
+        if rule is None:
+            rule = _dispatch_table.get((words[0], None))
+    return words, rule
+
+
 class Command:
 
-    def __init__(self, command: str):
-        """Constructor for Command. Strips special characters and extra spaces. Then creates a list of single words."""
+    def __init__(self, command: str, world):
+        """Constructor for Command. Strips special characters and extra spaces. Then creates a list of single words.
+        Takes the World the command is run in as second argument."""
+        self.world = world
+        # the line as the player typed it
+        self.line = command
         self.command_list = command
+        # names typed by the player that matched nothing -> the names of visible objects they might have meant
+        self.suggestions = {}
 
     @property
     def command_list(self):
@@ -23,50 +92,55 @@ class Command:
 
     @command_list.setter
     def command_list(self, command):
-        """Strips special characters from what the player typed and puts individual words into a list"""
-        command = command.lower()
-        # Using Regex to strip everything but numbers and letters from the command
-        command = re.sub('[^a-z0-9 ]', '', command)
-        self._command_list = command.split(' ')
-        # remove empty indexes
-        while '' in self.command_list:
-            self._command_list.remove('')
+        """Parses what the player typed, keeps the individual words in a list and the Rule handling them"""
+        words, self.rule = parse(command)
+        self._command_list = list(words)
 
     def analyze(self):
-        """Check the words given by player and executes appropriate functions"""
-        # There's only one player so the object can be directly accessed.
-        player = components.Component.get_all_components()['Player'][0]
+        """Check the words given by player and executes appropriate functions. All messages for the player are sent at
+        once when the command is done. The time it took is added to the world's metrics."""
+        start = time.perf_counter()
+        try:
+            self.__run()
+        finally:
+            # characters moving in or out of the player's location are told about with the command's messages
+            if self.world.simulation is not None:
+                self.world.simulation.count_command(self.world.metrics)
+            output.flush()
+            metrics = self.world.metrics
+            metrics.observe('command', time.perf_counter() - start)
+            if self.world.economy is not None:
+                self.world.economy.count_command(metrics)
+            metrics.dump_if_due(self.world)
 
+    def __run(self):
+        """Calls the function the grammar has for the given words"""
         # necessary to prevent index out of bound errors when only giving one word as command
-        if len(self.command_list) < 2 and not ('exit' in self.command_list or 'stop' in self.command_list):
-            log.error(f'Commands need to have at least 2 words!')
+        if len(self.command_list) < 2 and (self.rule is None or len(self.command_list) < self.rule.min_words):
+            output.write(f'Commands need to have at least 2 words!')
             return
 
-        if 'show' == self.command_list[0] and 'inventory' == self.command_list[1]:
-            player.show_inventory()
-        elif 'look' == self.command_list[0] and 'around' == self.command_list[1]:
-            log.warning(f'You are in a {player.location.name}. {player.location.description}')
-        elif 'look' == self.command_list[0] and 'at' == self.command_list[1]:
-            self.look(player)
-        elif 'look' == self.command_list[0] and ('north' == self.command_list[1] or 'south' == self.command_list[1] or
-                                                 'west' == self.command_list[1] or 'east' == self.command_list[1]):
-            self.look_cardinal(player)
-        elif 'look' == self.command_list[0] and 'in' == self.command_list[1] or 'open' == self.command_list[0]:
-            self.open(player)
-        elif 'go' == self.command_list[0]:
-            self.go(player)
-        elif 'unlock' == self.command_list[0]:
-            self.unlock(player)
-        elif 'take' == self.command_list[0]:
-            self.take(player)
-        elif 'talk' == self.command_list[0] and 'to' == self.command_list[1]:
-            self.talk(player)
-        elif 'buy' == self.command_list[0]:
-            self.buy(player)
-        elif 'exit' == self.command_list[0] or 'stop' == self.command_list[0]:
-            exit('Game stopped by Player')
-        else:
-            log.error('This game is too stupid to understand what you mean :(')
+        if self.rule is None:
+            self.world.metrics.count('unknown_commands')
+            output.write('This game is too stupid to understand what you mean :(')
+            return
+
+        # There's only one player per world so the object can be directly accessed.
+        start = time.perf_counter()
+        try:
+            self.rule.handler(self, self.world.get_player())
+        finally:
+            self.world.metrics.observe(self.rule.handler.__name__, time.perf_counter() - start)
+        for names in self.suggestions.values():
+            output.write(f'Did you mean {format_choices(names)}?')
+
+    def show_inventory(self, player):
+        """Shows the player's inventory"""
+        player.show_inventory()
+
+    def look_around(self, player):
+        """Describes the player's location"""
+        output.write(f'You are in a {player.location.name}. {player.location.description}')
 
     def look(self, player):
         """Look at components or doors"""
@@ -84,7 +158,7 @@ class Command:
                 log.debug('Component found at current location!')
                 message = obj_to_look_at.description
             else:
-                log.warning(f'There is no {obj_to_look_at.name} here.')
+                output.write(f'There is no {obj_to_look_at.name} here.')
                 return
             # if it is a door or container, add locked state
             if isinstance(obj_to_look_at, locations.Door) or isinstance(obj_to_look_at, inventory.Container):
@@ -92,10 +166,10 @@ class Command:
                     message += ' It is unlocked.'
                 else:
                     message += ' It is locked.'
-            log.warning(message)
+            output.write(message)
         # if obj_to_look_at is None
         except AttributeError:
-            log.error('No such thing here.')
+            output.write('No such thing here.')
 
     def look_cardinal(self, player):
         """Look in cardinal direction and output Barrier's description"""
@@ -119,7 +193,7 @@ class Command:
             else:
                 message += ' It is locked.'
 
-        log.warning(message)
+        output.write(message)
 
     def open(self, player):
         """Shows Container's inventory and opens doors. Opening doors ist just cosmetic, doesn't need to be done."""
@@ -127,7 +201,7 @@ class Command:
             obj_to_open_name = self.get_obj_name(1, len(self.command_list))
         else:
             obj_to_open_name = self.get_obj_name(2, len(self.command_list))
-        obj_to_open = self.get_obj_from_name(obj_to_open_name)
+        obj_to_open = self.get_obj_from_name(obj_to_open_name, location=player.location)
         try:
             # check for correct location
             obj_is_in_location = self.is_correct_location(obj_to_open, player.location)
@@ -137,21 +211,21 @@ class Command:
                 if obj_to_open.lock.is_unlocked:
                     obj_to_open.show_inventory()
                 else:
-                    log.warning('You need to unlock this before you can open it!')
+                    output.write('You need to unlock this before you can open it!')
             # if object is not a container it must be a door, so try to open that
             elif isinstance(obj_to_open, locations.Door):
                 if obj_to_open.lock.is_unlocked:
-                    log.warning(f'You open {obj_to_open.name}. you can go through now.')
+                    output.write(f'You open {obj_to_open.name}. you can go through now.')
                 else:
-                    log.warning(f'You need to unlock this first!')
+                    output.write(f'You need to unlock this first!')
             # This else clause should never be executed
             else:
                 log.error(f'If you see this something is very weird. Ask Developer about "look at/open" function')
                 raise AttributeError
         except AttributeError:
-            log.warning('No such thing exists to be be opened!')
+            output.write('No such thing exists to be be opened!')
         except AssertionError:
-            log.warning(f'You need to be in the same location as the object you want to open')
+            output.write(f'You need to be in the same location as the object you want to open')
 
     def go(self, player):
         """Go in cardinal direction."""
@@ -161,16 +235,14 @@ class Command:
     def unlock(self, player):
         """Unlock doors and containers"""
         if len(self.command_list) < 2:
-            log.warning(f'Unlock what?')
+            output.write(f'Unlock what?')
             return
         # determine what object the player wants to unlock
         obj_to_unlock_name = self.get_obj_name(1, len(self.command_list))
         # get actual object
-        obj_to_unlock = self.get_obj_from_name(obj_to_unlock_name, 'Container')
-        if obj_to_unlock is None:
-            obj_to_unlock = self.get_obj_from_name(obj_to_unlock_name, 'Door')
+        obj_to_unlock = self.get_obj_from_name(obj_to_unlock_name, ('Container', 'Door'))
         if obj_to_unlock is None:
-            log.error(f'"{obj_to_unlock_name.capitalize()}" is not something that can be unlocked!')
+            output.write(f'"{obj_to_unlock_name.capitalize()}" is not something that can be unlocked!')
             return
         # check if the object is in the same location as the player when it is a container
         is_in_location = self.is_correct_location(obj_to_unlock, player.location)
@@ -180,19 +252,22 @@ class Command:
                 if player.is_item_in_inventory(obj_to_unlock.lock.key):
                     obj_to_unlock.unlock(obj_to_unlock.lock.key)
                 else:
-                    log.warning(f'You are missing the correct key to unlock this!')
+                    output.write(f'You are missing the correct key to unlock this!')
             # if obj_to_unlock is None
             except AttributeError:
-                log.warning('Nothing with that name exists.')
+                output.write('Nothing with that name exists.')
         else:
-            log.warning('You need to be in the same location to unlock this!')
+            output.write('You need to be in the same location to unlock this!')
 
     def take(self, player):
-        """Take items out of a container or directly from a location"""
+        """Take items out of a container or directly from a location. A number before the item's name takes that many
+        at once, e.g. 'take 5 gold coin from chest'."""
         # take stuff from container
         if 'from' in self.command_list:
             index_from = self.command_list.index('from')
-            obj_to_take_name = self.get_obj_name(1, index_from)
+            amount, obj_to_take_name = self.get_amount_and_name(1, index_from)
+            if amount is None:
+                return
             # retrieve item object
             obj_to_take = self.get_obj_from_name(obj_to_take_name)
             # get inventory name given by player
@@ -206,119 +281,307 @@ class Command:
                     if inv_to_take_from.lock.is_unlocked:
                         # check if item is in container's inventory
                         if inv_to_take_from.is_item_in_inventory(obj_to_take):
-                            # do actual adding and removing of the item
-                            player.add_item(obj_to_take)
-                            inv_to_take_from.remove_item(obj_to_take)
-                            log.warning(f'{obj_to_take.name} added to inventory.')
+                            # move the items from the container to the player in one go
+                            self.move_items(inv_to_take_from, player, obj_to_take, amount, inv_to_take_from.name)
                         else:
-                            log.warning(f'Nothing with that name can be taken from {inv_to_take_from.name}.')
+                            output.write(f'Nothing with that name can be taken from {inv_to_take_from.name}.')
                     else:
-                        log.warning(f'{inv_to_take_from.name} is locked!')
+                        output.write(f'{inv_to_take_from.name} is locked!')
                 else:
-                    log.warning(f'You need to be in the same location as {inv_to_take_from.name} to take from it!')
+                    output.write(f'You need to be in the same location as {inv_to_take_from.name} to take from it!')
             except AttributeError:
-                log.warning(f'This container does not exist')
+                output.write(f'This container does not exist')
         # take stuff directly in location
         else:
             # get object name given by player
-            obj_to_take_name = self.get_obj_name(1, len(self.command_list))
+            amount, obj_to_take_name = self.get_amount_and_name(1, len(self.command_list))
+            if amount is None:
+                return
             # retrieve item object
             obj_to_take = self.get_obj_from_name(obj_to_take_name)
-            # check if object's location is player's location
-            correct_location = False
             try:
-                # go through items in locations 'inventory'
-                for item_w_amount in player.location.inventory.inventory_list:
-                    if item_w_amount[0] == obj_to_take:
-                        correct_location = True
-                # check for correct location
-                if correct_location:
-                    # add to player's inventory
-                    player.add_item(obj_to_take)
-                    # remove from location
-                    player.location.inventory.remove_item(obj_to_take)
-                    log.warning(f'{obj_to_take.name} added to inventory.')
+                # check if object lies in the location's 'inventory'
+                if player.location.inventory.is_item_in_inventory(obj_to_take):
+                    # move the items from the location to the player in one go
+                    self.move_items(player.location.inventory, player, obj_to_take, amount, player.location.name)
                 else:
-                    log.warning(f'Nothing with that name can be taken from {player.location.name}.')
+                    output.write(f'Nothing with that name can be taken from {player.location.name}.')
             # message if object could not be found in location or container
             except AttributeError:
-                log.warning(f'Nothing with that name can be taken from this location.')
+                output.write(f'Nothing with that name can be taken from this location.')
+
+    def take_all(self, player):
+        """Take everything out of a container at once"""
+        if len(self.command_list) < 4 or self.command_list[2] != 'from':
+            output.write('Take all from what?')
+            return
+        inv_to_take_from_name = self.get_obj_name(3, len(self.command_list))
+        inv_to_take_from = self.get_obj_from_name(inv_to_take_from_name, 'Container', player.location)
+        if inv_to_take_from is None:
+            output.write(f'This container does not exist')
+        elif not self.is_correct_location(inv_to_take_from, player.location):
+            output.write(f'You need to be in the same location as {inv_to_take_from.name} to take from it!')
+        elif not inv_to_take_from.lock.is_unlocked:
+            output.write(f'{inv_to_take_from.name} is locked!')
+        elif len(inv_to_take_from.inventory_list) == 0:
+            output.write(f'{inv_to_take_from.name} is empty.')
+        else:
+            for item_obj, amount in inventory.transfer_all(inv_to_take_from, player):
+                output.write(f'{get_amount_prefix(amount)}{item_obj.name} added to inventory.')
+
+    def drop(self, player):
+        """Drop items from the player's inventory into the location. A number before the item's name drops that many
+        at once."""
+        amount, obj_to_drop_name = self.get_amount_and_name(1, len(self.command_list))
+        if amount is None:
+            return
+        obj_to_drop = self.get_obj_from_name(obj_to_drop_name)
+        if obj_to_drop is None or not isinstance(obj_to_drop, components.Item):
+            output.write(f'"{obj_to_drop_name.capitalize()}" is not a valid Item name!')
+        elif player.get_item_amount(obj_to_drop) == 0:
+            output.write(f'You don\'t have any {obj_to_drop.name}.')
+        elif self.move_items(player, player.location.inventory, obj_to_drop, amount, 'your inventory', False):
+            output.write(f'{get_amount_prefix(amount)}{obj_to_drop.name} dropped in {player.location.name}.')
 
     def talk(self, player):
         """Talk to an NPC merchant and show their inventory to the player."""
         # get character object to talk to
         char_to_talk_name = self.get_obj_name(2, len(self.command_list))
-        char_to_talk = self.get_obj_from_name(char_to_talk_name, 'Character')
+        char_to_talk = self.get_obj_from_name(char_to_talk_name, 'Character', player.location)
         try:
             # check location
             if self.is_correct_location(char_to_talk, player.location):
                 # show character 'voice lines' to player
-                log.warning(f'{char_to_talk.text}')
-                time.sleep(0.1)
+                output.write(f'{char_to_talk.text}')
                 # show character's inventory with the prices
-                char_to_talk.show_inventory(True)
+                self.show_wares(char_to_talk)
             else:
-                log.warning(f'You need to be in the same location as {char_to_talk.name} to talk to him!')
+                output.write(f'You need to be in the same location as {char_to_talk.name} to talk to him!')
         except AttributeError:
-            log.error(f'"{char_to_talk_name.capitalize()}" is not a valid Character name.')
+            output.write(f'"{char_to_talk_name.capitalize()}" is not a valid Character name.')
 
     def buy(self, player):
-        """Buy given item from the character in player's location. Only works with one merchant per location!"""
-        obj_to_buy_name = self.get_obj_name(1, len(self.command_list))
+        """Buy given item from a character in player's location. If several merchants are there, the item is bought
+        from the first one who has it. A number before the item's name buys that many at once."""
+        amount, obj_to_buy_name = self.get_amount_and_name(1, len(self.command_list))
+        if amount is None:
+            return
         obj_to_buy = self.get_obj_from_name(obj_to_buy_name)
+        merchants = self.get_characters_in_location(player.location)
+        if len(merchants) == 0:
+            output.write(f'There is no merchant here to buy this from!')
+            return
+        if obj_to_buy is None:
+            output.write(f'"{obj_to_buy_name.capitalize()}" is not a valid Item name!')
+            return
         try:
-            for character in components.Component.get_all_components()['Character']:
-                if self.is_correct_location(character, player.location):
-                    if character.is_item_in_inventory(obj_to_buy):
-                        # Checks if player has enough money, then removes the amount of money and switches item to
-                        #   new inventory.
-                        if player.has_enough_money(obj_to_buy.price):
-                            player.money -= obj_to_buy.price
-                            player.add_item(obj_to_buy)
-                            character.remove_item(obj_to_buy)
-                            log.warning(f'{obj_to_buy.name} added to inventory')
-                        else:
-                            log.warning(f'You don\'t have enough money to buy "{obj_to_buy.name}" for '
-                                        f'{obj_to_buy.price} {config.CURRENCY}!')
-                    else:
-                        log.warning(f'{character.name} does not have "{obj_to_buy.name}" for sale!')
-                return
-            log.warning(f'There is no merchant here to buy this from!')
+            seller = None
+            for character in merchants:
+                if self.get_stock(character, obj_to_buy) > 0:
+                    seller = character
+                    break
+            if seller is None:
+                if len(merchants) == 1:
+                    output.write(f'{merchants[0].name} does not have "{obj_to_buy.name}" for sale!')
+                else:
+                    output.write(f'Nobody here has "{obj_to_buy.name}" for sale!')
+            elif self.get_stock(seller, obj_to_buy) < amount:
+                output.write(f'{seller.name} only has {self.get_stock(seller, obj_to_buy)}x "{obj_to_buy.name}" for '
+                             f'sale!')
+            else:
+                cost = self.get_price(seller, obj_to_buy) * amount
+                # Checks if player has enough money, then removes the amount of money and moves the items to the
+                #   player. If moving them fails, the money is given back.
+                if player.has_enough_money(cost):
+                    player.money -= cost
+                    try:
+                        self.hand_over(seller, player, obj_to_buy, amount)
+                    except Exception:
+                        player.money += cost
+                        raise
+                    output.write(f'{get_amount_prefix(amount)}{obj_to_buy.name} added to inventory')
+                else:
+                    output.write(f'You don\'t have enough money to buy {get_amount_prefix(amount)}"{obj_to_buy.name}" '
+                                 f'for {cost} {config.CURRENCY}!')
         except AttributeError:
-            log.error(f'"{obj_to_buy_name.capitalize()}" is not a valid Item name!')
+            output.write(f'"{obj_to_buy_name.capitalize()}" is not a valid Item name!')
+
+    def show_wares(self, merchant):
+        """Shows the merchant's inventory with the prices. Merchants of the world's economy show its stock and
+        prices."""
+        listing = self.world.economy.get_listing(merchant) if self.world.economy is not None else None
+        if listing is None:
+            merchant.show_inventory(True)
+        elif len(listing[0]) == 0:
+            output.write(f'{merchant.name}\'s inventory is empty :(')
+        else:
+            output.write(inventory.format_inventory(merchant.name, *listing))
+
+    def get_stock(self, merchant, item_obj) -> int:
+        """Returns how many of the item the merchant has for sale, taken from the world's economy if the merchant is
+        part of it and from the merchant's inventory otherwise."""
+        if self.world.economy is not None:
+            stock = self.world.economy.get_stock(merchant, item_obj)
+            if stock is not None:
+                return stock
+        return merchant.get_item_amount(item_obj)
+
+    def get_price(self, merchant, item_obj) -> int:
+        """Returns the price of one piece of the item, the merchant's price in the world's economy if there is one and
+        the item's price otherwise."""
+        if self.world.economy is not None and merchant is not None:
+            price = self.world.economy.get_price(merchant, item_obj)
+            if price is not None:
+                return price
+        return item_obj.price
+
+    def hand_over(self, seller, player, item_obj, amount: int):
+        """Gives the player the items bought from the seller. Merchants of the world's economy sell from its stock,
+        the others from their inventory. Like 'inventory.transfer', the sale is undone if adding the items to the
+        player fails."""
+        economy = self.world.economy
+        if economy is not None and economy.get_stock(seller, item_obj) is not None:
+            economy.sell(seller, item_obj, amount)
+            try:
+                player.add_item(item_obj, amount)
+            except Exception:
+                economy.cancel_sale(seller, item_obj, amount)
+                raise
+        else:
+            inventory.transfer(seller, player, item_obj, amount)
+
+    def get_characters_in_location(self, location) -> list:
+        """Returns the characters (but not the player) in the location, looked up in the world's occupant index."""
+        return [occupant for occupant in self.world.get_occupants(location)
+                if isinstance(occupant, character.Character) and not isinstance(occupant, character.Player)]
+
+    def exit_game(self, player):
+        """Ends the game"""
+        exit('Game stopped by Player')
 
     def get_obj_name(self, range_start: int, range_end: int):
         """Goes through command_list. Takes start and end indexes as command and returns String from those words"""
-        obj_name = ''
-        for i in range(range_start, range_end):
-            obj_name += f'{self.command_list[i]} '
-        # make lower case and remove trailing space
-        return obj_name.rstrip().lower()
+        # words are lower case already
+        return ' '.join(self.command_list[range_start:range_end])
 
-    @staticmethod
-    def get_obj_from_name(obj_name: str, component_type: str = None):
-        """Returns component object by looking for its name. If no component type is given, it loops through all."""
-        obj_name = obj_name.lower()
-        # go through all existing components and doors
+    def get_amount_and_name(self, range_start: int, range_end: int) -> tuple:
+        """Same as 'get_obj_name', but if the first word is a number, it is returned as the amount together with the
+        name made of the following words, otherwise the amount is 1. If the number is 0, the player is told and the
+        amount is None."""
+        if range_start < range_end - 1 and self.command_list[range_start].isdigit():
+            amount = int(self.command_list[range_start])
+            if amount < 1:
+                output.write('The amount has to be at least 1!')
+                return None, None
+            return amount, self.get_obj_name(range_start + 1, range_end)
+        return 1, self.get_obj_name(range_start, range_end)
+
+    def move_items(self, source, target, item_obj, amount: int, source_name: str, tell_player=True) -> bool:
+        """Moves the amount of the item from the source to the target with 'inventory.transfer'. Tells the player
+        what was added to the inventory, if wanted, or that the source doesn't have that many. Returns whether the
+        items were moved."""
+        try:
+            inventory.transfer(source, target, item_obj, amount)
+        except inventory.TransferError as e:
+            output.write(f'There {"is" if e.available == 1 else "are"} only {e.available}x {item_obj.name} in '
+                         f'{source_name}!')
+            return False
+        if tell_player:
+            output.write(f'{get_amount_prefix(amount)}{item_obj.name} added to inventory.')
+        return True
+
+    def get_obj_from_name(self, obj_name: str, component_type=None, location=None):
+        """Returns component object by looking for its name. Takes a component type or a tuple of them, e.g.
+        ('Container', 'Door'), if no component type is given, it looks through all. When several objects share the
+        name, the one in the given location is returned, otherwise the first one. Only if the name matches nothing of
+        any of the types, it is completed or corrected among the objects the player can see, see
+        'get_objs_from_fuzzy_name'."""
+        candidates = self.get_objs_from_name(obj_name, component_type)
+        if len(candidates) == 0:
+            candidates = self.get_objs_from_fuzzy_name(obj_name, component_type)
+        if len(candidates) == 0:
+            # counted once under the type(s) asked for, e.g. 'resolution_failures.Container/Door'
+            type_name = '/'.join(component_type) if isinstance(component_type, tuple) else component_type or 'any'
+            self.world.metrics.count('resolution_failures')
+            self.world.metrics.count(f'resolution_failures.{type_name}')
+        if len(candidates) > 1:
+            log.debug(f'"{obj_name}" is ambiguous, {len(candidates)} objects share this name.')
+            if location is not None:
+                occupants = self.world.get_occupants(location)
+                for candidate in candidates:
+                    if candidate in occupants or candidate in location.get_doors():
+                        return candidate
+        if len(candidates) > 0:
+            return candidates[0]
+        return None
+
+    def get_objs_from_name(self, obj_name: str, component_type=None) -> list:
+        """Returns all objects with the given name or alias from the name index, those of the first given component
+        type first. If no component type is given, components are searched first, then doors."""
+        return self.world.get_objects_by_name(obj_name, self.get_type_names(component_type))
+
+    def get_type_names(self, component_type=None) -> tuple:
+        """Returns the names of the types an object of the given component type, or of one of a tuple of them, can
+        have, all types if it is None."""
+        barrier_types = ('Barrier', 'Door')
+        # look for components first, then Barriers (doors)
         if component_type is None:
-            for c_type in components.Component.get_all_components():
-                for obj in components.Component.get_all_components()[c_type]:
-                    if obj.name.lower() == obj_name:
-                        return obj
-            for door in locations.Barrier.get_all_barriers():
-                if door.name.lower() == obj_name:
-                    return door
-        # look for Barriers (doors)
+            return tuple(self.world.get_all_components()) + barrier_types
+        elif isinstance(component_type, tuple):
+            return tuple(dict.fromkeys(name for each in component_type for name in self.get_type_names(each)))
         elif component_type == 'Barrier' or component_type == 'Door':
-            for door in locations.Barrier.get_all_barriers():
-                if door.name.lower() == obj_name:
-                    return door
+            return barrier_types
         # only look in given component type
-        else:
-            for obj in components.Component.get_all_components()[component_type]:
-                if obj.name.lower() == obj_name:
-                    return obj
-        return None
+        return (component_type,)
+
+    def get_objs_from_fuzzy_name(self, obj_name: str, component_type=None) -> list:
+        """Returns the objects the player can see whose name or alias the given name is the start of, if it is the
+        start of only one name. Otherwise the names the player might have meant, those starting with the given name or
+        a few typos away from it, are remembered as suggestions and an empty list is returned. Only visible objects are
+        looked at, so this takes the same time no matter how big the world is."""
+        if len(obj_name) == 0:
+            return []
+        visible = self.get_visible_objects(self.get_type_names(component_type))
+        index = fuzzy.get_index(frozenset(visible))
+        completions = index.get_completions(obj_name)
+        if len(completions) == 1:
+            self.world.metrics.count('fuzzy_completions')
+            log.debug(f'"{obj_name}" completed to "{completions[0]}".')
+            return visible[completions[0]]
+        names = completions[:fuzzy.MAX_SUGGESTIONS] if len(completions) > 0 else index.get_suggestions(obj_name)
+        if len(names) > 0:
+            self.world.metrics.count('fuzzy_suggestions')
+            # the objects' names as they are written, not case-folded
+            self.suggestions[obj_name] = list(dict.fromkeys(visible[name][0].name for name in names))
+        return []
+
+    def get_visible_objects(self, type_names: tuple) -> dict:
+        """Returns the objects of the given types the player can see by their case-folded names and aliases: the
+        doors, characters and containers in the player's location, the items lying there, in unlocked containers and
+        in the characters' inventories, and the player's own items."""
+        player = self.world.get_player()
+        location = player.location
+        objects = [item_w_amount[0] for item_w_amount in player.inventory.inventory_list]
+        if location is not None:
+            objects.extend(location.get_doors())
+            objects.extend(item_w_amount[0] for item_w_amount in location.inventory.inventory_list)
+            for occupant in self.world.get_occupants(location):
+                if occupant is player:
+                    continue
+                objects.append(occupant)
+                if isinstance(occupant, inventory.Container) and occupant.lock.is_unlocked:
+                    objects.extend(item_w_amount[0] for item_w_amount in occupant.inventory_list)
+                elif isinstance(occupant, character.Character):
+                    objects.extend(item_w_amount[0] for item_w_amount in occupant.inventory.inventory_list)
+        visible = {}
+        for obj in objects:
+            if type(obj).__name__ not in type_names:
+                continue
+            for key in obj._get_name_keys():
+                entry = visible.setdefault(key, [])
+                if obj not in entry:
+                    entry.append(obj)
+        return visible
 
     @staticmethod
     def is_correct_location(obj_to_check, location: locations.Location) -> bool:
@@ -336,3 +599,42 @@ class Command:
             return True
         except AssertionError:
             return False
+
+
+def get_amount_prefix(amount: int) -> str:
+    """Returns e.g. '5x ' to put in front of an item's name in messages, nothing for a single item."""
+    if amount == 1:
+        return ''
+    return f'{amount}x '
+
+
+def format_choices(names: list) -> str:
+    """Returns the names in quotes as a list for the player, e.g. '"Apple", "Sword" or "Key"'."""
+    quoted = [f'"{name}"' for name in names]
+    if len(quoted) == 1:
+        return quoted[0]
+    return f'{", ".join(quoted[:-1])} or {quoted[-1]}'
+
+
+# The game's grammar. Rules with a particle are tried before the rule of the same verb without one.
+for _verb, _particle, _handler, _min_words in (
+        ('show', 'inventory', Command.show_inventory, 2),
+        ('look', 'around', Command.look_around, 2),
+        ('look', 'at', Command.look, 2),
+        ('look', 'north', Command.look_cardinal, 2),
+        ('look', 'south', Command.look_cardinal, 2),
+        ('look', 'west', Command.look_cardinal, 2),
+        ('look', 'east', Command.look_cardinal, 2),
+        ('look', 'in', Command.open, 2),
+        ('open', None, Command.open, 2),
+        ('go', None, Command.go, 2),
+        ('unlock', None, Command.unlock, 2),
+        ('take', None, Command.take, 2),
+        ('drop', None, Command.drop, 2),
+        ('talk', 'to', Command.talk, 2),
+        ('buy', None, Command.buy, 2),
+        ('exit', None, Command.exit_game, 1),
+        ('stop', None, Command.exit_game, 1)):
+    register_verb(_verb, _handler, _particle, _min_words)
+# 'take all purpose flour' takes the item of that name, only 'take all' and 'take all from ...' take everything
+register_verb('take', Command.take_all, 'all', 2, ('from',))
@@ -6,45 +6,74 @@ log = logging.getLogger(__name__)
 
 
 class Component(Base):
-    _all_components = {
-        'Item': [],
-        'Key': [],
-        'Character': [],
-        'Player': [],
-        'Container': []
-    }
-
-    def __init__(self, description=None, name=None, internal_name=None, location=None):
+    __slots__ = ('_location',)
+
+    def __init__(self, description=None, name=None, internal_name=None, location=None, world=None):
         """Constructor for Component"""
-        super().__init__(description, name, internal_name)
+        super().__init__(description, name, internal_name, world)
+        self._location = None
         self.location = location
-        Component._all_components.get(type(self).__name__).append(self)
+        if world is not None:
+            world.add_component(self)
 
     @property
     def location(self) -> Location:
-        """Returns the current location"""
+        """Returns the current location, as the current session's overlay sees it"""
+        overlay = self._get_overlay()
+        if overlay is not None and self in overlay.locations:
+            return overlay.locations[self]
         return self._location
 
     @location.setter
     def location(self, new_location: Location):
-        """Sets new location"""
-        self._location = new_location
+        """Sets new location, only for the current session if there is an overlay. The world's occupant index is
+        updated, too."""
+        if self.world is not None:
+            self.world.move_occupant(self, self.location, new_location)
+        overlay = self._get_overlay()
+        if overlay is not None:
+            overlay.locations[self] = new_location
+        else:
+            self._location = new_location
+        journal = self.world.get_journal() if self.world is not None else None
+        if journal is not None:
+            journal.record_location(self, new_location)
         if new_location is None:
             log.debug(f'No location for {self.internal_name} has been set')
         else:
             log.debug(f'New location for {self.internal_name} has been set')
 
-    @classmethod
-    def get_all_components(cls):
-        """Returns list with all Locations in the game."""
-        return cls._all_components
+
+def move_components(components: list, new_locations: list):
+    """Sets new locations of many components of the same world at once, e.g. of the characters moved by a simulation.
+    Does the same as the location setter for every component, but looks the world's overlay and journal up only
+    once."""
+    if len(components) == 0:
+        return
+    world = components[0].world
+    overlay = world.overlay
+    journal = world.get_journal()
+    for component, new_location in zip(components, new_locations):
+        if overlay is not None and component in overlay.locations:
+            old_location = overlay.locations[component]
+        else:
+            old_location = component._location
+        world.move_occupant(component, old_location, new_location)
+        if overlay is not None:
+            overlay.locations[component] = new_location
+        else:
+            component._location = new_location
+        if journal is not None:
+            journal.record_location(component, new_location)
+    log.debug(f'New locations for {len(components)} components have been set')
 
 
 class Item(Component):
+    __slots__ = ('_price',)
 
-    def __init__(self, description=None, name=None, internal_name=None, price: int = 1, location=None):
+    def __init__(self, description=None, name=None, internal_name=None, price: int = 1, location=None, world=None):
         """Constructor for Item(Component)"""
-        super().__init__(description, name, internal_name, location)
+        super().__init__(description, name, internal_name, location, world)
         self.price = price
 
     @property
@@ -56,7 +85,19 @@ class Item(Component):
     def price(self, price: int):
         """Sets item's new price"""
         self._price = int(price)
+        self.__item_changed()
+
+    @Component.name.setter
+    def name(self, new_name):
+        """Sets the item's new name"""
+        Component.name.fset(self, new_name)
+        self.__item_changed()
+
+    def __item_changed(self):
+        """Tells the world's render cache that texts listing the item are outdated."""
+        if self.world is not None:
+            self.world.render_cache.item_changed()
 
 
 class Key(Item):
-    pass
+    __slots__ = ()
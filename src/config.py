@@ -1,15 +1,36 @@
 """Config file with global Stuff and initialization code."""
+import gc
+import hashlib
 import json
 import logging
+import os
+import pickle
+import re
+import sys
 
 from . import character
 from . import components
 from . import inventory
 from . import locations
+from . import texts
+from .world import World
 
 log = logging.getLogger(__name__)
 
 CURRENCY = 'Gold Coin'
+INIT_FILE = 'src/init.json'
+# Compiled snapshot of the world loaded from INIT_FILE, see 'compile_world'
+SNAPSHOT_FILE = 'src/init.snapshot'
+# Layout of the snapshot file. Snapshots written by other code than this are not used either, see 'get_code_hash'.
+SNAPSHOT_FORMAT = b'TXTADV-SNAPSHOT-14\n'
+# Directory the games are saved in, one save per player name
+SAVE_DIR = 'saves'
+# A world split into regions is a directory with this manifest and a JSON file per region, see 'regions'
+REGION_MANIFEST = 'world.json'
+# Regions of a split world that are kept in memory at most
+MAX_REGIONS = 16
+# Order in which the object types of the JSON are created, so that all references can be resolved
+INIT_ORDER = ('Item', 'Key', 'Door', 'Barrier', 'Location', 'Character', 'Player', 'Container')
 
 
 def welcome(player_name):
@@ -18,36 +39,190 @@ def welcome(player_name):
            f"mansion and have to find your way out to freedom to finish it. Good Luck!"
 
 
-def initialize(chosen_player_name):
-    """Loads all components from JSON and creates game objects"""
-    f = open("src/init.json", "r")
-    f = f.read()
-    init_json = json.loads(f)
+class WorldLoadError(Exception):
+    """Raised when the world definition references objects that do not exist."""
+    pass
+
+
+def initialize(chosen_player_name, init_file=INIT_FILE, world=None) -> World:
+    """Loads all components from JSON and creates game objects in the given or a new World, which is returned. Every
+    created object is put into a symbol table of its type, so references between objects are resolved by internal name
+    without looking through all objects."""
+    if world is None:
+        world = World()
+    with open(init_file, "r") as f:
+        init_json = json.load(f)
+
+    # internal name -> object for each type. Doors and Barriers share one table because both are used as walls.
+    symbols = {
+        'Item': {},
+        'Key': {},
+        'Barrier': {},
+        'Location': {},
+        'Character': {},
+        'Player': {},
+        'Container': {}
+    }
+    # descriptions of all references to objects that do not exist
+    dangling = []
 
     for component in init_json:
+        if component not in INIT_ORDER:
+            log.error(f'MISSING FUNCTION FOR INIT-OBJECT TYPE')
+    # Objects are created in an order where everything they reference already exists
+    for component in INIT_ORDER:
+        if component not in init_json:
+            continue
         if component == 'Item':
-            init_items(init_json['Item'])
+            init_items(init_json['Item'], symbols, world)
         elif component == 'Key':
-            init_keys(init_json['Key'])
+            init_keys(init_json['Key'], symbols, world)
         elif component == 'Door':
-            init_doors(init_json['Door'])
+            init_doors(init_json['Door'], symbols, dangling, world)
         elif component == 'Barrier':
-            init_barriers(init_json['Barrier'])
+            init_barriers(init_json['Barrier'], symbols, world)
         elif component == 'Location':
-            init_locations(init_json['Location'])
+            init_locations(init_json['Location'], symbols, dangling, world)
         elif component == 'Character':
-            init_characters(init_json['Character'])
+            init_characters(init_json['Character'], symbols, dangling, world)
         elif component == 'Player':
-            init_player(init_json['Player'], chosen_player_name)
+            init_player(init_json['Player'], chosen_player_name, symbols, dangling, world)
         elif component == 'Container':
-            init_containers(init_json['Container'])
+            init_containers(init_json['Container'], symbols, dangling, world)
+
+    set_locations(init_json, symbols, dangling)
+
+    if len(dangling) > 0:
+        summary = '\n'.join(dangling)
+        raise WorldLoadError(f'{len(dangling)} dangling reference(s) in {init_file}:\n{summary}')
+
+    for door, connections in world.get_misconnected_doors().items():
+        log.error(f'{door.internal_name} connects {connections} locations instead of 2!')
+    return world
+
+
+def load_world(chosen_player_name, init_file=INIT_FILE, snapshot_file=SNAPSHOT_FILE, max_regions=MAX_REGIONS,
+               spill_dir=None) -> World:
+    """Returns the World loaded from the compiled snapshot if it was made from the current JSON, otherwise loads it
+    from JSON and compiles a new snapshot for the next start. If 'init_file' is the directory of a world split into
+    regions, only the region the player starts in is loaded and no snapshot is used, see 'regions.load_world'."""
+    if os.path.isdir(init_file):
+        from . import regions
+        return regions.load_world(chosen_player_name, init_file, max_regions, spill_dir)
+    json_hash = get_world_hash(init_file)
+    # Loading creates a lot of objects, but no garbage. Pausing the garbage collector avoids it looking through all of
+    # them over and over again.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        world = read_snapshot(snapshot_file, json_hash)
+        if world is not None:
+            # the snapshot is made before any player name is known
+            world.get_player().name = chosen_player_name
+            log.debug(f'World loaded from snapshot {snapshot_file}')
         else:
-            log.error(f'MISSING FUNCTION FOR INIT-OBJECT TYPE')
-
-    set_locations(init_json)
-
-
-def init_items(items):
+            world = initialize(chosen_player_name, init_file)
+            write_snapshot(world, snapshot_file, json_hash)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return world
+
+
+def compile_world(init_file=INIT_FILE, snapshot_file=SNAPSHOT_FILE):
+    """Loads the world from JSON and writes the snapshot that 'load_world' uses on later starts."""
+    with initialize(None, init_file) as world:
+        write_snapshot(world, snapshot_file, get_world_hash(init_file))
+
+
+def get_file_name(chosen_player_name) -> str:
+    """Returns the player's name with all characters that are not allowed in file names replaced."""
+    return re.sub('[^A-Za-z0-9_-]', '_', chosen_player_name) or '_'
+
+
+def get_save_file(chosen_player_name, save_dir=SAVE_DIR) -> str:
+    """Returns the path of the player's save file."""
+    return os.path.join(save_dir, f'{get_file_name(chosen_player_name)}.save')
+
+
+def get_world_hash(init_file=INIT_FILE) -> bytes:
+    """Returns the SHA-256 hash of the JSON file's content. For a world split into regions, that's the manifest."""
+    if os.path.isdir(init_file):
+        init_file = os.path.join(init_file, REGION_MANIFEST)
+    with open(init_file, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def get_code_hash() -> bytes:
+    """Returns the SHA-256 hash of the game's source files. It's written into every snapshot, so a snapshot is made
+    again whenever the code changed, instead of unpickling objects whose classes changed since."""
+    code_hash = hashlib.sha256()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(os.listdir(source_dir)):
+        if file_name.endswith('.py'):
+            with open(os.path.join(source_dir, file_name), 'rb') as f:
+                code_hash.update(file_name.encode())
+                code_hash.update(f.read())
+    return code_hash.digest()
+
+
+CODE_HASH = get_code_hash()
+
+
+def write_snapshot(world: World, snapshot_file, json_hash: bytes):
+    """Writes the World with all its game objects as they are right now to the snapshot file, prefixed by the format,
+    the hash of the code and the hash of the JSON the objects were loaded from. The long texts are moved into a string
+    table next to it first, see 'texts', the World uses that table from then on as well."""
+    texts.write_string_table(world, get_strings_file(snapshot_file), json_hash)
+    # write to a temporary file first, so an interrupted write never leaves a broken snapshot behind
+    with open(f'{snapshot_file}.tmp', 'wb') as f:
+        f.write(SNAPSHOT_FORMAT)
+        f.write(CODE_HASH)
+        f.write(json_hash)
+        pickle.dump(world, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f'{snapshot_file}.tmp', snapshot_file)
+    log.debug(f'Snapshot written to {snapshot_file}')
+
+
+def read_snapshot(snapshot_file, json_hash: bytes):
+    """Returns the World from the snapshot file. Returns None if the snapshot does not exist, was made by other code
+    or from another JSON than the one with the given hash, or can't be loaded for any other reason, e.g. because it is
+    truncated, so the world is loaded from JSON again."""
+    try:
+        f = open(snapshot_file, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.read(len(SNAPSHOT_FORMAT)) != SNAPSHOT_FORMAT or f.read(len(CODE_HASH)) != CODE_HASH \
+                or f.read(len(json_hash)) != json_hash:
+            log.debug(f'Snapshot {snapshot_file} is outdated')
+            return None
+        try:
+            return pickle.load(f)
+        except (FileNotFoundError, texts.StringTableError) as e:
+            log.debug(f'String table of snapshot {snapshot_file} is unusable: {e}')
+            return None
+        except Exception as e:
+            log.warning(f'Snapshot {snapshot_file} is unusable, the world is loaded from JSON: {e!r}')
+            return None
+
+
+def get_strings_file(snapshot_file) -> str:
+    """Returns the path of the string table belonging to the snapshot file."""
+    return f'{snapshot_file}.strings'
+
+
+def resolve(symbols, object_type: str, internal_name: str, referrer: str, dangling: list):
+    """Returns the object of the given type with the given internal name from the symbol tables. If it does not
+    exist, the reference is added to the 'dangling' list together with the 'referrer' description and None is
+    returned."""
+    obj = symbols[object_type].get(internal_name)
+    if obj is None:
+        dangling.append(f'{referrer} references unknown {object_type} "{internal_name}"')
+    return obj
+
+
+def init_items(items, symbols, world):
     """Goes through all items defined in JSON and creates objects from them. Almost the same as 'init_keys', apart
     from the object type being created"""
     for item in items:
@@ -58,11 +233,12 @@ def init_items(items):
             name = items[item]['name']
         internal_name = item
         price = items[item]['price']
-        # Create objects without assigning them to a variable
-        components.Item(desc, name, internal_name, price)
+        new_item = components.Item(desc, name, internal_name, price, world=world)
+        new_item.aliases = items[item].get('aliases')
+        symbols['Item'][internal_name] = new_item
 
 
-def init_keys(keys):
+def init_keys(keys, symbols, world):
     """Goes through all keys defined in JSON and creates objects from them. Almost the same as 'init_items', apart
     from the object type being created"""
     for key in keys:
@@ -70,64 +246,57 @@ def init_keys(keys):
         name = keys[key]['name']
         price = keys[key]['price']
         internal_name = key
-        # Create objects without assigning them to a variable
-        components.Key(desc, name, internal_name, price)
+        new_key = components.Key(desc, name, internal_name, price, world=world)
+        new_key.aliases = keys[key].get('aliases')
+        symbols['Key'][internal_name] = new_key
 
 
-def init_doors(doors):
+def init_doors(doors, symbols, dangling, world):
     """Goes through all doors defined in JSON and creates objects from them."""
     for door in doors:
         this_key = None
-        for key in components.Component.get_all_components()['Key']:
-            if key.internal_name == doors[door]['key']:
-                this_key = key
+        if doors[door]['key'] != '':
+            this_key = resolve(symbols, 'Key', doors[door]['key'], f'Door "{door}"', dangling)
         desc = doors[door]['description']
         name = doors[door]['name']
         internal_name = door
-        # Create objects without assigning them to a variable
-        locations.Door(this_key, desc, name, internal_name)
+        new_door = locations.Door(this_key, desc, name, internal_name, world)
+        new_door.aliases = doors[door].get('aliases')
+        symbols['Barrier'][internal_name] = new_door
 
 
-def init_barriers(barriers):
+def init_barriers(barriers, symbols, world):
     """Goes through all barriers defined in JSON and creates objects from them."""
     for barrier in barriers:
         desc = barriers[barrier]['description']
         internal_name = barrier
-        # Create objects without assigning them to a variable
-        locations.Barrier(desc, internal_name=internal_name)
+        symbols['Barrier'][internal_name] = locations.Barrier(desc, internal_name=internal_name, world=world)
 
 
-def init_locations(location_list):
+def init_locations(location_list, symbols, dangling, world):
     """Goes through all locations defined in JSON and creates objects from them."""
-    # Initialize barrier variables
-    north_wall = None
-    south_wall = None
-    west_wall = None
-    east_wall = None
     for location in location_list:
-        # Check which barrier is the correct one defined in the JSON. Checks existing barriers' internal_name.
-        for barrier in locations.Barrier.get_all_barriers():
-            if barrier.internal_name == location_list[location]['north_wall']:
-                north_wall = barrier
-            if barrier.internal_name == location_list[location]['south_wall']:
-                south_wall = barrier
-            if barrier.internal_name == location_list[location]['west_wall']:
-                west_wall = barrier
-            if barrier.internal_name == location_list[location]['east_wall']:
-                east_wall = barrier
+        # Look up the barriers defined in the JSON by their internal_name.
+        walls = []
+        for side in ('north_wall', 'south_wall', 'west_wall', 'east_wall'):
+            walls.append(resolve(symbols, 'Barrier', location_list[location][side],
+                                 f'{side} of Location "{location}"', dangling))
+        if None in walls:
+            # the location cannot be created without all of its walls
+            continue
+        north_wall, south_wall, west_wall, east_wall = walls
         desc = location_list[location]['description']
         inv_desc = location_list[location]['inv_description']
         name = location_list[location]['name']
         internal_name = location
-        # Create objects without assigning them to a variable
         new_location = locations.Location(north_wall, south_wall, west_wall, east_wall, desc, name, internal_name,
-                                          inv_desc)
+                                          inv_desc, world)
+        symbols['Location'][internal_name] = new_location
 
-        fill_inventory(new_location.inventory, 'Item', location_list, location)
-        fill_inventory(new_location.inventory, 'Key', location_list, location)
+        fill_inventory(new_location.inventory, location_list, location, symbols, dangling)
 
 
-def init_characters(characters):
+def init_characters(characters, symbols, dangling, world):
     """Goes through all characters defined in JSON and creates objects from them. Almost the same as 'init_player',
     apart from the object type being created"""
     for char in characters:
@@ -136,13 +305,15 @@ def init_characters(characters):
         text = characters[char]['text']
         internal_name = char
 
-        new_character = character.Character(desc, name, internal_name, text=text)
+        new_character = character.Character(desc, name, internal_name, text=text, world=world)
+        new_character.aliases = characters[char].get('aliases')
+        new_character.movement = characters[char].get('movement')
+        symbols['Character'][internal_name] = new_character
 
-        fill_inventory(new_character, 'Item', characters, char)
-        fill_inventory(new_character, 'Key', characters, char)
+        fill_inventory(new_character, characters, char, symbols, dangling)
 
 
-def init_player(players, chosen_player_name):
+def init_player(players, chosen_player_name, symbols, dangling, world):
     """Goes through all characters defined in JSON and creates objects from them. Almost the same as 'init_player',
     apart from the object type being created"""
     # for-loop will only be run once because there is only one player, but who knows what happens in the future.
@@ -154,33 +325,32 @@ def init_player(players, chosen_player_name):
         money = int(players[char]['money'])
         internal_name = char
 
-        new_player = character.Player(desc, name, internal_name, money=money)
+        new_player = character.Player(desc, name, internal_name, money=money, world=world)
+        symbols['Player'][internal_name] = new_player
 
-        fill_inventory(new_player, 'Item', players, char)
-        fill_inventory(new_player, 'Key', players, char)
+        fill_inventory(new_player, players, char, symbols, dangling)
 
 
-def init_containers(containers):
+def init_containers(containers, symbols, dangling, world):
     """Goes through all barriers defined in JSON and creates objects from them."""
     for container in containers:
         this_key = None
-        for key in components.Component.get_all_components()['Key']:
-            if key.internal_name == containers[container]['key']:
-                this_key = key
+        if containers[container]['key'] != '':
+            this_key = resolve(symbols, 'Key', containers[container]['key'], f'Container "{container}"', dangling)
         desc = containers[container]['description']
         name = containers[container]['name']
         internal_name = container
 
-        new_container = inventory.Container(this_key, desc, name, internal_name)
-        fill_inventory(new_container, 'Item', containers, container)
-        fill_inventory(new_container, 'Key', containers, container)
+        new_container = inventory.Container(this_key, desc, name, internal_name, world=world)
+        new_container.aliases = containers[container].get('aliases')
+        symbols['Container'][internal_name] = new_container
+        fill_inventory(new_container, containers, container, symbols, dangling)
 
 
-def fill_inventory(inventory_obj, item_type: str, json_segment, inv_str):
+def fill_inventory(inventory_obj, json_segment, inv_str, symbols, dangling):
     """Fills inventory with all items specified in JSON. 'inventory_obj' can also be a character because they share the
-    same methods. 'item_type' parameter to distinguish between regular items and sub-items like keys. 'json_segment'
-    is the characters (plural) json segment and 'inv_str' is the string of the specific character that gets their
-    inventory filled."""
+    same methods. 'json_segment' is the characters (plural) json segment and 'inv_str' is the string of the specific
+    character that gets their inventory filled. Entries are looked up as regular items first, then as keys."""
     for target_item in json_segment[inv_str]['inventory']:
         amount = 1
         # check if an amount has been given in json in format "item_name(amount)"
@@ -188,36 +358,34 @@ def fill_inventory(inventory_obj, item_type: str, json_segment, inv_str):
             index = target_item.index('(')
             amount = int(target_item[index+1:-1])
             target_item = target_item[0:index]
-        for actual_item in components.Component.get_all_components()[item_type]:
-            if actual_item.internal_name == target_item:
-                # add item to inventory as many times as specified. Default is 1
-                for i in range(amount):
-                    inventory_obj.add_item(actual_item)
-
-
-def set_locations(init_json):
-    """Sets locations to the objects as defined in JSON by looping through existing objects and checking corresponding
-    fields in JSON"""
-    # loop through component types in '_all_components' list in components.py
-    for component_type in components.Component.get_all_components():
-        # Items and Keys don't have a location
-        if component_type == 'Item' or component_type == 'Key':
-            continue
-        # loop through components of component type
-        for component in components.Component.get_all_components()[component_type]:
+        actual_item = symbols['Item'].get(target_item, symbols['Key'].get(target_item))
+        if actual_item is None:
+            dangling.append(f'Inventory of "{inv_str}" references unknown Item or Key "{target_item}"')
+        else:
+            # add the specified amount of the item to the inventory at once. Default is 1
+            inventory_obj.add_item(actual_item, amount)
+
+
+def set_locations(init_json, symbols, dangling):
+    """Sets locations to the objects as defined in JSON by looking up the location's internal_name of every component
+    in the symbol table"""
+    # Items and Keys don't have a location
+    for component_type in ('Character', 'Player', 'Container'):
+        for component in symbols[component_type].values():
             # setting variable to make code more readable. Contains the path to the location internal_name field in
             #  JSON of the particular component
             loc_json = init_json[component_type][component.internal_name]['location']
 
             # checks if a locations should be set or JSON field is set to "None"
             if loc_json != 'None':
-                # loops through existing locations
-                for location in locations.Location.get_all_locations():
-                    # checks if current location in loop is the one defined in JSON and if so, sets it on component.
-                    if location.internal_name == loc_json:
-                        component.location = location
+                component.location = resolve(symbols, 'Location', loc_json,
+                                             f'{component_type} "{component.internal_name}"', dangling)
 
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s -- %(levelname)s -- %(module)s -- %(message)s')
-    initialize('Janik')
+    # 'py -m src.config compile' writes the world snapshot, otherwise the JSON is loaded for debugging
+    if sys.argv[1:] == ['compile']:
+        compile_world()
+    else:
+        initialize('Janik')
@@ -0,0 +1,246 @@
+"""Merchant economy. The stock and prices of all merchants are kept in NumPy arrays, so a tick updates every merchant
+at once in a few array operations instead of looping over the merchants in Python. The arrays have an entry for every
+item a merchant deals in, grouped by merchant like the rows of a merchant x item table; items a merchant doesn't deal in
+take no space and no time. While a world has an economy, merchants sell from its stock at its prices, their inventories
+stay as they were loaded. Sales and ticks are recorded in the world's saved game. Needs NumPy, which is only imported
+when an economy is started."""
+import logging
+import time
+
+import numpy as np
+
+from .inventory import TransferError
+
+log = logging.getLogger(__name__)
+
+# Commands run in the world between two ticks
+COMMANDS_PER_TICK = 10
+# Share of its missing stock a merchant gets back every tick, rounded up to whole pieces
+RESTOCK_SHARE = 0.1
+# How strongly prices follow supply and demand in a tick. Missing all of the target stock, or having sold that much
+# since the last tick, raises a price by this share.
+PRICE_DRIFT = 0.05
+# Share of the difference to the base price a price goes back every tick, so prices settle once nothing happens
+PRICE_REVERSION = 0.02
+# Prices stay between these factors of the item's base price
+MIN_PRICE_FACTOR = 0.5
+MAX_PRICE_FACTOR = 4.0
+
+
+class EconomyError(Exception):
+    """Raised when an economy can't be started for a world."""
+    pass
+
+
+class Economy:
+
+    def __init__(self, merchants: list, items: list, rows, columns, amounts, base_prices,
+                 commands_per_tick=COMMANDS_PER_TICK):
+        """Constructor for Economy. Takes the merchants and items traded, the merchant (row) and item (column) numbers
+        of all items the merchants deal in together with the amount each merchant has at the start, which is also the
+        stock they restock to, and the base price of every item. Prices start at the base prices. A tick is done every
+        'commands_per_tick' commands."""
+        self.merchant_index = {merchant: i for i, merchant in enumerate(merchants)}
+        self.items = list(items)
+        self.item_index = {item: j for j, item in enumerate(self.items)}
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int32)
+        order = np.lexsort((columns, rows))
+        # The entries of merchant i are the ones from row_starts[i] to row_starts[i + 1], ordered by their item column.
+        self.row_starts = np.searchsorted(rows[order], np.arange(len(merchants) + 1))
+        self.columns = columns[order]
+        # All other arrays are float32, mixing types would make NumPy convert the values in every operation. Counts are
+        # exact up to 2 ** 24 in float32.
+        self.target_stock = np.asarray(amounts, dtype=np.float32)[order]
+        self.stock = self.target_stock.copy()
+        self.base_prices = np.asarray(base_prices, dtype=np.float32)[self.columns]
+        self.prices = self.base_prices.copy()
+        # reused by every tick, so ticks don't allocate arrays
+        self._work = np.empty_like(self.prices)
+        # entry -> pieces sold to players since the last tick. Only few of all merchants sell something between two
+        # ticks, so the sales are added to the arrays one by one.
+        self.sold = {}
+        self.commands_per_tick = commands_per_tick
+        self.commands = 0
+        self.ticks = 0
+        # World whose SaveGame records the sales and ticks, set by 'start_economy'
+        self.world = None
+
+    def tick(self):
+        """Advances the economy by one step. Every price is multiplied with 1 + PRICE_DRIFT * (missing + sold) / target,
+        so it rises while the merchant is short of the item or sells it well and falls while they have more than they
+        want, and goes back a bit towards the base price. Then the stock of every merchant moves a share of the way
+        back to the target."""
+        work = self._work
+        prices = self.prices
+        np.subtract(self.target_stock, self.stock, out=work)
+        if len(self.sold) > 0:
+            np.add.at(work, list(self.sold), list(self.sold.values()))
+            self.sold.clear()
+        # every entry has a target of at least 1, items a merchant doesn't deal in have no entry
+        work /= self.target_stock
+        work *= PRICE_DRIFT
+        work += 1 - PRICE_REVERSION
+        prices *= work
+        np.multiply(self.base_prices, PRICE_REVERSION, out=work)
+        prices += work
+        np.multiply(self.base_prices, MIN_PRICE_FACTOR, out=work)
+        np.maximum(prices, work, out=prices)
+        np.multiply(self.base_prices, MAX_PRICE_FACTOR, out=work)
+        np.minimum(prices, work, out=prices)
+
+        np.subtract(self.target_stock, self.stock, out=work)
+        work *= RESTOCK_SHARE
+        np.ceil(work, out=work)
+        self.stock += work
+        self.ticks += 1
+        journal = self.__get_journal()
+        if journal is not None:
+            # a tick only depends on the state before it, so the number of the tick is enough to repeat it
+            journal.record_economy_tick(self.ticks)
+
+    def count_command(self, metrics=None):
+        """Counts a command run in the world and does a tick every 'commands_per_tick' commands. The time of the tick is
+        added to the metrics, if given."""
+        self.commands += 1
+        if self.commands % self.commands_per_tick != 0:
+            return
+        start = time.perf_counter()
+        self.tick()
+        if metrics is not None:
+            metrics.observe('economy_tick', time.perf_counter() - start)
+
+    def __get_entry(self, merchant, item):
+        """Returns the number of the array entry of the merchant and item, or None if the merchant doesn't deal in the
+        item."""
+        i = self.merchant_index[merchant]
+        j = self.item_index.get(item)
+        if j is None:
+            return None
+        start = int(self.row_starts[i])
+        end = int(self.row_starts[i + 1])
+        entry = start + int(np.searchsorted(self.columns[start:end], j))
+        if entry < end and self.columns[entry] == j:
+            return entry
+        return None
+
+    def get_stock(self, merchant, item):
+        """Returns how many pieces of the item the merchant has for sale, or None if the merchant is not part of the
+        economy."""
+        if merchant not in self.merchant_index:
+            return None
+        entry = self.__get_entry(merchant, item)
+        return 0 if entry is None else int(self.stock[entry])
+
+    def get_price(self, merchant, item):
+        """Returns the price in whole coins the merchant asks for one piece of the item, or None if the merchant isn't
+        part of the economy or doesn't deal in the item."""
+        if merchant not in self.merchant_index:
+            return None
+        entry = self.__get_entry(merchant, item)
+        return None if entry is None else int(round(float(self.prices[entry])))
+
+    def get_listing(self, merchant):
+        """Returns the [Item, amount] lists of everything the merchant has for sale, in the order of the items' internal
+        names, and the list of their prices. Returns None if the merchant is not part of the economy."""
+        i = self.merchant_index.get(merchant)
+        if i is None:
+            return None
+        entries = self.row_starts[i] + np.flatnonzero(self.stock[self.row_starts[i]:self.row_starts[i + 1]] > 0)
+        inv_list = [[self.items[j], int(amount)]
+                    for j, amount in zip(self.columns[entries].tolist(), self.stock[entries].tolist())]
+        prices = [int(round(price)) for price in self.prices[entries].tolist()]
+        return inv_list, prices
+
+    def sell(self, merchant, item, amount: int):
+        """Takes pieces the merchant sold to a player from their stock. The sale raises the price at the next tick.
+        Raises TransferError if the merchant doesn't have that many."""
+        entry = self.__get_entry(merchant, item)
+        available = 0 if entry is None else int(self.stock[entry])
+        if available < amount:
+            raise TransferError(item, amount, available)
+        self.stock[entry] -= amount
+        self.sold[entry] = self.sold.get(entry, 0) + amount
+        self.__record_entry(merchant, item, entry)
+
+    def cancel_sale(self, merchant, item, amount: int):
+        """Gives the merchant back the pieces of a sale that could not be completed, as if it never happened."""
+        entry = self.__get_entry(merchant, item)
+        self.stock[entry] += amount
+        sold = self.sold.get(entry, 0) - amount
+        if sold > 0:
+            self.sold[entry] = sold
+        else:
+            self.sold.pop(entry, None)
+        self.__record_entry(merchant, item, entry)
+
+    def get_changed_entries(self) -> list:
+        """Returns a (merchant, item, stock, sold, price) tuple for every entry that is no longer as it was when the
+        economy was started, which together with the world's JSON is its complete state."""
+        changed = (self.stock != self.target_stock) | (self.prices != self.base_prices)
+        changed[list(self.sold)] = True
+        entries = np.flatnonzero(changed)
+        merchants = list(self.merchant_index)
+        rows = np.searchsorted(self.row_starts, entries, side='right') - 1
+        return [(merchants[i], self.items[j], int(stock), self.sold.get(entry, 0), price)
+                for entry, i, j, stock, price in zip(entries.tolist(), rows.tolist(), self.columns[entries].tolist(),
+                                                     self.stock[entries].tolist(), self.prices[entries].tolist())]
+
+    def set_entry(self, merchant, item, stock: int, sold: int, price: float):
+        """Sets the stock, the pieces sold since the last tick and the price of an entry, e.g. when a saved game is
+        restored. Raises EconomyError if the merchant doesn't deal in the item."""
+        entry = self.__get_entry(merchant, item) if merchant in self.merchant_index else None
+        if entry is None:
+            raise EconomyError(f'{merchant.internal_name} does not deal in {item.internal_name}.')
+        self.stock[entry] = stock
+        self.prices[entry] = price
+        if sold > 0:
+            self.sold[entry] = sold
+        else:
+            self.sold.pop(entry, None)
+
+    def repeat_tick(self, number: int):
+        """Does the tick with the given number again, e.g. when a saved game is restored. Ticks that were already done
+        are skipped."""
+        if self.ticks < number:
+            self.ticks = number - 1
+            self.tick()
+
+    def __record_entry(self, merchant, item, entry: int):
+        """Records the new state of an entry in the world's SaveGame, if the game is saved."""
+        journal = self.__get_journal()
+        if journal is not None:
+            journal.record_economy(merchant, item, int(self.stock[entry]), self.sold.get(entry, 0),
+                                   float(self.prices[entry]))
+
+    def __get_journal(self):
+        """Returns the SaveGame recording the world's changes, None if there is none."""
+        return self.world.get_journal() if self.world is not None else None
+
+
+def start_economy(world, commands_per_tick=COMMANDS_PER_TICK) -> Economy:
+    """Creates an economy for all merchants of the world, dealing in the items they have when it is started, and sets it
+    as the world's economy. Raises EconomyError for a world split into regions, whose merchants are not all loaded."""
+    if world.regions is not None:
+        raise EconomyError('The economy needs the whole world loaded, it can\'t be run in a world split into regions.')
+    merchants = list(world.get_all_components()['Character'])
+    items = {}
+    for merchant in merchants:
+        for item_w_amount in merchant.inventory.inventory_list:
+            items[item_w_amount[0].internal_name] = item_w_amount[0]
+    # columns in the order of the internal names, so listings come out in the same order as inventories
+    items = [items[internal_name] for internal_name in sorted(items)]
+    item_columns = {item: j for j, item in enumerate(items)}
+    rows = []
+    columns = []
+    amounts = []
+    for i, merchant in enumerate(merchants):
+        for item_w_amount in merchant.inventory.inventory_list:
+            rows.append(i)
+            columns.append(item_columns[item_w_amount[0]])
+            amounts.append(item_w_amount[1])
+    world.economy = Economy(merchants, items, rows, columns, amounts, [item.price for item in items],
+                            commands_per_tick)
+    world.economy.world = world
+    log.debug(f'Economy started with {len(merchants)} merchants and {len(items)} items.')
+    return world.economy
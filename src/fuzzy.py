@@ -0,0 +1,161 @@
+"""Typo-tolerant name lookup. A FuzzyIndex is built over the names of a small set of objects, usually those the player
+can see, and finds the names a typed text is a prefix of (with a trie) or is only a few typos away from (with a
+BK-tree, which only compares the text with a few of the names)."""
+import functools
+import logging
+
+log = logging.getLogger(__name__)
+
+# Typed texts shorter than this are not completed, too many names would start with them
+MIN_PREFIX_LENGTH = 3
+# Most suggestions shown to the player
+MAX_SUGGESTIONS = 3
+
+
+def get_edit_distance(first: str, second: str, max_distance: int) -> int:
+    """Returns the Levenshtein distance of the two texts: the number of characters that have to be inserted, removed
+    or replaced to turn one into the other. Stops once it is clear the distance is larger than 'max_distance' and
+    returns 'max_distance' + 1 then."""
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    # names often only differ in the middle, e.g. 'chest 10' and 'chest 12', equal ends cost nothing
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    end = 0
+    while end < len(first) - start and end < len(second) - start and first[-1 - end] == second[-1 - end]:
+        end += 1
+    first = first[start:len(first) - end]
+    second = second[start:len(second) - end]
+
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        smallest = i
+        for j, second_char in enumerate(second):
+            # replacing (or keeping) the character, removing it or inserting one
+            distance = previous[j] if first_char == second_char else previous[j] + 1
+            if previous[j + 1] + 1 < distance:
+                distance = previous[j + 1] + 1
+            if current[j] + 1 < distance:
+                distance = current[j] + 1
+            current.append(distance)
+            if distance < smallest:
+                smallest = distance
+        if smallest > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def get_max_distance(text: str) -> int:
+    """Returns how many typos are tolerated in a typed text of this length."""
+    if len(text) <= 4:
+        return 1
+    return 2
+
+
+class Trie:
+
+    def __init__(self):
+        """Constructor for Trie. Every node is a dict of the following characters to the next nodes, the names whose
+        key ends at a node are stored in a dict used as an ordered set under the key None."""
+        self.root = {}
+
+    def add(self, key: str, name: str):
+        """Adds a name that is found by the prefixes of the key."""
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, {})[name] = None
+
+    def get_completions(self, prefix: str) -> list:
+        """Returns all names with a key starting with the prefix, shortest first."""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        names = set()
+        nodes = [node]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            for char, child in node.items():
+                if char is None:
+                    names.update(child)
+                else:
+                    nodes.append(child)
+        return sorted(names, key=lambda name: (len(name), name))
+
+
+class BKTree:
+
+    def __init__(self):
+        """Constructor for BKTree. Every node is a (name, children) tuple, the children being a dict of the edit
+        distance to the node's name to the child node. All names under a child have that distance to the node's
+        name, so by the triangle inequality only the children close to the searched distance need to be looked at."""
+        self.root = None
+
+    def add(self, name: str):
+        """Adds a name."""
+        if self.root is None:
+            self.root = (name, {})
+            return
+        node = self.root
+        while True:
+            distance = get_edit_distance(name, node[0], len(name) + len(node[0]))
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (name, {})
+                return
+            node = child
+
+    def search(self, text: str, max_distance: int) -> list:
+        """Returns (distance, name) tuples of all names at most 'max_distance' edits away from the text, closest
+        first."""
+        found = []
+        nodes = [] if self.root is None else [self.root]
+        while len(nodes) > 0:
+            name, children = nodes.pop()
+            # the exact distance is needed to pick the children, so the search isn't cut off at 'max_distance'
+            distance = get_edit_distance(text, name, len(text) + len(name))
+            if distance <= max_distance:
+                found.append((distance, name))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    nodes.append(child)
+        return sorted(found)
+
+
+class FuzzyIndex:
+
+    def __init__(self, names):
+        """Constructor for FuzzyIndex. Takes the case-folded names to index. A name can be completed from the start of
+        any of its words, e.g. 'rusty key' from 'rus' as well as from 'key'."""
+        self.trie = Trie()
+        self.bk_tree = BKTree()
+        for name in names:
+            words = name.split(' ')
+            for i in range(len(words)):
+                self.trie.add(' '.join(words[i:]), name)
+            self.bk_tree.add(name)
+
+    def get_completions(self, prefix: str) -> list:
+        """Returns the names with a word starting with the case-folded prefix, the prefix may go on over the following
+        words. Returns none for prefixes too short to complete."""
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+        return self.trie.get_completions(prefix)
+
+    def get_suggestions(self, text: str) -> list:
+        """Returns the names a few typos away from the case-folded text, closest first."""
+        return [name for distance, name in self.bk_tree.search(text, get_max_distance(text))][:MAX_SUGGESTIONS]
+
+
+@functools.lru_cache(maxsize=256)
+def get_index(names: frozenset) -> FuzzyIndex:
+    """Returns the FuzzyIndex of the names. The same names are seen from a location until something there changes,
+    so the most recent indexes are cached."""
+    return FuzzyIndex(names)
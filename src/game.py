@@ -1,29 +1,147 @@
 from .commands import Command
 from . import config
+from . import output
+from .replay import EventLog
+from .savegame import SaveGame
 import logging
+import os
+import sys
 import time
 
 log = logging.getLogger(__name__)
 
 
-def start_text_adventure():
+def start_text_adventure(save_dir=None, event_file=None, profiler=None, economy_interval=None, npc_interval=None):
+    """Runs the game until the player stops it. If a directory is given, the game is saved there after every command
+    and a player coming back with the same name continues where they stopped. If an event file is given, all commands
+    are recorded in it for replaying the game later. If a Profiler is given, loading the world and every command are
+    profiled. If an economy interval is given, the merchants' economy ticks every that many commands. If an NPC interval
+    is given, characters with a movement move every that many commands."""
     log.debug('Game function started.')
-    time.sleep(0.1)
     player_name = input('Enter your Name: ')
-    config.initialize(player_name)
-    log.warning(config.welcome(player_name))
+    if profiler is not None:
+        world = profiler.call('load_world', config.load_world, player_name)
+    else:
+        world = config.load_world(player_name)
+    if economy_interval is not None:
+        start_economy(world, economy_interval, event_file)
+    output.write(config.welcome(player_name))
 
-    # Game Loop
-    while True:
-        time.sleep(0.1)  # Needed to make sure the Enter Command message is shown after log messages.
-        command = enter_command()
-        command.analyze()
+    save_game = None
+    if save_dir is not None:
+        os.makedirs(save_dir, exist_ok=True)
+        save_game = SaveGame(world, config.get_save_file(player_name, save_dir), config.get_world_hash())
+        if save_game.restore():
+            output.write('Your saved game has been loaded, you continue where you stopped.')
+            if event_file is not None:
+                # a replay starts from the world as it is loaded, not from the saved game
+                log.warning(f'Game continues from a save, commands are not recorded in {event_file}.')
+                event_file = None
+        save_game.attach()
+    if npc_interval is not None:
+        # started after restoring, characters go on from where the saved game has them
+        start_simulation(world, npc_interval, event_file)
+    output.flush()
 
+    event_log = None
+    if event_file is not None:
+        event_log = EventLog(event_file, config.get_world_hash(), player_name)
 
-def enter_command():
-    """Returns the command object"""
     try:
-        command = Command(input('\nEnter Command: '))
+        # Game Loop
+        while True:
+            command = enter_command(world)
+            if event_log is not None:
+                event_log.record_command(command.line)
+            if profiler is not None:
+                profiler.run_command(command)
+            else:
+                command.analyze()
+            if save_game is not None:
+                save_game.save()
+    finally:
+        if save_game is not None:
+            save_game.close()
+        if event_log is not None:
+            event_log.close(world)
+
+
+def run_batch(player_name, command_lines, init_file=config.INIT_FILE, snapshot_file=config.SNAPSHOT_FILE,
+              event_file=None, metrics_interval=None, profiler=None, max_regions=config.MAX_REGIONS,
+              spill_dir=None, economy_interval=None, npc_interval=None) -> list:
+    """Runs commands without asking for input. Takes the player's name and an iterable of command lines. Returns a
+    list with a (command line, seconds) tuple for every command that was run. Stops early when a command ends the
+    game. If an event file is given, the commands are recorded in it. If a metrics interval is given, the world's
+    metrics are written to stderr every that many seconds and when the commands are done. If a Profiler is given,
+    loading the world and every command are profiled. 'max_regions' and 'spill_dir' are used if 'init_file' is a
+    world split into regions. If an economy interval is given, the merchants' economy ticks every that many
+    commands, if an NPC interval is given, characters with a movement move every that many commands."""
+    timings = []
+    event_log = None
+    if profiler is not None:
+        world = profiler.call('load_world', config.load_world, player_name, init_file, snapshot_file, max_regions,
+                              spill_dir)
+    else:
+        world = config.load_world(player_name, init_file, snapshot_file, max_regions, spill_dir)
+    with world:
+        if economy_interval is not None:
+            start_economy(world, economy_interval, event_file)
+        if npc_interval is not None:
+            start_simulation(world, npc_interval, event_file)
+        if metrics_interval is not None:
+            world.metrics.set_dump(sys.stderr, metrics_interval)
+        output.write(config.welcome(player_name))
+        output.flush()
+        if event_file is not None:
+            event_log = EventLog(event_file, config.get_world_hash(init_file), player_name)
+
+        try:
+            for line in command_lines:
+                line = line.rstrip('\n')
+                if line.strip() == '':
+                    continue
+                if event_log is not None:
+                    event_log.record_command(line)
+                start = time.perf_counter()
+                try:
+                    if profiler is not None:
+                        profiler.run_command(Command(line, world))
+                    else:
+                        Command(line, world).analyze()
+                except SystemExit:
+                    timings.append((line, time.perf_counter() - start))
+                    break
+                timings.append((line, time.perf_counter() - start))
+        finally:
+            if event_log is not None:
+                event_log.close(world)
+            if metrics_interval is not None:
+                print(world.metrics.format_text(world), file=sys.stderr)
+    return timings
+
+
+def start_economy(world, economy_interval: int, event_file=None):
+    """Starts the merchants' economy of the world. NumPy is only needed, and imported, if it is started."""
+    from . import economy
+    economy.start_economy(world, economy_interval)
+    if event_file is not None:
+        # replays run without the economy, merchants' stock and prices would differ
+        log.warning(f'The economy is not recorded in {event_file}, a replay will not match the game.')
+
+
+def start_simulation(world, npc_interval: int, event_file=None):
+    """Starts moving the characters of the world. NumPy is only needed, and imported, if it is started."""
+    from . import npcs
+    npcs.start_simulation(world, npc_interval)
+    if event_file is not None:
+        # replays run without the simulation, characters would be elsewhere
+        log.warning(f'Moving characters are not recorded in {event_file}, a replay will not match the game.')
+
+
+def enter_command(world):
+    """Returns the command object for the given World"""
+    try:
+        command = Command(input('\nEnter Command: '), world)
         return command
     except KeyboardInterrupt:
         exit('Game stopped by Keyboard Interrupt')
@@ -1,164 +1,235 @@
 from .components import Item, Component
 from .locations import Lock
 from . import config
+from . import output
 import logging
 
 log = logging.getLogger(__name__)
 
 
-class Inventory:
+class TransferError(Exception):
+    """Raised when items can't be moved because the source doesn't have enough of them. Nothing was moved then."""
 
-    def __init__(self):
-        """Constructor for Inventory. Inventory list contains lists of length 2, each with an Item Object and the
-        stored amount."""
+    def __init__(self, item_obj: Item, amount: int, available: int):
+        super().__init__(f'Cannot move {amount} {item_obj.internal_name}, only {available} available.')
+        self.item_obj = item_obj
+        self.amount = amount
+        self.available = available
+
+
+class ItemStacks:
+    __slots__ = ('stacks', 'sorted_list', 'version')
+
+    def __init__(self, stacks=None):
+        """Constructor for ItemStacks, the content of an inventory. Items are stored in a dict keyed by their internal
+        name, each value is a list of length 2 with the Item Object and the stored amount. The alphabetical list is
+        only built on demand. The version is increased on every change, texts rendered from the content are cached
+        with it."""
+        self.stacks = {} if stacks is None else stacks
+        self.sorted_list = None
+        self.version = 0
+
+    def copy(self) -> 'ItemStacks':
+        """Returns a copy whose amounts can be changed without changing this one."""
+        return ItemStacks({name: [stack[0], stack[1]] for name, stack in self.stacks.items()})
+
+
+class BaseInventory:
+    # All methods of an inventory, without any attributes of its own. This way both the plain 'Inventory' and
+    # 'Container', which also is a Component, can store their attributes in slots.
+    __slots__ = ()
+
+    def __init__(self, world=None):
+        """Constructor for Inventory. Takes the World the inventory belongs to. The items themselves are stored in an
+        ItemStacks object, which a session's overlay replaces with its own copy once the session changes them."""
+        self.world = world
         self.inventory_list = []
 
+    def _get_stacks(self, for_change=False) -> ItemStacks:
+        """Returns the inventory's content as the current session's overlay sees it. If it is going to be changed, the
+        overlay gets its own copy first."""
+        overlay = self.world.overlay if self.world is not None else None
+        if overlay is None:
+            return self._stacks
+        stacks = overlay.inventories.get(self)
+        if stacks is None:
+            if not for_change:
+                return self._stacks
+            stacks = self._stacks.copy()
+            overlay.inventories[self] = stacks
+        return stacks
+
     @property
     def inventory_list(self) -> list:
-        """Returns the Inventory Object's Inventory list with dictionaries."""
-        return self._inventory
+        """Returns the Inventory Object's Inventory list, sorted alphabetically by internal name. The sorted list is
+        cached until an item is added to or removed from the inventory."""
+        stacks = self._get_stacks()
+        if stacks.sorted_list is None:
+            stacks.sorted_list = sorted(stacks.stacks.values(), key=lambda stack: stack[0].internal_name)
+        return stacks.sorted_list
 
     @inventory_list.setter
     def inventory_list(self, inventory):
-        """Initializes new empty list on object creation."""
-        self._inventory = inventory
+        """Initializes the inventory from a list of [Item, amount] lists, usually an empty one on object creation."""
+        self._stacks = ItemStacks()
+        for item_w_amount in inventory:
+            self._stacks.stacks[item_w_amount[0].internal_name] = item_w_amount
 
     def show_inventory(self, needs_price=False, component=None):
         """Returns an inventory as readable String. Takes Boolean as argument if Price should be added."""
         # Get the list from the Inventory object
         if len(self.inventory_list) > 0:
             # Create the String to be returned
-            print(self.__build_inv_string(self.inventory_list, needs_price, component))
+            output.write(self.__get_inv_string(needs_price, component))
         else:
-            print(f'{component.name}\'s inventory is empty :(')
+            output.write(f'{component.name}\'s inventory is empty :(')
 
     def add_item(self, item_obj: Item, amount=1):
         """Adds an item to the Inventory or increases an existing item's counter. Takes Item-Object and Amount as
         Integer as arguments."""
-        is_in_inventory = False
-        # go through the inventory list and look at the individual dictionaries
-        for existing_item in self.inventory_list:
-            if existing_item[0].internal_name == item_obj.internal_name:
-                pass
-            if existing_item[0].internal_name == item_obj.internal_name:
-                is_in_inventory = True
-                existing_item[1] += amount
-                log.debug(f'{item_obj.internal_name} is already in inventory. '
-                          f'Increasing counter to {existing_item[1]}.')
-
-        if not is_in_inventory and amount > 0:
-            # Inserting new item at the position determined by "__sort_inventory" method
-            new_item_w_amount = [item_obj, amount]
-            index = self.__sort_inventory(self.inventory_list, item_obj.internal_name)
-            self.inventory_list.insert(index, new_item_w_amount)
-            log.debug(f'Added {item_obj.internal_name} to inventory.')
-        elif amount <= 0:
+        if amount <= 0:
             log.error(f'Cannot add less than 1 {item_obj.internal_name}')
-            Inventory.error_inventory(f'Cannot add less than 1 {item_obj.internal_name}')
+            BaseInventory.error_inventory(f'Cannot add less than 1 {item_obj.internal_name}')
+            return
+
+        stacks = self._get_stacks(for_change=True)
+        existing_item = stacks.stacks.get(item_obj.internal_name)
+        if existing_item is not None:
+            existing_item[1] += amount
+            stacks.version += 1
+            log.debug(f'{item_obj.internal_name} is already in inventory. '
+                      f'Increasing counter to {existing_item[1]}.')
+        else:
+            stacks.stacks[item_obj.internal_name] = [item_obj, amount]
+            # the sorted list has to be rebuilt the next time it is needed
+            stacks.sorted_list = None
+            stacks.version += 1
+            log.debug(f'Added {item_obj.internal_name} to inventory.')
+        self.__record_amount(stacks, item_obj)
 
     def remove_item(self, item_obj: Item, amount=1):
         """Reduces an Inventory item's amount by specified amount, or removes it completely when exact amount exists.
         If too many items are to be removed, an Error is shown to the User. Takes Item-Object and Amount as Integer
         as arguments."""
-        # this list will contain the integer index that needs to be removed from _inventory
-        index_to_remove = []
-        item_names = []
-        for i in range(len(self.inventory_list)):
-            item_w_amount = self.inventory_list[i]
-            item_names.append(self.inventory_list[i][0].internal_name)
-            if item_w_amount[0].internal_name == item_obj.internal_name:
-                # Check if inventory contains enough items to remove, otherwise print error to user and break out.
-                if item_w_amount[1] - amount < 0:
-                    Inventory.error_inventory(f'Not enough {item_w_amount[0].internal_name} available!\n')
-                    log.info(f'Not enough {item_w_amount[0].internal_name} ro remove {amount}! Only '
-                             f'{item_w_amount[1]} available.')
-                    break
-                # If inventory contains exact amount of items, add item to local list to be removed from inventory
-                if item_w_amount[1] - amount < 1:
-                    log.debug(f'{item_w_amount[0].internal_name} marked for removal from inventory.')
-                    # Mark item for removal. Don't remove here or missing Index error might appear for following items
-                    index_to_remove.append(i)
-                # Remove the specified amount from inventory
-                else:
-                    item_w_amount[1] -= amount
-                    log.debug(f'Reducing counter of {item_w_amount[0].internal_name} by {amount} to '
-                              f'{item_w_amount[1]}.')
-
-        if item_names.count(item_obj.internal_name) < 1:
+        item_w_amount = self._get_stacks().stacks.get(item_obj.internal_name)
+        if item_w_amount is None:
             log.error(f'Cannot remove {item_obj.internal_name} from inventory, it does not exist.')
+            return
 
-        # Remove items that were marked for removal
-        if len(index_to_remove) > 0:
-            for i in index_to_remove:
-                log.debug(f'Removing {self.inventory_list[i][0].internal_name} from inventory.')
-                self.inventory_list.pop(i)
+        # Check if inventory contains enough items to remove, otherwise print error to user.
+        if item_w_amount[1] - amount < 0:
+            BaseInventory.error_inventory(f'Not enough {item_w_amount[0].internal_name} available!\n')
+            log.info(f'Not enough {item_w_amount[0].internal_name} ro remove {amount}! Only '
+                     f'{item_w_amount[1]} available.')
+            return
 
-    def __build_inv_string(self, inv_list, needs_price, component) -> str:
-        """Create the String, that shows the stored items to the Player. Takes Inventory's List-variable and Boolean
-        for the price as arguments."""
-        inventory_string = f'{component.name}\'s inventory:\n'
-        amount_str_length = 1
-        for inv in inv_list:
-            if len(str(inv[1])) > amount_str_length:
-                amount_str_length = len(str(inv[1]))
-        for i in range(len(inv_list)):
-            # Calculate number of blanks to be added at beginning of each line to make it look nice
-            blanks = ' ' * (len(str(len(inv_list))) - len(str(i+1)))
-            # Calculate number of blanks to be added before "Amount" to make it look nice
-            blanks2 = ' ' * (amount_str_length - len(str(inv_list[i][1])))
-            # Create new line for each item
-            line = ''
-            line += f'{blanks}{i + 1}) {blanks2}{inv_list[i][1]}x {inv_list[i][0].name}'
-            # Add price after a few blank spaces
-            if needs_price:
-                line = self.__add_price_str(line, inv_list[i])
-            # Add new Line at the end
-            inventory_string += f'{line}\n'
-        return inventory_string
+        stacks = self._get_stacks(for_change=True)
+        item_w_amount = stacks.stacks[item_obj.internal_name]
+        stacks.version += 1
+        # If inventory contains exact amount of items, remove the item completely
+        if item_w_amount[1] - amount < 1:
+            log.debug(f'Removing {item_w_amount[0].internal_name} from inventory.')
+            del stacks.stacks[item_obj.internal_name]
+            stacks.sorted_list = None
+        # Remove the specified amount from inventory
+        else:
+            item_w_amount[1] -= amount
+            log.debug(f'Reducing counter of {item_w_amount[0].internal_name} by {amount} to '
+                      f'{item_w_amount[1]}.')
+        self.__record_amount(stacks, item_obj)
 
-    @staticmethod
-    def __add_price_str(line, item_w_amount) -> str:
-        """Adds the price to each item in the inventory-return-String. Takes the String of a prepared line and one
-        component of the Inventory's List-variable (which is also a list) as arguments."""
-        # Length defined to align prices neatly underneath each other
-        length = 25 - len(str(item_w_amount[0].price))
-        while len(line) < length:
-            # Adding required amount of blank spaces, afterwards adding actual price
-            line += '_'
-        line += f'{item_w_amount[0].price} {config.CURRENCY}/piece'
-        return line
+    def set_item_amount(self, item_obj: Item, amount: int):
+        """Sets the amount of an item in the inventory, removing it when the amount is 0. Used when restoring a
+        saved game."""
+        stacks = self._get_stacks(for_change=True)
+        if amount <= 0:
+            stacks.stacks.pop(item_obj.internal_name, None)
+        elif item_obj.internal_name in stacks.stacks:
+            stacks.stacks[item_obj.internal_name][1] = amount
+        else:
+            stacks.stacks[item_obj.internal_name] = [item_obj, amount]
+        stacks.sorted_list = None
+        stacks.version += 1
+        self.__record_amount(stacks, item_obj)
+
+    def clear_items(self):
+        """Removes all items from the inventory."""
+        stacks = self._get_stacks(for_change=True)
+        stacks.stacks.clear()
+        stacks.sorted_list = None
+        stacks.version += 1
+        journal = self.world.get_journal() if self.world is not None else None
+        if journal is not None:
+            journal.record_clear(self)
+
+    def __record_amount(self, stacks: ItemStacks, item_obj: Item):
+        """Records the item's new amount in the journal, if the game is saved."""
+        journal = self.world.get_journal() if self.world is not None else None
+        if journal is not None:
+            item_w_amount = stacks.stacks.get(item_obj.internal_name)
+            journal.record_stack(self, item_obj, 0 if item_w_amount is None else item_w_amount[1])
+
+    @property
+    def version(self) -> int:
+        """Returns the version of the inventory's content as the current session's overlay sees it. Together with the
+        ItemStacks object it identifies the content, since every overlay has its own copy."""
+        return self._get_stacks().version
+
+    def get_render_key(self) -> tuple:
+        """Returns what identifies the inventory's content in render cache keys, including the names and prices of the
+        items through the render cache's item version."""
+        stacks = self._get_stacks()
+        return stacks, stacks.version, self.world.render_cache.item_version
+
+    def __get_inv_string(self, needs_price, component) -> str:
+        """Returns the inventory String from the world's render cache, building it only if the content, the price
+        display or the component's name changed since it was built."""
+        if self.world is None:
+            return self.__build_inv_string(self.inventory_list, needs_price, component)
+        key = ('inventory',) + self.get_render_key() + (needs_price, component.name)
+        inventory_string = self.world.render_cache.get(key)
+        if inventory_string is None:
+            inventory_string = self.__build_inv_string(self.inventory_list, needs_price, component)
+            self.world.render_cache.put(key, inventory_string)
+        return inventory_string
 
     @staticmethod
-    def __sort_inventory(inventory, new_item_name) -> int:
-        """Returns the inventory index where a new item should be inserted for alphabetical order. Takes Inventory's
-        List-variable and the name of a new Item as arguments."""
-        names = [new_item_name]
-        for item_w_amount in inventory:
-            names.append(item_w_amount[0].internal_name)
-        names.sort()
-        # log.debug(f'Inventory sorted after insert of {new_item_name}')
-        return names.index(new_item_name)
+    def __build_inv_string(inv_list, needs_price, component) -> str:
+        """Create the String, that shows the stored items to the Player. Takes Inventory's List-variable and Boolean
+        for the price as arguments."""
+        prices = [item_w_amount[0].price for item_w_amount in inv_list] if needs_price else None
+        return format_inventory(component.name, inv_list, prices)
 
     @staticmethod
     def error_inventory(message):
-        """Prints an error message to the player"""
-        print(message)
+        """Shows an error message to the player"""
+        output.write(message)
 
     def is_item_in_inventory(self, item) -> bool:
-        """Go through items in inventory. Can't check directly because inventory is a 2-dimensional list"""
-        for item_plus_amount in self.inventory_list:
-            if item in item_plus_amount:
-                return True
-        return False
+        """Looks the item up by its internal name and checks that the stored Item Object is the same one."""
+        item_w_amount = self._get_stacks().stacks.get(getattr(item, 'internal_name', None))
+        return item_w_amount is not None and item_w_amount[0] is item
+
+    def get_item_amount(self, item) -> int:
+        """Returns how many of the item are in the inventory, 0 if there are none."""
+        item_w_amount = self._get_stacks().stacks.get(getattr(item, 'internal_name', None))
+        if item_w_amount is None or item_w_amount[0] is not item:
+            return 0
+        return item_w_amount[1]
 
 
-class Container(Inventory, Component):
+class Inventory(BaseInventory):
+    __slots__ = ('world', '_stacks')
 
-    def __init__(self, key=None, description=None, name=None, internal_name=None, location=None):
+
+class Container(BaseInventory, Component):
+    __slots__ = ('_stacks', 'lock')
+
+    def __init__(self, key=None, description=None, name=None, internal_name=None, location=None, world=None):
         """Create a new Container with the needed key to unlock it"""
-        Inventory.__init__(self)
-        Component.__init__(self, description, name, internal_name, location)
-        self.lock = Lock(key)
+        BaseInventory.__init__(self, world)
+        Component.__init__(self, description, name, internal_name, location, world)
+        self.lock = Lock(key, world)
 
     def unlock(self, key):
         """Simply forwards to the 'Lock' class' method of the same name. Takes a key as parameter."""
@@ -169,3 +240,72 @@ class Container(Inventory, Component):
         """Sets container as the component for name-calling, then calls parent class's method."""
         component = self
         super(Container, self).show_inventory(needs_price, component)
+
+
+def format_inventory(owner_name: str, inv_list: list, prices=None) -> str:
+    """Create the String, that shows items to the Player. Takes the name of the owner, a list of [Item, amount] lists
+    and, if prices should be shown, a list with the price of each of them."""
+    inventory_string = f'{owner_name}\'s inventory:\n'
+    amount_str_length = 1
+    for inv in inv_list:
+        if len(str(inv[1])) > amount_str_length:
+            amount_str_length = len(str(inv[1]))
+    for i in range(len(inv_list)):
+        # Calculate number of blanks to be added at beginning of each line to make it look nice
+        blanks = ' ' * (len(str(len(inv_list))) - len(str(i+1)))
+        # Calculate number of blanks to be added before "Amount" to make it look nice
+        blanks2 = ' ' * (amount_str_length - len(str(inv_list[i][1])))
+        # Create new line for each item
+        line = ''
+        line += f'{blanks}{i + 1}) {blanks2}{inv_list[i][1]}x {inv_list[i][0].name}'
+        # Add price after a few blank spaces
+        if prices is not None:
+            line = add_price_str(line, prices[i])
+        # Add new Line at the end
+        inventory_string += f'{line}\n'
+    return inventory_string
+
+
+def add_price_str(line: str, price: int) -> str:
+    """Adds the price to a line of the inventory-return-String. Takes the String of a prepared line and the price as
+    arguments."""
+    # Length defined to align prices neatly underneath each other
+    length = 25 - len(str(price))
+    while len(line) < length:
+        # Adding required amount of blank spaces, afterwards adding actual price
+        line += '_'
+    line += f'{price} {config.CURRENCY}/piece'
+    return line
+
+
+def transfer(source, target, item_obj: Item, amount=1):
+    """Moves an amount of an item from one holder to another in one operation. Holders are inventories, containers and
+    characters, anything with 'get_item_amount', 'add_item' and 'remove_item'. Raises a TransferError if the source
+    doesn't have enough, nothing is moved then. If adding to the target fails, the items are put back into the source
+    before the error is passed on."""
+    available = source.get_item_amount(item_obj)
+    if amount < 1 or available < amount:
+        raise TransferError(item_obj, amount, available)
+    source.remove_item(item_obj, amount)
+    try:
+        target.add_item(item_obj, amount)
+    except Exception:
+        source.add_item(item_obj, amount)
+        raise
+
+
+def transfer_all(source, target) -> list:
+    """Moves every item of the source inventory or container to the target, each stack in one operation. Returns a
+    list of the moved [Item, amount] stacks. If one of them fails, the ones already moved are put back before the
+    error is passed on."""
+    moved = []
+    try:
+        # the list is replaced, not changed, when the source's content changes
+        for item_obj, amount in list(source.inventory_list):
+            transfer(source, target, item_obj, amount)
+            moved.append([item_obj, amount])
+    except Exception:
+        for item_obj, amount in reversed(moved):
+            transfer(target, source, item_obj, amount)
+        raise
+    return moved
@@ -1,33 +1,32 @@
 import logging
 from .base import Base
+from . import output
+from .texts import get_text
 
 log = logging.getLogger(__name__)
 
 
 class Barrier(Base):
-    # Class variable that contains all barriers in a list for easy referencing
-    _all_barriers = []
+    __slots__ = ()
 
-    def __init__(self, description=None, name=None, internal_name=None):
-        super().__init__(description, name, internal_name)
+    def __init__(self, description=None, name=None, internal_name=None, world=None):
+        super().__init__(description, name, internal_name, world)
 
-        Barrier._all_barriers.append(self)
-
-    @classmethod
-    def get_all_barriers(cls):
-        """Returns list with all Barriers in the game."""
-        return cls._all_barriers
+        if world is not None:
+            world.add_barrier(self)
 
 
 class Lock:
+    __slots__ = ('key', 'world', '_is_unlocked')
 
-    def __init__(self, key=None):
-        """Constructor for Lock. Initialize with the Key-Item needed to unlock."""
+    def __init__(self, key=None, world=None):
+        """Constructor for Lock. Initialize with the Key-Item needed to unlock and the World the lock belongs to."""
         from .components import Key
         if key is not None:
             assert isinstance(key, Key)
 
         self.key = key
+        self.world = world
 
         if key is None:
             self.is_unlocked = True
@@ -36,13 +35,23 @@ class Lock:
 
     @property
     def is_unlocked(self):
-        """Returns locked state of the lock"""
+        """Returns locked state of the lock, as the current session's overlay sees it"""
+        overlay = self.world.overlay if self.world is not None else None
+        if overlay is not None and self in overlay.locks:
+            return overlay.locks[self]
         return self._is_unlocked
 
     @is_unlocked.setter
     def is_unlocked(self, unlocked_bool):
-        """Sets new unlocked state"""
-        self._is_unlocked = unlocked_bool
+        """Sets new unlocked state, only for the current session if there is an overlay"""
+        overlay = self.world.overlay if self.world is not None else None
+        if overlay is not None:
+            overlay.locks[self] = unlocked_bool
+        else:
+            self._is_unlocked = unlocked_bool
+        journal = self.world.get_journal() if self.world is not None else None
+        if journal is not None:
+            journal.record_lock(self, unlocked_bool)
 
     def unlock(self, key, locked_obj):
         """Attempts to unlock a lock with a specific key."""
@@ -50,22 +59,23 @@ class Lock:
         assert isinstance(key, Key)
 
         if self.is_unlocked:
-            log.info(f'{type(self).__name__} is already unlocked')
+            output.write(f'{type(self).__name__} is already unlocked')
         else:
             # Check if the correct key is being used
             if self.key is key:
                 self.is_unlocked = True
-                log.info(f'{locked_obj.name} has been unlocked with {self.key.name}.')
+                output.write(f'{locked_obj.name} has been unlocked with {self.key.name}.')
             else:
-                log.warning(f'Wrong Key. {type(self).__name__} stays locked.')
+                output.write(f'Wrong Key. {type(self).__name__} stays locked.')
 
 
 class Door(Barrier):
+    __slots__ = ('lock',)
 
-    def __init__(self, key=None, description=None, name=None, internal_name=None):
+    def __init__(self, key=None, description=None, name=None, internal_name=None, world=None):
         """Constructor for Door(Barrier). Initialize with the Key-Item needed to unlock."""
-        Barrier.__init__(self, description, name, internal_name)
-        self.lock = Lock(key)
+        Barrier.__init__(self, description, name, internal_name, world)
+        self.lock = Lock(key, world)
 
     def is_unlocked(self):
         """Returns locked state of the lock"""
@@ -78,13 +88,19 @@ class Door(Barrier):
 
 
 class Location(Base):
-    # Class variable that contains all locations in a list. It is used to determine which location is adjacent to the
-    # current one, when a character goes through a door to provide the correct new location.
-    _all_locations = []
+    __slots__ = ('north_wall', 'south_wall', 'west_wall', 'east_wall', '_inv_description', 'inventory', '_version')
+    _opposite_walls = {
+        'north_wall': 'south_wall',
+        'south_wall': 'north_wall',
+        'west_wall': 'east_wall',
+        'east_wall': 'west_wall'
+    }
 
     def __init__(self, north_wall: Barrier, south_wall: Barrier, west_wall: Barrier, east_wall: Barrier,
-                 description=None, name=None, internal_name=None, inv_description=None):
-        super().__init__(description, name, internal_name)
+                 description=None, name=None, internal_name=None, inv_description=None, world=None):
+        # increased whenever one of the descriptions changes, the full description is cached with it
+        self._version = 0
+        super().__init__(description, name, internal_name, world)
         assert isinstance(north_wall, Barrier)  # if one is a Barrier, the others should be, too #goodEnough
         self.north_wall = north_wall
         self.south_wall = south_wall
@@ -93,13 +109,32 @@ class Location(Base):
         self.inv_description = inv_description
 
         from .inventory import Inventory
-        self.inventory = Inventory()
+        self.inventory = Inventory(world)
 
-        Location._all_locations.append(self)
+        if world is not None:
+            world.add_location(self)
 
     @property
     def description(self) -> str:
-        """Combines both description properties into one string"""
+        """Combines both description properties into one string. The result is taken from the world's render cache
+        as long as neither the descriptions nor the location's inventory changed."""
+        if self.world is None:
+            return self.__build_description()
+        key = ('location', self, self._version) + self.inventory.get_render_key()
+        full_desc = self.world.render_cache.get(key)
+        if full_desc is None:
+            full_desc = self.__build_description()
+            self.world.render_cache.put(key, full_desc)
+        return full_desc
+
+    @description.setter
+    def description(self, new_description):
+        """Sets new description for stuff"""
+        self._description = str(new_description)
+        self._version += 1
+
+    def __build_description(self) -> str:
+        """Builds the description from the location's description and the items in its inventory"""
         inv = self.inventory.inventory_list
         if len(inv) > 0:
             inv_desc = f'{self.inv_description} '
@@ -120,45 +155,39 @@ class Location(Base):
                     inv_desc += f', '
         else:
             inv_desc = f'There are no other items lying around in this location.'
-        full_desc = f'{self._description} {inv_desc}'
+        full_desc = f'{get_text(self, self._description)} {inv_desc}'
         return full_desc
 
-    @description.setter
-    def description(self, new_description):
-        """Sets new description for stuff"""
-        self._description = str(new_description)
-
     @property
     def inv_description(self):
         """Return description of second description. Start of the string that will show location's inventory."""
-        return self._inv_description
+        return get_text(self, self._inv_description)
 
     @inv_description.setter
     def inv_description(self, new_description2):
         """Sets description of second description. Start of the string that will show location's inventory."""
         self._inv_description = new_description2
+        self._version += 1
+
+    def get_doors(self) -> list:
+        """Returns the doors among the location's walls."""
+        return [wall for wall in (self.north_wall, self.south_wall, self.west_wall, self.east_wall)
+                if isinstance(wall, Door)]
 
     def get_adjacent_location(self, wall_in_direction) -> 'Location':
-        """Goes through the cls list-variable with all locations and checks which of those shares the passed
-        wall-parameter on its 'opposite' side."""
-
-        for loc in Location._all_locations:
-            if wall_in_direction == self.north_wall:
-                if wall_in_direction == loc.south_wall:
-                    return loc
-            elif wall_in_direction == self.south_wall:
-                if wall_in_direction == loc.north_wall:
-                    return loc
-            elif wall_in_direction == self.west_wall:
-                if wall_in_direction == loc.east_wall:
-                    return loc
-            else:
-                if wall_in_direction == loc.west_wall:
-                    return loc
+        """Looks up the locations sharing the passed wall-parameter in the world's door index and returns the one that
+        has it on its 'opposite' side."""
+        if wall_in_direction == self.north_wall:
+            opposite_side = Location._opposite_walls['north_wall']
+        elif wall_in_direction == self.south_wall:
+            opposite_side = Location._opposite_walls['south_wall']
+        elif wall_in_direction == self.west_wall:
+            opposite_side = Location._opposite_walls['west_wall']
+        else:
+            opposite_side = Location._opposite_walls['east_wall']
 
-        log.error('No location found!')
+        for loc, side in self.world.get_door_connections(wall_in_direction):
+            if side == opposite_side:
+                return loc
 
-    @classmethod
-    def get_all_locations(cls):
-        """Returns list with all Locations in the game."""
-        return cls._all_locations
+        log.error('No location found!')
@@ -0,0 +1,138 @@
+import bisect
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in seconds, from 1 microsecond to 10 seconds. Anything slower goes into an
+# extra bucket at the end.
+BUCKET_BOUNDS = tuple(factor * 10 ** exponent for exponent in range(-6, 1) for factor in (1, 2, 5)) + (10,)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        """Constructor for Histogram. Counts observed durations in fixed buckets, so recording one costs the same no
+        matter how many were recorded before and the memory used never grows."""
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """Adds a duration to the histogram."""
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def get_percentile(self, percent: float) -> float:
+        """Returns the upper bound of the bucket the given percentile falls into, in seconds."""
+        if self.count == 0:
+            return 0.0
+        needed = self.count * percent / 100
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= needed:
+                return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def get_snapshot(self) -> dict:
+        """Returns count, mean, 50th, 95th and 99th percentile and maximum in seconds, as well as the bucket counts."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count > 0 else 0.0,
+            'p50': self.get_percentile(50),
+            'p95': self.get_percentile(95),
+            'p99': self.get_percentile(99),
+            'max': self.max,
+            'buckets': list(self.buckets)
+        }
+
+
+class Metrics:
+
+    def __init__(self):
+        """Constructor for Metrics. Collects how long commands and their handlers take and counts notable events, e.g.
+        names the player typed that matched nothing. Recording only updates a few numbers, so it is always on. Gauges
+        like the number of objects are computed from the World when a snapshot is taken."""
+        # name -> Histogram, 'command' for whole commands and the handler names for the handlers
+        self.histograms = {}
+        # name -> count
+        self.counters = {}
+        # where the metrics are written to every 'dump_interval' seconds, see 'set_dump'
+        self.dump_stream = None
+        self.dump_interval = None
+        self.next_dump = None
+
+    def observe(self, name: str, seconds: float):
+        """Adds a duration to the histogram of the given name."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def count(self, name: str, amount=1):
+        """Increases the counter of the given name."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_dump(self, stream, interval: float):
+        """Writes the metrics as text to the stream every 'interval' seconds. The time is checked after every command,
+        so nothing is written while no commands are run. Pass None as stream to stop writing."""
+        self.dump_stream = stream
+        self.dump_interval = interval
+        self.next_dump = time.monotonic() + interval if stream is not None else None
+
+    def dump_if_due(self, world):
+        """Writes the metrics to the dump stream if the interval has passed."""
+        if self.next_dump is None or time.monotonic() < self.next_dump:
+            return
+        self.next_dump = time.monotonic() + self.dump_interval
+        self.dump_stream.write(self.format_text(world) + '\n')
+        self.dump_stream.flush()
+
+    def get_snapshot(self, world=None) -> dict:
+        """Returns all histograms, counters and, if a World is given, its gauges as one dict."""
+        return {
+            'time': time.time(),
+            'histograms': {name: histogram.get_snapshot() for name, histogram in self.histograms.items()},
+            'counters': dict(self.counters),
+            'gauges': get_gauges(world) if world is not None else {}
+        }
+
+    def format_text(self, world=None) -> str:
+        """Returns the metrics as readable text, durations in microseconds."""
+        snapshot = self.get_snapshot(world)
+        lines = [f'Metrics at {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot["time"]))}']
+        for name, figures in sorted(snapshot['histograms'].items()):
+            lines.append(f'  {name:<16} count {figures["count"]:8}   mean {figures["mean"] * 1e6:9.1f} us   '
+                         f'p95 <= {figures["p95"] * 1e6:9.0f} us   max {figures["max"] * 1e6:9.1f} us')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'  {name:<40} {value}')
+        for name, value in snapshot['gauges'].items():
+            lines.append(f'  {name:<40} {value}')
+        return '\n'.join(lines)
+
+
+def get_gauges(world) -> dict:
+    """Returns the number of objects of every type in the World and the number of item stacks in all inventories, as
+    the current session's overlay sees them, and the number of loaded regions of a split world. Looks at every
+    inventory, so it is only done for snapshots."""
+    gauges = {f'objects.{type_name}': len(objects) for type_name, objects in world.get_all_components().items()}
+    gauges['objects.Barrier'] = len(world.get_all_barriers())
+    gauges['objects.Location'] = len(world.get_all_locations())
+    stacks = 0
+    for location in world.get_all_locations():
+        stacks += len(location.inventory.inventory_list)
+    for type_name in ('Character', 'Player'):
+        for character in world.get_all_components()[type_name]:
+            stacks += len(character.inventory.inventory_list)
+    for container in world.get_all_components()['Container']:
+        stacks += len(container.inventory_list)
+    gauges['inventory_stacks'] = stacks
+    if world.regions is not None:
+        gauges['regions.loaded'] = len(world.regions.loaded)
+    return gauges
@@ -0,0 +1,331 @@
+"""NPC movement. Characters with a "movement" entry in the world's JSON wander around, patrol a route or follow a daily
+schedule while the world ticks. Their positions are kept as location numbers in a NumPy array, and all of them are moved
+at once by a few array operations over the graph of doors between the locations. Locked doors can't be passed. Only the
+characters that actually moved are then set to their new location, so 'Component.location', the occupant index and
+saved games always agree with the array. Needs NumPy, which is only imported when a simulation is started."""
+import logging
+import time
+
+import numpy as np
+
+from . import output
+from .components import move_components
+
+log = logging.getLogger(__name__)
+
+# Commands run in the world between two ticks
+COMMANDS_PER_TICK = 1
+# Ticks in a day of a schedule, schedule entries start at a tick from 0 to DAY_TICKS - 1
+DAY_TICKS = 100
+# Chance of a wandering character to move in a tick, if the JSON doesn't give one
+WANDER_CHANCE = 0.5
+MODES = ('wander', 'patrol', 'schedule')
+
+
+class SimulationError(Exception):
+    """Raised when a simulation can't be started for a world, e.g. because a route references an unknown location."""
+    pass
+
+
+class Simulation:
+
+    def __init__(self, world, seed=None, commands_per_tick=COMMANDS_PER_TICK):
+        """Constructor for Simulation. Builds the door graph of the world's locations and the positions and routes of
+        all characters with a movement. A tick is done every 'commands_per_tick' commands. The same seed makes
+        wandering characters take the same ways."""
+        self.world = world
+        self.rng = np.random.default_rng(seed)
+        self.commands_per_tick = commands_per_tick
+        self.commands = 0
+        self.ticks = 0
+        self.locations = list(world.get_all_locations())
+        self.location_ids = {location: i for i, location in enumerate(self.locations)}
+        self.__build_graph()
+        self.__build_npcs()
+
+    def __build_graph(self):
+        """Builds the edges between locations that share a door, each door gives one edge in both directions. The edges
+        leaving location i are the ones from edge_starts[i] to edge_starts[i + 1]."""
+        from .locations import Location
+        self.doors = []
+        # (door, lock) of every door that can be locked, they are the only ones that can change
+        self.locks = []
+        sources = []
+        targets = []
+        edge_doors = []
+        for door, connections in self.world.door_index.items():
+            door_id = len(self.doors)
+            self.doors.append(door)
+            if door.lock.key is not None:
+                self.locks.append((door_id, door.lock))
+            for location, side in connections:
+                for other_location, other_side in connections:
+                    if other_side == Location._opposite_walls[side]:
+                        sources.append(self.location_ids[location])
+                        targets.append(self.location_ids[other_location])
+                        edge_doors.append(door_id)
+        sources = np.array(sources, dtype=np.int32)
+        order = np.argsort(sources, kind='stable')
+        self.edge_starts = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(self.locations)))))
+        self.edge_targets = np.array(targets, dtype=np.int32)[order]
+        self.edge_doors = np.array(edge_doors, dtype=np.int32)[order]
+        # whether each door is open. The extra last entry is False, door number -1 stands for "no way on".
+        self.door_open = np.ones(len(self.doors) + 1, dtype=bool)
+        self.door_open[-1] = False
+        self.__update_doors()
+        # (from, to) -> list of (door, location) steps of a shortest way, see 'find_way'
+        self.ways = {}
+        self.__neighbours = None
+
+    def __build_npcs(self):
+        """Collects the characters with a movement and builds their arrays. Routes and schedules are turned into a way
+        through the door graph once, characters then only step along it. Raises SimulationError if a movement
+        references unknown locations or is invalid."""
+        locations_by_name = {location.internal_name: location for location in self.locations}
+        self.npcs = []
+        positions = []
+        wanderers = []
+        wander_chances = []
+        routes = []
+        way_locations = []
+        way_doors = []
+        way_legs = []
+        way_starts = []
+        loop_starts = []
+        leg_ticks = []
+        leg_starts = []
+        errors = []
+        for npc in self.world.get_all_components()['Character']:
+            movement = npc.movement
+            if movement is None:
+                continue
+            referrer = f'Movement of Character "{npc.internal_name}"'
+            if npc.location not in self.location_ids:
+                errors.append(f'{referrer} needs the character to be in a location')
+                continue
+            mode = movement.get('mode')
+            if mode not in MODES:
+                errors.append(f'{referrer} has unknown mode "{mode}", expected one of {", ".join(MODES)}')
+                continue
+            if mode == 'wander':
+                wanderers.append(len(self.npcs))
+                wander_chances.append(float(movement.get('chance', WANDER_CHANCE)))
+            else:
+                if mode == 'patrol':
+                    stops = [(None, name) for name in movement.get('route', [])]
+                else:
+                    stops = sorted((int(tick), name) for tick, name in movement.get('schedule', []))
+                    if any(tick < 0 or tick >= DAY_TICKS for tick, name in stops):
+                        errors.append(f'{referrer} has a schedule tick outside of 0 to {DAY_TICKS - 1}')
+                        continue
+                if len(stops) == 0:
+                    errors.append(f'{referrer} has no stops')
+                    continue
+                stop_ids = []
+                for tick, name in stops:
+                    location = locations_by_name.get(name)
+                    if location is None:
+                        errors.append(f'{referrer} references unknown Location "{name}"')
+                    else:
+                        stop_ids.append(self.location_ids[location])
+                if len(stop_ids) < len(stops):
+                    continue
+                way = self.__build_way(self.location_ids[npc.location], stop_ids, mode == 'schedule')
+                if way is None:
+                    errors.append(f'{referrer} has stops that can\'t be reached through doors')
+                    continue
+                routes.append(len(self.npcs))
+                way_starts.append(len(way_locations))
+                loop_starts.append(way[3])
+                way_locations.extend(way[0])
+                way_doors.extend(way[1])
+                way_legs.extend(way[2])
+                leg_starts.append(len(leg_ticks))
+                if mode == 'schedule':
+                    leg_ticks.extend(tick for tick, name in stops)
+            self.npcs.append(npc)
+            positions.append(self.location_ids[npc.location])
+        if len(errors) > 0:
+            summary = '\n'.join(errors)
+            raise SimulationError(f'{len(errors)} invalid movement(s):\n{summary}')
+
+        self.positions = np.array(positions, dtype=np.int32)
+        self.wanderers = np.array(wanderers, dtype=np.int64)
+        self.wander_chances = np.array(wander_chances, dtype=np.float64)
+        # Every character on a route walks along its own part of the way arrays, from its start to its end and then on
+        # from its loop start. The door of an entry leads to the next entry, the leg of an entry is the number of the
+        # schedule entry the character waits for there, or -1 if it walks on right away.
+        self.routes = np.array(routes, dtype=np.int64)
+        self.way_locations = np.array(way_locations, dtype=np.int32)
+        self.way_doors = np.array(way_doors, dtype=np.int32)
+        self.way_legs = np.array(way_legs, dtype=np.int32)
+        self.way_starts = np.array(way_starts, dtype=np.int64)
+        self.way_lengths = np.diff(np.append(self.way_starts, len(way_locations))).astype(np.int64)
+        self.loop_starts = np.array(loop_starts, dtype=np.int64)
+        self.way_positions = np.zeros(len(routes), dtype=np.int64)
+        # start ticks of the schedule entries of the characters on a route, patrols have none
+        self.leg_ticks = np.array(leg_ticks, dtype=np.int32)
+        self.leg_starts = np.array(leg_starts, dtype=np.int64)
+        self.leg_counts = np.diff(np.append(self.leg_starts, len(leg_ticks))).astype(np.int64)
+
+    def __build_way(self, start: int, stops: list, timed: bool):
+        """Returns the locations, doors and legs of the way from the start to the first stop, and from there from stop
+        to stop and back to the first one, together with the entry at which that loop starts. On a schedule the
+        character waits at every stop until the entry of the next stop has begun. Returns None if a stop can't be
+        reached."""
+        locations = [start]
+        doors = []
+        legs = [-1]
+        loop_start = None
+        for i in range(len(stops) + 1):
+            if i > 0 and timed:
+                legs[-1] = i % len(stops)
+            steps = self.find_way(locations[-1], stops[i % len(stops)])
+            if steps is None:
+                return None
+            for door, location in steps:
+                doors.append(door)
+                locations.append(location)
+                legs.append(-1)
+            if i == 0:
+                loop_start = len(locations) - 1
+        if len(locations) - 1 == loop_start:
+            # all stops are the same location, the character stays there
+            doors.append(-1)
+            legs[loop_start] = -1
+        else:
+            # the last entry is the first stop again, the door of the entry before leads there
+            locations.pop()
+            legs.pop()
+        return locations, doors, legs, loop_start
+
+    def find_way(self, start: int, target: int):
+        """Returns a shortest way between two locations as a list of (door, location) steps, found by a breadth-first
+        search through all doors, locked or not. Returns None if there is none. Ways are cached."""
+        way = self.ways.get((start, target))
+        if way is not None or (start, target) in self.ways:
+            return way
+        if self.__neighbours is None:
+            # reading single values from NumPy arrays is slow, the search uses lists of (door, location) edges
+            starts = self.edge_starts.tolist()
+            edges = list(zip(self.edge_doors.tolist(), self.edge_targets.tolist()))
+            self.__neighbours = [edges[starts[i]:starts[i + 1]] for i in range(len(self.locations))]
+        came_from = {start: None}
+        queue = [start]
+        for location in queue:
+            if location == target:
+                break
+            for door, next_location in self.__neighbours[location]:
+                if next_location not in came_from:
+                    came_from[next_location] = (door, location)
+                    queue.append(next_location)
+        if target not in came_from:
+            way = None
+        else:
+            way = []
+            location = target
+            while came_from[location] is not None:
+                door, previous = came_from[location]
+                way.append((door, location))
+                location = previous
+            way.reverse()
+        self.ways[start, target] = way
+        return way
+
+    def __update_doors(self):
+        """Reads the state of every door that can be locked, as the current session's overlay sees it."""
+        if len(self.locks) > 0:
+            door_ids = [door_id for door_id, lock in self.locks]
+            self.door_open[door_ids] = [lock.is_unlocked for door_id, lock in self.locks]
+
+    def tick(self) -> int:
+        """Moves the characters one step and returns how many moved."""
+        moved, targets, doors = self.advance()
+        self.apply_moves(moved, targets, doors)
+        return len(moved)
+
+    def advance(self) -> tuple:
+        """Decides where the characters go in this tick and advances the time. Wandering characters go through a
+        random door of their location with their chance, characters on a route go to the next location of their way
+        unless they wait for their schedule. Nobody goes through a locked door, they try again next tick. Returns
+        arrays of the numbers of the characters that move, of the locations they move to and of the doors they go
+        through, which have to be passed to 'apply_moves'."""
+        self.__update_doors()
+        moved = []
+        targets = []
+        doors = []
+        if len(self.wanderers) > 0:
+            here = self.positions[self.wanderers]
+            starts = self.edge_starts[here]
+            degrees = self.edge_starts[here + 1] - starts
+            going = (self.rng.random(len(here)) < self.wander_chances) & (degrees > 0)
+            edges = starts[going] + (self.rng.random(int(going.sum())) * degrees[going]).astype(np.int64)
+            passing = self.door_open[self.edge_doors[edges]]
+            moved.append(self.wanderers[going][passing])
+            targets.append(self.edge_targets[edges[passing]])
+            doors.append(self.edge_doors[edges[passing]])
+        if len(self.routes) > 0:
+            current = self.way_starts + self.way_positions
+            passing = self.door_open[self.way_doors[current]]
+            if len(self.leg_ticks) > 0:
+                legs = self.way_legs[current]
+                passing &= (legs < 0) | (legs == self.__get_current_legs())
+            next_positions = self.way_positions[passing] + 1
+            next_positions = np.where(next_positions < self.way_lengths[passing], next_positions,
+                                      self.loop_starts[passing])
+            self.way_positions[passing] = next_positions
+            moved.append(self.routes[passing])
+            targets.append(self.way_locations[self.way_starts[passing] + next_positions])
+            doors.append(self.way_doors[current[passing]])
+        self.ticks += 1
+        if len(moved) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return np.concatenate(moved), np.concatenate(targets), np.concatenate(doors)
+
+    def __get_current_legs(self):
+        """Returns the number of the schedule entry every character on a route is in right now: the last one that began
+        at or before the tick of the day, or the day's last one before the first began. Patrols get -1."""
+        day_tick = self.ticks % DAY_TICKS
+        begun = np.concatenate(([0], np.cumsum(self.leg_ticks <= day_tick)))
+        counts = begun[self.leg_starts + self.leg_counts] - begun[self.leg_starts]
+        return np.where(counts > 0, counts - 1, self.leg_counts - 1)
+
+    def apply_moves(self, moved, targets, doors):
+        """Sets the characters that move to their new location, in the array as well as their 'Component.location'
+        with 'components.move_components'. The player is told about characters leaving or entering their location."""
+        origins = self.positions[moved]
+        self.positions[moved] = targets
+        player_location = self.location_ids.get(self.world.get_player().location, -1)
+        seen = np.flatnonzero((origins == player_location) | (targets == player_location))
+        for k in seen.tolist():
+            npc = self.npcs[moved[k]]
+            door = self.doors[doors[k]]
+            if origins[k] == player_location:
+                output.write(f'{npc.name} leaves through {door.name}.')
+            else:
+                output.write(f'{npc.name} comes in through {door.name}.')
+        move_components([self.npcs[npc_id] for npc_id in moved.tolist()],
+                        [self.locations[location_id] for location_id in targets.tolist()])
+
+    def count_command(self, metrics=None):
+        """Counts a command run in the world and does a tick every 'commands_per_tick' commands. The time of the tick
+        and the number of moves are added to the metrics, if given."""
+        self.commands += 1
+        if self.commands % self.commands_per_tick != 0:
+            return
+        start = time.perf_counter()
+        moves = self.tick()
+        if metrics is not None:
+            metrics.observe('npc_tick', time.perf_counter() - start)
+            metrics.count('npc_moves', moves)
+
+
+def start_simulation(world, commands_per_tick=COMMANDS_PER_TICK, seed=None) -> Simulation:
+    """Creates a simulation for all characters of the world that have a movement and sets it as the world's simulation.
+    Raises SimulationError for a world split into regions, whose locations are not all loaded, and for invalid
+    movements."""
+    if world.regions is not None:
+        raise SimulationError('Characters can only move in a whole world, not in a world split into regions.')
+    world.simulation = Simulation(world, seed, commands_per_tick)
+    log.debug(f'Simulation started with {len(world.simulation.npcs)} moving characters.')
+    return world.simulation
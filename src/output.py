@@ -0,0 +1,104 @@
+"""Output sinks that carry the game's messages to the player. Messages are collected while a command runs and written
+out at once when the command is done, separate from the logging used for debugging the engine."""
+import logging
+import sys
+
+log = logging.getLogger(__name__)
+
+
+class OutputSink:
+
+    def __init__(self):
+        """Constructor for OutputSink. Messages are buffered until 'flush' is called."""
+        self._buffer = []
+
+    def write(self, message):
+        """Adds a message for the player to the buffer. Every message is shown on its own line."""
+        self._buffer.append(str(message))
+
+    def flush(self):
+        """Sends all buffered messages to the player as one block of text and empties the buffer."""
+        if len(self._buffer) == 0:
+            return
+        text = ''.join(f'{message}\n' for message in self._buffer)
+        self._buffer.clear()
+        self._emit(text)
+
+    def _emit(self, text: str):
+        """Sends a block of text to the player. Needs to be implemented by every sink."""
+        raise NotImplementedError
+
+
+class StdoutSink(OutputSink):
+
+    def __init__(self, stream=None):
+        """Create a sink that writes to the given text stream, or to whatever sys.stdout is when flushing."""
+        super().__init__()
+        self.stream = stream
+
+    def _emit(self, text: str):
+        """Writes the text to the stream and flushes it, so it shows up before the next prompt."""
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+class MemorySink(OutputSink):
+
+    def __init__(self):
+        """Create a sink that keeps every flushed block of text in a list, e.g. for tests or replaying games."""
+        super().__init__()
+        self.blocks = []
+
+    def _emit(self, text: str):
+        """Stores the text."""
+        self.blocks.append(text)
+
+    def get_text(self) -> str:
+        """Returns all text flushed so far as one String."""
+        return ''.join(self.blocks)
+
+    def clear(self):
+        """Forgets all text flushed so far."""
+        self.blocks.clear()
+
+
+class SocketSink(OutputSink):
+
+    def __init__(self, writer, encoding='utf-8'):
+        """Create a sink that sends the text over a connection. 'writer' can be anything with a 'write' method taking
+        bytes, like an asyncio StreamWriter or a file made with socket.makefile('wb')."""
+        super().__init__()
+        self.writer = writer
+        self.encoding = encoding
+
+    def _emit(self, text: str):
+        """Encodes the text and writes it to the connection."""
+        self.writer.write(text.replace('\n', '\r\n').encode(self.encoding))
+        if hasattr(self.writer, 'flush'):
+            self.writer.flush()
+
+
+# The sink the game currently writes to. Servers with several players switch it before running a player's command.
+_sink = StdoutSink()
+
+
+def get_sink() -> OutputSink:
+    """Returns the sink the game currently writes to."""
+    return _sink
+
+
+def set_sink(sink: OutputSink):
+    """Sets the sink the game writes to from now on."""
+    global _sink
+    _sink = sink
+
+
+def write(message):
+    """Writes a message for the player to the current sink."""
+    _sink.write(message)
+
+
+def flush():
+    """Sends all messages written so far to the player."""
+    _sink.flush()
@@ -0,0 +1,30 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class Overlay:
+
+    def __init__(self, player_name=None):
+        """Constructor for Overlay. An Overlay holds everything one session changed in a World that is shared by many
+        sessions: lock states, inventories, component locations, money and the player's name. While it is set as the
+        World's 'overlay', game objects read their state from it when it has an entry for them and write all changes
+        into it instead of changing the shared World. Memory used by a session therefore grows with the changes the
+        player made, not with the size of the World."""
+        self.player_name = player_name
+        # Lock -> unlocked state
+        self.locks = {}
+        # Inventory -> that inventory's ItemStacks, copied from the World the first time the session changes them
+        self.inventories = {}
+        # Component -> Location
+        self.locations = {}
+        # Location -> the components in it, copied from the World the first time one of them moves in the session
+        self.occupants = {}
+        # Player -> money
+        self.money = {}
+        # SaveGame recording the session's changes, if the session is saved
+        self.journal = None
+
+    def get_change_count(self) -> int:
+        """Returns the number of objects the session has changed."""
+        return len(self.locks) + len(self.inventories) + len(self.locations) + len(self.money)
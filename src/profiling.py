@@ -0,0 +1,151 @@
+"""Profiling mode. Every command is run under cProfile and tracemalloc, the results are collected per verb (the name of
+the command's handler). At the end a collapsed stack file, which flamegraph tools like flamegraph.pl or speedscope can
+read, and a text report with the most expensive functions and allocation sites are written."""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+
+log = logging.getLogger(__name__)
+
+# Call paths that took less time than this in microseconds are left out of the collapsed stacks
+MIN_STACK_MICROSECONDS = 1
+MAX_STACK_DEPTH = 64
+
+
+class VerbProfile:
+
+    def __init__(self):
+        """Constructor for VerbProfile. Holds the CPU profile and the timing and memory figures of all calls of one
+        verb."""
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self.seconds = 0.0
+        # bytes allocated on top of what was allocated before the call, at the most
+        self.peak_bytes = 0
+        self.total_peak_bytes = 0
+
+
+class Profiler:
+
+    def __init__(self, top_count=20):
+        """Constructor for Profiler. Starts tracing memory allocations right away, so everything allocated while
+        loading the world is seen too. 'top_count' is the number of functions and allocation sites in the report."""
+        self.top_count = top_count
+        # verb -> VerbProfile
+        self.verbs = {}
+        self.was_tracing = tracemalloc.is_tracing()
+        if not self.was_tracing:
+            tracemalloc.start()
+
+    def call(self, verb: str, function, *args, **kwargs):
+        """Calls the function under the profile of the given verb and returns its result."""
+        verb_profile = self.verbs.get(verb)
+        if verb_profile is None:
+            verb_profile = self.verbs[verb] = VerbProfile()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        verb_profile.profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            verb_profile.profile.disable()
+            verb_profile.seconds += time.perf_counter() - start
+            verb_profile.calls += 1
+            peak_bytes = tracemalloc.get_traced_memory()[1] - memory_before
+            verb_profile.total_peak_bytes += peak_bytes
+            if peak_bytes > verb_profile.peak_bytes:
+                verb_profile.peak_bytes = peak_bytes
+
+    def run_command(self, command):
+        """Runs the command under the profile of its verb."""
+        verb = command.rule.handler.__name__ if command.rule is not None else 'unknown'
+        self.call(verb, command.analyze)
+
+    def get_collapsed_stacks(self) -> dict:
+        """Returns the microseconds spent in every call path, by 'verb;function;function...' as flamegraph tools expect
+        it. cProfile only knows which function called which, so the time of a function that is called from several
+        places is split between them by the time each caller spent in it."""
+        stacks = {}
+        for verb, verb_profile in self.verbs.items():
+            stats = pstats.Stats(verb_profile.profile).stats
+            callees = {}
+            for func, (cc, nc, tt, ct, callers) in stats.items():
+                for caller, edge in callers.items():
+                    callees.setdefault(caller, []).append((func, edge))
+            for func, (cc, nc, tt, ct, callers) in stats.items():
+                if len(callers) == 0 and '_lsprof' not in func[2]:
+                    self.__add_stacks(stacks, stats, callees, func, (verb,), tt, 1.0)
+        return stacks
+
+    def __add_stacks(self, stacks: dict, stats: dict, callees: dict, func, path: tuple, own_seconds: float,
+                     share: float):
+        """Adds the time of a function at the end of a call path and walks on to the functions it called. 'share' is
+        the part of the function's total time that was spent on this path."""
+        path = path + (get_function_label(func),)
+        if own_seconds * 1e6 >= MIN_STACK_MICROSECONDS:
+            key = ';'.join(path)
+            stacks[key] = stacks.get(key, 0) + own_seconds * 1e6
+        if len(path) > MAX_STACK_DEPTH:
+            return
+        for callee, (cc, nc, tt, ct) in callees.get(func, ()):
+            callee_total = stats[callee][3]
+            # recursion is cut off, its time is shown at the first call
+            if callee_total <= 0 or get_function_label(callee) in path:
+                continue
+            if ct * share * 1e6 < MIN_STACK_MICROSECONDS:
+                continue
+            self.__add_stacks(stacks, stats, callees, callee, path, tt * share, ct * share / callee_total)
+
+    def write_collapsed_stacks(self, stack_file):
+        """Writes the collapsed stacks, one 'path microseconds' line each."""
+        with open(stack_file, 'w') as f:
+            for path, microseconds in sorted(self.get_collapsed_stacks().items()):
+                if round(microseconds) > 0:
+                    f.write(f'{path} {round(microseconds)}\n')
+
+    def get_report(self) -> str:
+        """Returns the time and memory figures of every verb with its most expensive functions, followed by the
+        allocation sites holding the most memory right now. Memory allocated by the profiler itself is left out."""
+        allocations = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+        report = io.StringIO()
+        for verb, verb_profile in sorted(self.verbs.items(), key=lambda item: -item[1].seconds):
+            report.write(f'=== {verb}: {verb_profile.calls} calls, {verb_profile.seconds * 1000:.3f} ms total, '
+                         f'{verb_profile.seconds / verb_profile.calls * 1e6:.1f} us per call, peak allocation '
+                         f'{verb_profile.peak_bytes} bytes, {verb_profile.total_peak_bytes / verb_profile.calls:.0f} '
+                         f'bytes per call\n')
+            stats = pstats.Stats(verb_profile.profile, stream=report)
+            stats.sort_stats('tottime').print_stats(self.top_count)
+        report.write(f'=== Top {self.top_count} allocation sites\n')
+        for statistic in allocations.statistics('lineno')[:self.top_count]:
+            report.write(f'{statistic}\n')
+        return report.getvalue()
+
+    def write_reports(self, prefix):
+        """Writes '<prefix>.collapsed' with the collapsed stacks and '<prefix>.txt' with the report, then stops
+        tracing memory allocations if it was started for the profiler."""
+        report = self.get_report()
+        self.write_collapsed_stacks(f'{prefix}.collapsed')
+        with open(f'{prefix}.txt', 'w') as f:
+            f.write(report)
+        if not self.was_tracing:
+            tracemalloc.stop()
+        log.info(f'Profile written to {os.path.abspath(prefix)}.collapsed and .txt')
+
+
+def get_function_label(func: tuple) -> str:
+    """Returns a short name for a function of a cProfile result, e.g. 'inventory.py:add_item'."""
+    filename, line, name = func
+    if filename == '~':
+        # built-in functions have no file
+        return name
+    return f'{os.path.basename(filename)}:{name}'
@@ -0,0 +1,377 @@
+"""Worlds split into regions, for maps too big to keep in memory as a whole. A split world is a directory with a
+manifest holding everything that is needed anywhere (items, keys, plain barriers and the player) and one JSON file per
+region with its doors, locations, characters and containers. A region is only loaded when the player reaches it and the
+least recently used regions are unloaded once more than the allowed number are loaded. Regions whose state changed are
+written to a spill file when they are unloaded and read back from it when they are loaded again, without a spill
+directory they are kept in memory instead.
+Run as 'py -m src.regions <world JSON> <world directory> --region-size 1000' to split a world."""
+import argparse
+import collections
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from . import config
+from .world import World
+
+log = logging.getLogger(__name__)
+
+SIDES = ('north_wall', 'south_wall', 'west_wall', 'east_wall')
+
+
+class Region:
+
+    def __init__(self, name):
+        """Constructor for Region. Holds the objects of one loaded region by internal name, and the hash of its state
+        at the time it was loaded, which tells whether it changed since."""
+        self.name = name
+        self.doors = []
+        # Door -> name of the region on the other side, for doors shared with another region
+        self.boundary = {}
+        self.locations = {}
+        self.characters = {}
+        self.containers = {}
+        self.state_hash = None
+
+
+class RegionManager:
+
+    def __init__(self, world, world_dir, region_files: dict, symbols: dict, max_regions=config.MAX_REGIONS,
+                 spill_dir=None):
+        """Constructor for RegionManager. Loads and unloads the regions of a split world as the player moves through
+        it. 'region_files' maps region names to their JSON files in 'world_dir', 'symbols' holds the items, keys and
+        barriers of the manifest, which regions reference by internal name."""
+        if max_regions < 2:
+            raise ValueError('At least 2 regions have to be loaded at once, the current one and the next one.')
+        self.world = world
+        self.world_dir = world_dir
+        self.region_files = region_files
+        self.symbols = symbols
+        self.max_regions = max_regions
+        self.spill_dir = spill_dir
+        # name -> Region, least recently used first
+        self.loaded = collections.OrderedDict()
+        # Location -> name of the region it belongs to, for all loaded locations
+        self.location_regions = {}
+        # internal name -> Door for all loaded doors. A door shared by two regions is loaded once and stays loaded
+        # as long as one of them is.
+        self.doors = {}
+        self.door_users = {}
+        # Door -> names of the regions on both of its sides
+        self.crossings = {}
+        # internal name -> unlocked state of shared doors that were changed and are not loaded
+        self.boundary_locks = {}
+        # names of the regions that have a spill file
+        self.spilled = set()
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def load(self, name) -> Region:
+        """Returns the region, which is loaded first if necessary. Unloads the least recently used regions if too
+        many are loaded then."""
+        region = self.loaded.get(name)
+        if region is not None:
+            self.loaded.move_to_end(name)
+            return region
+        if name not in self.region_files:
+            raise config.WorldLoadError(f'Unknown region "{name}" in {self.world_dir}')
+        with open(os.path.join(self.world_dir, self.region_files[name]), 'r') as f:
+            region_json = json.load(f)
+
+        region = Region(name)
+        dangling = []
+        symbols = {
+            'Item': self.symbols['Item'],
+            'Key': self.symbols['Key'],
+            # doors loaded with a neighbouring region are used instead of creating them again
+            'Barrier': collections.ChainMap({}, self.doors, self.symbols['Barrier']),
+            'Location': region.locations,
+            'Character': region.characters,
+            'Player': {},
+            'Container': region.containers
+        }
+        doors_json = region_json.get('Door', {})
+        config.init_doors({door: doors_json[door] for door in doors_json if door not in self.doors}, symbols, dangling,
+                          self.world)
+        for door_name, new_door in symbols['Barrier'].maps[0].items():
+            if door_name in self.boundary_locks:
+                new_door.lock.is_unlocked = self.boundary_locks.pop(door_name)
+            self.doors[door_name] = new_door
+        for door_name in doors_json:
+            door = self.doors.get(door_name)
+            if door is not None:
+                region.doors.append(door)
+                self.door_users[door] = self.door_users.get(door, 0) + 1
+        for door_name, neighbour in region_json.get('Boundary', {}).items():
+            door = self.doors.get(door_name)
+            if door is not None:
+                region.boundary[door] = neighbour
+                self.crossings.setdefault(door, set()).update((name, neighbour))
+
+        config.init_locations(region_json.get('Location', {}), symbols, dangling, self.world)
+        config.init_characters(region_json.get('Character', {}), symbols, dangling, self.world)
+        config.init_containers(region_json.get('Container', {}), symbols, dangling, self.world)
+        config.set_locations(region_json, symbols, dangling)
+        if len(dangling) > 0:
+            summary = '\n'.join(dangling)
+            raise config.WorldLoadError(f'{len(dangling)} dangling reference(s) in region "{name}":\n{summary}')
+
+        if name in self.spilled:
+            with open(self.get_spill_file(name), 'rb') as f:
+                self.__apply_state(region, f.read())
+        region.state_hash = hashlib.sha256(self.get_state(region)).digest()
+        self.loaded[name] = region
+        for location in region.locations.values():
+            self.location_regions[location] = name
+        self.world.metrics.count('regions.loads')
+        log.debug(f'Region "{name}" loaded, {len(self.loaded)} regions in memory.')
+        self.__unload_least_used(name)
+        return region
+
+    def unload(self, name) -> bool:
+        """Removes the region's objects from the world. If its state changed since it was loaded, the state is written
+        to its spill file first. Returns False if the region changed but there is no spill directory, it stays loaded
+        then."""
+        region = self.loaded[name]
+        state = self.get_state(region)
+        if hashlib.sha256(state).digest() != region.state_hash:
+            if self.spill_dir is None:
+                log.debug(f'Region "{name}" changed and there is no spill directory, it stays loaded.')
+                return False
+            with open(f'{self.get_spill_file(name)}.tmp', 'wb') as f:
+                f.write(state)
+            os.replace(f'{self.get_spill_file(name)}.tmp', self.get_spill_file(name))
+            self.spilled.add(name)
+            self.world.metrics.count('regions.spills')
+
+        del self.loaded[name]
+        removed = set(region.locations.values())
+        removed.update(region.characters.values())
+        removed.update(region.containers.values())
+        for door in region.doors:
+            self.door_users[door] -= 1
+            if self.door_users[door] > 0:
+                continue
+            del self.door_users[door]
+            del self.doors[door.internal_name]
+            self.crossings.pop(door, None)
+            # the state of a shared door isn't part of either region's state
+            if door in region.boundary and door.lock.is_unlocked != (door.lock.key is None):
+                self.boundary_locks[door.internal_name] = door.lock.is_unlocked
+            removed.add(door)
+        for location in region.locations.values():
+            del self.location_regions[location]
+        self.world.remove_objects(removed)
+        self.world.metrics.count('regions.evictions')
+        log.debug(f'Region "{name}" unloaded.')
+        return True
+
+    def __unload_least_used(self, keep):
+        """Unloads the least recently used regions until no more than the allowed number are loaded. The given region
+        and the one the player is in stay loaded."""
+        if len(self.loaded) <= self.max_regions:
+            return
+        pinned = {keep}
+        if len(self.world.get_all_components()['Player']) > 0:
+            pinned.add(self.location_regions.get(self.world.get_player().location))
+        for name in list(self.loaded):
+            if len(self.loaded) <= self.max_regions:
+                break
+            if name not in pinned:
+                self.unload(name)
+
+    def load_across(self, door):
+        """Loads the regions on both sides of the door, so the location behind it exists."""
+        for name in tuple(self.crossings.get(door, ())):
+            if name not in self.loaded:
+                self.load(name)
+
+    def touch(self, location):
+        """Marks the region of the location as the most recently used one."""
+        name = self.location_regions.get(location)
+        if name is not None:
+            self.loaded.move_to_end(name)
+
+    def get_spill_file(self, name) -> str:
+        """Returns the path of the region's spill file."""
+        return os.path.join(self.spill_dir, f'{config.get_file_name(name)}.spill')
+
+    def get_state(self, region: Region) -> bytes:
+        """Returns the mutable state of the region's objects (lock states, inventories and component locations) by
+        internal name."""
+        state = []
+        for door in region.doors:
+            if door not in region.boundary:
+                state.append(('Door', door.internal_name, door.lock.is_unlocked))
+        for location in region.locations.values():
+            state.append(('Location', location.internal_name, get_stacks(location.inventory)))
+        for character in region.characters.values():
+            state.append(('Character', character.internal_name, get_internal_name(character.location),
+                          get_stacks(character.inventory)))
+        for container in region.containers.values():
+            state.append(('Container', container.internal_name, get_internal_name(container.location),
+                          container.lock.is_unlocked, get_stacks(container)))
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __apply_state(self, region: Region, state: bytes):
+        """Changes the region's objects to the state read from its spill file."""
+        for entry in pickle.loads(state):
+            if entry[0] == 'Door':
+                self.doors[entry[1]].lock.is_unlocked = entry[2]
+            elif entry[0] == 'Location':
+                self.__set_stacks(region.locations[entry[1]].inventory, entry[2])
+            elif entry[0] == 'Character':
+                character = region.characters[entry[1]]
+                character.location = self.__find_location(region, entry[2])
+                self.__set_stacks(character.inventory, entry[3])
+            elif entry[0] == 'Container':
+                container = region.containers[entry[1]]
+                container.location = self.__find_location(region, entry[2])
+                container.lock.is_unlocked = entry[3]
+                self.__set_stacks(container, entry[4])
+
+    def __find_location(self, region: Region, internal_name):
+        """Returns the location with the internal name from the region or another loaded one, None if it is not
+        loaded."""
+        if internal_name is None:
+            return None
+        if internal_name in region.locations:
+            return region.locations[internal_name]
+        for other in self.loaded.values():
+            if internal_name in other.locations:
+                return other.locations[internal_name]
+        log.warning(f'Location "{internal_name}" is not loaded, a component of region "{region.name}" loses its '
+                    f'location.')
+        return None
+
+    def __set_stacks(self, inventory_obj, stacks: tuple):
+        """Replaces the inventory's content with the (item internal name, amount) stacks."""
+        inventory_obj.clear_items()
+        for item_name, amount in stacks:
+            item = self.symbols['Item'].get(item_name, self.symbols['Key'].get(item_name))
+            inventory_obj.add_item(item, amount)
+
+
+def get_stacks(inventory_obj) -> tuple:
+    """Returns the inventory's content as (item internal name, amount) tuples."""
+    return tuple((item_w_amount[0].internal_name, item_w_amount[1]) for item_w_amount in inventory_obj.inventory_list)
+
+
+def get_internal_name(obj):
+    """Returns the object's internal name, None for no object."""
+    return None if obj is None else obj.internal_name
+
+
+def load_world(chosen_player_name, world_dir, max_regions=config.MAX_REGIONS, spill_dir=None) -> World:
+    """Returns a new World with the manifest of the split world in 'world_dir' loaded, as well as the region the player
+    starts in. Everything else is loaded when the player gets there."""
+    with open(os.path.join(world_dir, config.REGION_MANIFEST), 'r') as f:
+        manifest = json.load(f)
+    world = World()
+    symbols = {'Item': {}, 'Key': {}, 'Barrier': {}, 'Player': {}}
+    dangling = []
+    config.init_items(manifest.get('Item', {}), symbols, world)
+    config.init_keys(manifest.get('Key', {}), symbols, world)
+    config.init_barriers(manifest.get('Barrier', {}), symbols, world)
+    world.regions = RegionManager(world, world_dir, manifest['Regions'], symbols, max_regions, spill_dir)
+
+    players = manifest.get('Player', {})
+    config.init_player(players, chosen_player_name, symbols, dangling, world)
+    for player in symbols['Player'].values():
+        player_json = players[player.internal_name]
+        if player_json['location'] != 'None':
+            region = world.regions.load(player_json['region'])
+            player.location = config.resolve({'Location': region.locations}, 'Location', player_json['location'],
+                                             f'Player "{player.internal_name}"', dangling)
+    if len(dangling) > 0:
+        summary = '\n'.join(dangling)
+        raise config.WorldLoadError(f'{len(dangling)} dangling reference(s) in {world_dir}:\n{summary}')
+    return world
+
+
+def split_world(init_json: dict, region_size: int) -> tuple:
+    """Returns the manifest and a dict with the JSON of every region by name for a world in the format of
+    'src/init.json'. Neighbouring locations are put into the same region, up to 'region_size' locations per region.
+    Characters and containers go into the region of their location, those without one into the first region."""
+    location_json = init_json.get('Location', {})
+    doors = init_json.get('Door', {})
+    # door -> the locations having it as a wall
+    door_locations = {}
+    for location in location_json:
+        for side in SIDES:
+            if location_json[location][side] in doors:
+                door_locations.setdefault(location_json[location][side], []).append(location)
+
+    location_regions = {}
+    regions = {}
+    for start in location_json:
+        if start in location_regions:
+            continue
+        name = f'region_{len(regions)}'
+        regions[name] = {'Door': {}, 'Location': {}, 'Character': {}, 'Container': {}, 'Boundary': {}}
+        # breadth first from the first location without region, so the region's locations lie close together
+        location_regions[start] = name
+        size = 1
+        queue = collections.deque([start])
+        while len(queue) > 0 and size < region_size:
+            location = queue.popleft()
+            for side in SIDES:
+                for neighbour in door_locations.get(location_json[location][side], ()):
+                    if neighbour not in location_regions and size < region_size:
+                        location_regions[neighbour] = name
+                        size += 1
+                        queue.append(neighbour)
+
+    for location, name in location_regions.items():
+        regions[name]['Location'][location] = location_json[location]
+        for side in SIDES:
+            door = location_json[location][side]
+            if door not in doors:
+                continue
+            regions[name]['Door'][door] = doors[door]
+            for neighbour in door_locations[door]:
+                if location_regions[neighbour] != name:
+                    regions[name]['Boundary'][door] = location_regions[neighbour]
+
+    first_region = next(iter(regions), None)
+    for component_type in ('Character', 'Container'):
+        for component, component_json in init_json.get(component_type, {}).items():
+            name = location_regions.get(component_json['location'], first_region)
+            regions[name][component_type][component] = component_json
+
+    manifest = {
+        'Item': init_json.get('Item', {}),
+        'Key': init_json.get('Key', {}),
+        'Barrier': init_json.get('Barrier', {}),
+        'Player': {},
+        'Regions': {name: f'{name}.json' for name in regions}
+    }
+    for player, player_json in init_json.get('Player', {}).items():
+        manifest['Player'][player] = dict(player_json, region=location_regions.get(player_json['location']))
+    return manifest, regions
+
+
+def write_split_world(init_json: dict, world_dir, region_size: int):
+    """Splits the world's JSON into regions and writes the manifest and region files to the directory."""
+    manifest, regions = split_world(init_json, region_size)
+    os.makedirs(world_dir, exist_ok=True)
+    for name, region_json in regions.items():
+        with open(os.path.join(world_dir, manifest['Regions'][name]), 'w') as f:
+            json.dump(region_json, f)
+    with open(os.path.join(world_dir, config.REGION_MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    log.info(f'{len(regions)} regions written to {world_dir}')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description='Split a world into regions that are loaded as they are reached.')
+    parser.add_argument('init_file', help='JSON file of the world')
+    parser.add_argument('world_dir', help='directory to write the manifest and the regions to')
+    parser.add_argument('--region-size', type=int, default=1000, help='locations per region at the most')
+    args = parser.parse_args()
+    with open(args.init_file, 'r') as init:
+        world_json = json.load(init)
+    write_split_world(world_json, args.world_dir, args.region_size)
@@ -0,0 +1,178 @@
+"""Recording and replaying games. An event log holds the hash of the world's JSON, the player's name and every command
+line in the order they were run. When the game ends, the hash of the final state is added. Replaying runs the commands
+against a freshly loaded world as fast as the engine can, without any output, so bugs and slow commands can be
+reproduced exactly. Run as 'py -m src.replay <event log>'."""
+import argparse
+import logging
+import struct
+import sys
+import time
+
+from .commands import Command
+from . import config
+from . import output
+from .savegame import get_state_hash
+
+log = logging.getLogger(__name__)
+
+EVENTS_FORMAT = b'TXTADV-EVENTS-1\n'
+# world hash and length of the player's name following the format tag
+_HEADER = struct.Struct('<32sH')
+# event type and length of the data following it
+_EVENT = struct.Struct('<BI')
+# Event types
+COMMAND = 1
+STATE_HASH = 2
+
+
+class ReplayError(Exception):
+    """Raised when an event log is damaged or does not belong to the world it is replayed in."""
+    pass
+
+
+class EventLog:
+
+    def __init__(self, event_file, world_hash: bytes, player_name: str):
+        """Constructor for EventLog. Creates the log file for a game played by the player in the world with the given
+        JSON hash. Every event is written right away, so the log is complete even if the game crashes."""
+        self.event_file = event_file
+        self.event_count = 0
+        self._file = open(event_file, 'wb')
+        name = player_name.encode()
+        self._file.write(EVENTS_FORMAT + _HEADER.pack(world_hash, len(name)) + name)
+
+    def record_command(self, line: str):
+        """Adds a command line to the log."""
+        self.__write(COMMAND, line.encode())
+        self.event_count += 1
+
+    def close(self, world=None):
+        """Adds the hash of the world's final state, if the world is given, and closes the log."""
+        if self._file.closed:
+            return
+        state_hash = get_state_hash(world) if world is not None else None
+        if state_hash is not None:
+            self.__write(STATE_HASH, state_hash)
+        self._file.close()
+
+    def __write(self, event_type, data: bytes):
+        """Writes an event to the log file."""
+        self._file.write(_EVENT.pack(event_type, len(data)) + data)
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_event_log(event_file) -> tuple:
+    """Returns the world hash, the player's name, the list of command lines and the final state hash (None if the game
+    did not end properly) of an event log. An event that was only partly written is ignored."""
+    with open(event_file, 'rb') as f:
+        data = f.read()
+    if not data.startswith(EVENTS_FORMAT):
+        raise ReplayError(f'{event_file} is not an event log')
+    offset = len(EVENTS_FORMAT)
+    world_hash, name_length = _HEADER.unpack_from(data, offset)
+    offset += _HEADER.size
+    player_name = data[offset:offset + name_length].decode()
+    offset += name_length
+
+    lines = []
+    state_hash = None
+    while offset + _EVENT.size <= len(data):
+        event_type, length = _EVENT.unpack_from(data, offset)
+        offset += _EVENT.size
+        if offset + length > len(data):
+            log.warning(f'Incomplete event at the end of {event_file} ignored.')
+            break
+        if event_type == COMMAND:
+            lines.append(data[offset:offset + length].decode())
+        elif event_type == STATE_HASH:
+            state_hash = data[offset:offset + length]
+        else:
+            raise ReplayError(f'Unknown event type {event_type} in {event_file}')
+        offset += length
+    return world_hash, player_name, lines, state_hash
+
+
+class ReplayResult:
+
+    def __init__(self, world, events_run: int, seconds: float, state_hash: bytes, expected_state_hash, sink):
+        """Constructor for ReplayResult. Holds the world as it is after the replay, the number of commands that were
+        run and how long they took, the state hashes and the sink with everything the player would have seen."""
+        self.world = world
+        self.events_run = events_run
+        self.seconds = seconds
+        self.state_hash = state_hash
+        self.expected_state_hash = expected_state_hash
+        self.sink = sink
+
+    @property
+    def is_verified(self) -> bool:
+        """Returns whether the replay ended in the same state as the recorded game. False if the log has no final
+        state or the replay stopped early."""
+        return self.expected_state_hash is not None and self.state_hash == self.expected_state_hash
+
+    @property
+    def commands_per_second(self) -> float:
+        """Returns the replay speed."""
+        if self.seconds == 0:
+            return 0.0
+        return self.events_run / self.seconds
+
+
+def replay(event_file, stop_at=None, init_file=config.INIT_FILE, snapshot_file=config.SNAPSHOT_FILE) -> ReplayResult:
+    """Runs the commands of an event log against a freshly loaded world, without any output or pauses. Stops after
+    'stop_at' commands if given, the final state can only be verified when all commands are run."""
+    world_hash, player_name, lines, expected_state_hash = read_event_log(event_file)
+    if world_hash != config.get_world_hash(init_file):
+        raise ReplayError(f'{event_file} was not recorded in the world of {init_file}')
+    if stop_at is not None and stop_at < len(lines):
+        lines = lines[:stop_at]
+        expected_state_hash = None
+
+    world = config.load_world(player_name, init_file, snapshot_file)
+    sink = output.MemorySink()
+    previous_sink = output.get_sink()
+    output.set_sink(sink)
+    events_run = 0
+    start = time.perf_counter()
+    try:
+        for line in lines:
+            events_run += 1
+            try:
+                Command(line, world).analyze()
+            except SystemExit:
+                break
+    finally:
+        seconds = time.perf_counter() - start
+        output.set_sink(previous_sink)
+    return ReplayResult(world, events_run, seconds, get_state_hash(world), expected_state_hash, sink)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    parser = argparse.ArgumentParser(description='Replay a recorded game.')
+    parser.add_argument('event_file', help='event log to replay')
+    parser.add_argument('--stop-at', type=int, help='only run the first N commands')
+    parser.add_argument('--world', default=config.INIT_FILE, help='JSON file of the world')
+    parser.add_argument('--snapshot', default=config.SNAPSHOT_FILE, help='compiled snapshot of the world')
+    parser.add_argument('--show-output', action='store_true', help='show what the player saw')
+    args = parser.parse_args()
+
+    result = replay(args.event_file, args.stop_at, args.world, args.snapshot)
+    if args.show_output:
+        print(result.sink.get_text())
+    print(f'Commands: {result.events_run} in {result.seconds:.3f} s ({result.commands_per_second:.0f}/s)')
+    if result.state_hash is not None:
+        print(f'State:    {result.state_hash.hex()}')
+    if result.expected_state_hash is None:
+        print('Final state not verified (replay stopped early or the game did not end properly)')
+    elif result.is_verified:
+        print('Final state verified')
+    else:
+        print(f'Final state differs from the recorded one {result.expected_state_hash.hex()}')
+        sys.exit(1)
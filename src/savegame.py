@@ -0,0 +1,313 @@
+"""Saving and restoring games. A save consists of two files: the state file holds the complete mutable state of the
+world (lock states, inventories, component locations, money and the economy's stock and prices) and the journal holds
+every change made since the state file was written. Saving only appends the latest changes to the journal, once it gets
+long it is compacted into a new state file."""
+import hashlib
+import logging
+import os
+import struct
+import zlib
+
+log = logging.getLogger(__name__)
+
+STATE_FORMAT = b'TXTADV-SAVE-1\n'
+JOURNAL_FORMAT = b'TXTADV-JOURNAL-1\n'
+# world hash and generation following the format tag of both files
+_HEADER = struct.Struct('<32sI')
+# Number of journal records after which the journal is compacted into a new state file
+COMPACT_EVERY = 10000
+
+# Record types. Every record stores the new state of one thing, so replaying a record twice does no harm.
+LOCK = 1
+LOCATION = 2
+STACK = 3
+MONEY = 4
+CLEAR = 5
+ECONOMY = 6
+ECONOMY_TICK = 7
+_RECORDS = {
+    # lock id, unlocked
+    LOCK: struct.Struct('<BI?'),
+    # component id, location id or -1 for no location
+    LOCATION: struct.Struct('<BIi'),
+    # inventory id, item id, amount (0 if the item was removed)
+    STACK: struct.Struct('<BIIi'),
+    # player id, money
+    MONEY: struct.Struct('<BIq'),
+    # inventory id, all items are removed
+    CLEAR: struct.Struct('<BI'),
+    # merchant id, item id, stock, pieces sold since the last tick, price
+    ECONOMY: struct.Struct('<BIIiif'),
+    # number of the economy's tick, it is repeated if it wasn't done yet
+    ECONOMY_TICK: struct.Struct('<BI')
+}
+
+
+class SaveGameError(Exception):
+    """Raised when a save file is damaged."""
+    pass
+
+
+class SaveGame:
+
+    def __init__(self, world, save_file, world_hash: bytes, compact_every=COMPACT_EVERY):
+        """Constructor for SaveGame. Takes the World that is played, the path of the state file (the journal is stored
+        next to it) and the hash of the world's JSON, a save can only be restored into the same world. Objects are
+        identified by their position in the world, which is the same every time the world is loaded. Without a file
+        it can only be used to get the world's state."""
+        self.world = world
+        self.save_file = save_file
+        self.journal_file = None if save_file is None else f'{save_file}.journal'
+        self.world_hash = world_hash
+        self.compact_every = compact_every
+        # increased with every state file, the journal belongs to the state file of the same generation
+        self.generation = 0
+        self.record_count = 0
+        self.pending = bytearray()
+        self._objects = None
+        self._ids = None
+        self._journal = None
+        # length of the valid part of the journal, None if it can't be appended to
+        self._journal_length = None
+
+    def get_objects(self) -> list:
+        """Returns all objects with mutable state in a fixed order, which gives each one its id."""
+        if self._objects is None:
+            from .locations import Door
+            if self.world.regions is not None:
+                raise SaveGameError('A world split into regions cannot be saved, only some of its regions are loaded.')
+            objects = []
+            for component_list in self.world.get_all_components().values():
+                objects.extend(component_list)
+            objects.extend(self.world.get_all_barriers())
+            objects.extend(self.world.get_all_locations())
+            objects.extend(location.inventory for location in self.world.get_all_locations())
+            for type_name in ('Character', 'Player'):
+                objects.extend(character.inventory for character in self.world.get_all_components()[type_name])
+            objects.extend(barrier.lock for barrier in self.world.get_all_barriers() if isinstance(barrier, Door))
+            objects.extend(container.lock for container in self.world.get_all_components()['Container'])
+            self._objects = objects
+            self._ids = {obj: i for i, obj in enumerate(objects)}
+        return self._objects
+
+    def get_id(self, obj) -> int:
+        """Returns the id of an object, -1 for None."""
+        if obj is None:
+            return -1
+        if self._ids is None:
+            self.get_objects()
+        return self._ids[obj]
+
+    def record_lock(self, lock, unlocked: bool):
+        """Records the new state of a lock."""
+        self.__record(LOCK, self.get_id(lock), unlocked)
+
+    def record_location(self, component, location):
+        """Records the new location of a component."""
+        self.__record(LOCATION, self.get_id(component), self.get_id(location))
+
+    def record_stack(self, inventory_obj, item, amount: int):
+        """Records the new amount of an item in an inventory."""
+        self.__record(STACK, self.get_id(inventory_obj), self.get_id(item), amount)
+
+    def record_money(self, player, money: int):
+        """Records the new amount of money of a player."""
+        self.__record(MONEY, self.get_id(player), money)
+
+    def record_clear(self, inventory_obj):
+        """Records that all items were removed from an inventory."""
+        self.__record(CLEAR, self.get_id(inventory_obj))
+
+    def record_economy(self, merchant, item, stock: int, sold: int, price: float):
+        """Records the new stock, pieces sold and price of an item in the world's economy."""
+        self.__record(ECONOMY, self.get_id(merchant), self.get_id(item), stock, sold, price)
+
+    def record_economy_tick(self, number: int):
+        """Records that the world's economy did the tick with the given number."""
+        self.__record(ECONOMY_TICK, number)
+
+    def __record(self, record_type, *values):
+        """Adds a record to the ones that are written with the next save."""
+        self.pending += _RECORDS[record_type].pack(record_type, *values)
+        self.record_count += 1
+
+    def restore(self) -> bool:
+        """Loads the state file into the world and replays the journal on top of it. Returns False if there is no save
+        for this world. Has to be called before the save game is attached."""
+        try:
+            with open(self.save_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        generation, offset = self.__read_header(data, STATE_FORMAT)
+        if generation is None:
+            self.__keep_other_save()
+            return False
+        self.__apply(zlib.decompress(data[offset:]))
+        self.generation = generation
+
+        try:
+            with open(self.journal_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            log.warning(f'{self.journal_file} is missing, changes after the last compaction are lost.')
+            return True
+        generation, offset = self.__read_header(data, JOURNAL_FORMAT)
+        if generation != self.generation:
+            # written before the state file was replaced, all its changes are in the state file already
+            log.debug(f'{self.journal_file} belongs to an older state, ignored.')
+            return True
+        self.record_count = 0
+        self._journal_length = offset + self.__apply(data[offset:])
+        log.debug(f'Save restored from {self.save_file} and {self.record_count} journal records.')
+        return True
+
+    def attach(self):
+        """Starts recording the world's changes. With an overlay set the changes of that session are recorded."""
+        if self.world.overlay is not None:
+            self.world.overlay.journal = self
+        else:
+            self.world.journal = self
+        if self._journal_length is None:
+            # nothing to append to, so the current state becomes the start of a new journal
+            self.compact()
+        else:
+            self._journal = open(self.journal_file, 'r+b')
+            # a record that was only partly written is dropped
+            self._journal.truncate(self._journal_length)
+            self._journal.seek(self._journal_length)
+
+    def save(self):
+        """Appends the changes since the last save to the journal. Compacts the journal once it gets too long."""
+        if len(self.pending) == 0:
+            return
+        self._journal.write(self.pending)
+        self._journal.flush()
+        self.pending.clear()
+        if self.record_count >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Writes the complete state to a new state file and starts an empty journal for it."""
+        self.pending.clear()
+        state = self.get_state()
+        self.generation += 1
+        header = _HEADER.pack(self.world_hash, self.generation)
+        # write to temporary files first, so an interrupted write never leaves a broken save behind
+        with open(f'{self.save_file}.tmp', 'wb') as f:
+            f.write(STATE_FORMAT + header + zlib.compress(state))
+        os.replace(f'{self.save_file}.tmp', self.save_file)
+        if self._journal is not None:
+            self._journal.close()
+        with open(f'{self.journal_file}.tmp', 'wb') as f:
+            f.write(JOURNAL_FORMAT + header)
+        os.replace(f'{self.journal_file}.tmp', self.journal_file)
+        self._journal = open(self.journal_file, 'ab')
+        self.record_count = 0
+        log.debug(f'Save compacted into {self.save_file}, generation {self.generation}.')
+
+    def get_state(self) -> bytes:
+        """Returns the records describing the complete current state of the world."""
+        state = bytearray()
+        for obj in self.get_objects():
+            self.__add_state(state, obj)
+        if self.world.economy is not None:
+            for merchant, item, stock, sold, price in self.world.economy.get_changed_entries():
+                state += _RECORDS[ECONOMY].pack(ECONOMY, self.get_id(merchant), self.get_id(item), stock, sold, price)
+        return bytes(state)
+
+    def close(self):
+        """Saves the last changes and stops recording."""
+        if self._journal is None:
+            return
+        self.save()
+        self._journal.close()
+        self._journal = None
+        if self.world.journal is self:
+            self.world.journal = None
+        if self.world.overlay is not None and self.world.overlay.journal is self:
+            self.world.overlay.journal = None
+
+    def __add_state(self, state: bytearray, obj):
+        """Adds the records describing the current state of an object."""
+        from .character import Player
+        from .components import Component
+        from .inventory import BaseInventory
+        from .locations import Lock
+        obj_id = self.get_id(obj)
+        if isinstance(obj, Lock):
+            state += _RECORDS[LOCK].pack(LOCK, obj_id, obj.is_unlocked)
+        if isinstance(obj, Component):
+            state += _RECORDS[LOCATION].pack(LOCATION, obj_id, self.get_id(obj.location))
+        if isinstance(obj, BaseInventory):
+            state += _RECORDS[CLEAR].pack(CLEAR, obj_id)
+            for item_w_amount in obj.inventory_list:
+                state += _RECORDS[STACK].pack(STACK, obj_id, self.get_id(item_w_amount[0]), item_w_amount[1])
+        if isinstance(obj, Player):
+            state += _RECORDS[MONEY].pack(MONEY, obj_id, obj.money)
+
+    def __keep_other_save(self):
+        """Renames the state file and journal of a save that was not made for this world, e.g. before the world's JSON
+        changed, so starting a new game doesn't overwrite them."""
+        kept_file = f'{self.save_file}.other-world'
+        os.replace(self.save_file, kept_file)
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, f'{kept_file}.journal')
+        log.warning(f'{self.save_file} is not a save of this world, it is kept as {kept_file} and a new game is '
+                    f'started.')
+
+    def __read_header(self, data: bytes, file_format: bytes) -> tuple:
+        """Returns the generation of a state file or journal and where its records start. The generation is None if
+        the file was not made for this world."""
+        offset = len(file_format) + _HEADER.size
+        if not data.startswith(file_format) or len(data) < offset:
+            return None, offset
+        world_hash, generation = _HEADER.unpack_from(data, len(file_format))
+        if world_hash != self.world_hash:
+            return None, offset
+        return generation, offset
+
+    def __apply(self, records: bytes) -> int:
+        """Changes the world as the records say. Returns the length of the complete records, a record at the end that
+        was only partly written is ignored."""
+        objects = self.get_objects()
+        offset = 0
+        skipped_economy = False
+        while offset < len(records):
+            record = _RECORDS.get(records[offset])
+            if record is None:
+                raise SaveGameError(f'Unknown record type {records[offset]} in save of {self.save_file}')
+            if offset + record.size > len(records):
+                log.warning(f'Incomplete record at the end of the save of {self.save_file} ignored.')
+                break
+            values = record.unpack_from(records, offset)
+            offset += record.size
+            self.record_count += 1
+            if values[0] == LOCK:
+                objects[values[1]].is_unlocked = values[2]
+            elif values[0] == LOCATION:
+                objects[values[1]].location = None if values[2] < 0 else objects[values[2]]
+            elif values[0] == STACK:
+                objects[values[1]].set_item_amount(objects[values[2]], values[3])
+            elif values[0] == MONEY:
+                objects[values[1]].money = values[2]
+            elif values[0] == CLEAR:
+                objects[values[1]].clear_items()
+            elif self.world.economy is None:
+                # ECONOMY and ECONOMY_TICK
+                skipped_economy = True
+            elif values[0] == ECONOMY:
+                self.world.economy.set_entry(objects[values[1]], objects[values[2]], *values[3:])
+            elif values[0] == ECONOMY_TICK:
+                self.world.economy.repeat_tick(values[1])
+        if skipped_economy:
+            log.warning(f'The save of {self.save_file} has an economy, but none was started. Merchants start over.')
+        return offset
+
+
+def get_state_hash(world) -> bytes:
+    """Returns the SHA-256 hash of the world's complete mutable state, as the current overlay sees it. Returns None
+    for a world split into regions, whose state is not all in memory."""
+    if world.regions is not None:
+        return None
+    return hashlib.sha256(SaveGame(world, None, None).get_state()).digest()
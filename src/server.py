@@ -0,0 +1,176 @@
+"""Server that hosts many players in one process. Every connection gets its own game session. All sessions share one
+world, each one only keeps what its player changed. Run as 'py -m src.server' and connect with e.g. telnet or netcat."""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from .commands import Command
+from . import config
+from . import output
+from .overlay import Overlay
+from .replay import EventLog
+from .world import World
+
+log = logging.getLogger(__name__)
+
+
+class Session:
+
+    def __init__(self, world: World, player_name, writer, event_log=None):
+        """Create a game session playing in the shared World, with an overlay for everything the player changes and a
+        sink that writes to the connection. If an EventLog is given, all commands are recorded in it."""
+        self.world = world
+        self.overlay = Overlay(player_name)
+        self.sink = output.SocketSink(writer)
+        self.event_log = event_log
+
+    def run_command(self, line: str) -> bool:
+        """Runs one command in this session. Returns False when the player ended the game."""
+        # Commands run synchronously, so switching overlay and sink is all that's needed to keep the sessions apart.
+        self.world.overlay = self.overlay
+        output.set_sink(self.sink)
+        if self.event_log is not None:
+            self.event_log.record_command(line)
+        try:
+            Command(line, self.world).analyze()
+        except SystemExit:
+            return False
+        except Exception:
+            log.exception(f'Command "{line}" failed')
+            output.write('Something went wrong, please try something else.')
+            output.flush()
+        finally:
+            self.world.overlay = None
+        return True
+
+    def close(self):
+        """Ends the session. Closes the event log with the hash of the state the session ended in."""
+        if self.event_log is not None:
+            self.world.overlay = self.overlay
+            try:
+                self.event_log.close(self.world)
+            finally:
+                self.world.overlay = None
+
+
+class GameServer:
+
+    def __init__(self, init_file=config.INIT_FILE, snapshot_file=config.SNAPSHOT_FILE, record_dir=None):
+        """Loads the world once. All sessions share it and only keep what they changed. If a directory is given, the
+        commands of every session are recorded in an event log there."""
+        self.world = config.load_world(None, init_file, snapshot_file)
+        if self.world.regions is not None:
+            # regions are loaded and unloaded for one player, the sessions' overlays would keep unloaded objects
+            raise config.WorldLoadError(f'{init_file} is split into regions, sessions can only share a whole world.')
+        self.world_hash = config.get_world_hash(init_file)
+        self.record_dir = record_dir
+        self.session_number = 0
+        self.sessions = set()
+        self.command_count = 0
+        self.command_seconds = 0.0
+        self.max_command_seconds = 0.0
+
+    @property
+    def session_count(self) -> int:
+        """Returns the number of players currently connected."""
+        return len(self.sessions)
+
+    @property
+    def mean_command_latency(self) -> float:
+        """Returns the mean time in seconds that commands took to run, over all sessions."""
+        if self.command_count == 0:
+            return 0.0
+        return self.command_seconds / self.command_count
+
+    def get_stats(self) -> dict:
+        """Returns the current number of sessions, command latency figures and render cache counters."""
+        return {
+            'sessions': self.session_count,
+            'commands': self.command_count,
+            'mean_command_latency': self.mean_command_latency,
+            'max_command_latency': self.max_command_seconds,
+            'render_cache': self.world.render_cache.get_stats()
+        }
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Runs a game session for one connection until the player leaves."""
+        writer.write(b'Enter your Name: ')
+        name_line = await reader.readline()
+        player_name = name_line.decode(errors='replace').strip()
+        if player_name == '':
+            writer.close()
+            return
+
+        self.session_number += 1
+        event_log = None
+        if self.record_dir is not None:
+            file_name = f'{self.session_number}-{config.get_file_name(player_name)}.events'
+            event_log = EventLog(os.path.join(self.record_dir, file_name), self.world_hash, player_name)
+        session = Session(self.world, player_name, writer, event_log)
+        self.sessions.add(session)
+        log.info(f'{player_name} connected, {self.session_count} sessions')
+        try:
+            output.set_sink(session.sink)
+            output.write(config.welcome(player_name))
+            output.flush()
+            while True:
+                writer.write(b'\r\nEnter Command: ')
+                await writer.drain()
+                line = await reader.readline()
+                # empty bytes means the connection was closed
+                if line == b'':
+                    break
+                start = time.perf_counter()
+                keep_playing = session.run_command(line.decode(errors='replace'))
+                self.record_latency(time.perf_counter() - start)
+                if not keep_playing:
+                    break
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.close()
+            self.sessions.discard(session)
+            log.info(f'{player_name} disconnected, {self.session_count} sessions')
+            writer.close()
+
+    def record_latency(self, seconds: float):
+        """Adds the time a command took to the latency figures."""
+        self.command_count += 1
+        self.command_seconds += seconds
+        if seconds > self.max_command_seconds:
+            self.max_command_seconds = seconds
+
+    async def serve(self, host='127.0.0.1', port=4000, unix_path=None, stats_interval=60):
+        """Accepts connections on a TCP port or, if given, a Unix socket path and logs the stats periodically."""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        log.info(f'Serving on {", ".join(str(sock.getsockname()) for sock in server.sockets)}')
+        async with server:
+            while True:
+                await asyncio.sleep(stats_interval)
+                log.info(f'Stats: {self.get_stats()}')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s -- %(levelname)s -- %(module)s -- %(message)s')
+    parser = argparse.ArgumentParser(description='Host text adventure sessions for many players.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--unix', help='path of a Unix socket to listen on instead of a TCP port')
+    parser.add_argument('--world', default=config.INIT_FILE, help='JSON file of the world')
+    parser.add_argument('--stats-interval', type=float, default=60, help='seconds between logging the stats')
+    parser.add_argument('--record-dir', help='directory to record the commands of every session in')
+    parser.add_argument('--metrics-interval', type=float, help='write the metrics to stderr every that many seconds')
+    args = parser.parse_args()
+    if args.record_dir is not None:
+        os.makedirs(args.record_dir, exist_ok=True)
+    game_server = GameServer(args.world, record_dir=args.record_dir)
+    if args.metrics_interval is not None:
+        game_server.world.metrics.set_dump(sys.stderr, args.metrics_interval)
+    asyncio.run(game_server.serve(args.host, args.port, args.unix, args.stats_interval))
@@ -0,0 +1,123 @@
+"""String table for the long texts of a world: descriptions, the second descriptions of locations and what characters
+say. The texts are stored one after the other in a file that is memory-mapped, game objects only keep the number of
+their text and it is decoded when it is shown to the player. Pages of the file that are never read are never loaded,
+and every process using the same file shares the loaded pages through the OS page cache."""
+import logging
+import mmap
+import os
+import struct
+
+log = logging.getLogger(__name__)
+
+STRINGS_FORMAT = b'TXTADV-STRINGS-1\n'
+# hash of the world's JSON and number of texts following the format tag
+_HEADER = struct.Struct('<32sI')
+# start and end of a text in the data part, the end is the start of the next one
+_OFFSETS = struct.Struct('<QQ')
+_OFFSET_SIZE = 8
+# Texts shorter than this in bytes stay in the objects, a number takes about as much memory as they do
+MIN_LENGTH = 16
+# Attributes holding texts that are moved into the table, by the type they first appear on
+TEXT_ATTRIBUTES = {
+    'Base': ('_description',),
+    'Location': ('_inv_description',),
+    'Character': ('_text',)
+}
+
+
+class StringTableError(Exception):
+    """Raised when a string table file is damaged or was made from another world."""
+    pass
+
+
+class StringTable:
+
+    def __init__(self, strings_file, json_hash: bytes):
+        """Constructor for StringTable. Maps the file, which has to belong to the world JSON with the given hash."""
+        self.strings_file = strings_file
+        self.json_hash = json_hash
+        self.__open()
+
+    def __open(self):
+        """Maps the file read-only and checks its header."""
+        with open(self.strings_file, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not self._map[:len(STRINGS_FORMAT)] == STRINGS_FORMAT:
+            self.close()
+            raise StringTableError(f'{self.strings_file} is not a string table')
+        json_hash, self.count = _HEADER.unpack_from(self._map, len(STRINGS_FORMAT))
+        if json_hash != self.json_hash:
+            self.close()
+            raise StringTableError(f'{self.strings_file} was not made from this world')
+        self._offsets_start = len(STRINGS_FORMAT) + _HEADER.size
+        self._data_start = self._offsets_start + (self.count + 1) * _OFFSET_SIZE
+
+    def get(self, text_id: int) -> str:
+        """Returns the text with the given number."""
+        start, end = _OFFSETS.unpack_from(self._map, self._offsets_start + text_id * _OFFSET_SIZE)
+        return self._map[self._data_start + start:self._data_start + end].decode()
+
+    def close(self):
+        """Unmaps the file. Texts can't be read anymore afterwards."""
+        self._map.close()
+
+    def __getstate__(self):
+        # a snapshot only stores where the table is, it's mapped again when the snapshot is loaded
+        return {'strings_file': self.strings_file, 'json_hash': self.json_hash}
+
+    def __setstate__(self, state):
+        self.strings_file = state['strings_file']
+        self.json_hash = state['json_hash']
+        self.__open()
+
+
+def get_text(obj, text):
+    """Returns the text of one of the object's text attributes, which is read from the string table of the object's
+    world if it only holds the number of the text."""
+    if type(text) is int:
+        return obj.world.strings.get(text)
+    return text
+
+
+def write_string_table(world, strings_file, json_hash: bytes) -> StringTable:
+    """Writes the long texts of all objects in the world to a string table file and replaces them in the objects by
+    their number in the table. Texts that appear several times are stored once. Returns the table, which is set as the
+    world's string table."""
+    from .base import Base
+    from .character import Character
+    from .locations import Location
+    text_ids = {}
+    data = bytearray()
+    offsets = [0]
+    objects = [obj for component_list in world.get_all_components().values() for obj in component_list]
+    objects.extend(world.get_all_barriers())
+    objects.extend(world.get_all_locations())
+    for obj in objects:
+        for object_type, attributes in ((Base, TEXT_ATTRIBUTES['Base']), (Location, TEXT_ATTRIBUTES['Location']),
+                                        (Character, TEXT_ATTRIBUTES['Character'])):
+            if not isinstance(obj, object_type):
+                continue
+            for attribute in attributes:
+                text = get_text(obj, getattr(obj, attribute))
+                if not isinstance(text, str) or len(text.encode()) < MIN_LENGTH:
+                    continue
+                text_id = text_ids.get(text)
+                if text_id is None:
+                    text_id = text_ids[text] = len(text_ids)
+                    data += text.encode()
+                    offsets.append(len(data))
+                setattr(obj, attribute, text_id)
+
+    # write to a temporary file first, so an interrupted write never leaves a broken table behind. Processes that
+    # still map the old file keep reading it until they close it.
+    with open(f'{strings_file}.tmp', 'wb') as f:
+        f.write(STRINGS_FORMAT)
+        f.write(_HEADER.pack(json_hash, len(text_ids)))
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        f.write(data)
+    os.replace(f'{strings_file}.tmp', strings_file)
+    if world.strings is not None:
+        world.strings.close()
+    world.strings = StringTable(strings_file, json_hash)
+    log.debug(f'{len(text_ids)} texts with {len(data)} bytes written to {strings_file}')
+    return world.strings
@@ -0,0 +1,210 @@
+import logging
+from .cache import RenderCache
+from .locations import Door
+from .metrics import Metrics
+
+log = logging.getLogger(__name__)
+
+
+class World:
+
+    def __init__(self):
+        """Constructor for World. A World owns all game objects of one game and the indexes used to find them. Several
+        worlds can exist side by side, every game object belongs to exactly one of them."""
+        # Contains all components by type name
+        self.components = {
+            'Item': [],
+            'Key': [],
+            'Character': [],
+            'Player': [],
+            'Container': []
+        }
+        # Contains all barriers (including doors) in a list for easy referencing
+        self.barriers = []
+        self.locations = []
+        # Maps the case-folded names and aliases of all objects to the objects carrying them, one table per object
+        # type. It is used to resolve what the player typed without looking at every object in the game.
+        self.name_index = {}
+        # Maps every door to the locations it is a wall of, together with the side it is on. It is used to determine
+        # which location is adjacent to the current one, when a character goes through a door.
+        self.door_index = {}
+        # Maps every location to the components (characters, the player, containers) in it. Each entry is a dict used
+        # as an ordered set. It is kept up to date by the components when they move.
+        self.occupants = {}
+        # Overlay of the session currently playing in the world. If it is set, all changes go into the overlay and the
+        # world itself stays as it was loaded, so many sessions can share it. Without it the world is changed directly.
+        self.overlay = None
+        # Texts rendered for the player, keyed by the versions of the objects they were built from
+        self.render_cache = RenderCache()
+        # Command latencies and counters of everything played in the world
+        self.metrics = Metrics()
+        # SaveGame recording the changes made to the world, if the game is saved
+        self.journal = None
+        # StringTable holding the long texts of the world's objects, if they were moved out of the objects
+        self.strings = None
+        # RegionManager loading the regions of a split world as they are reached, None if the world is loaded whole
+        self.regions = None
+        # Economy holding the stock and prices of the merchants, if one was started, see 'economy.start_economy'
+        self.economy = None
+        # Simulation moving the characters around, if one was started, see 'npcs.start_simulation'
+        self.simulation = None
+        self.is_closed = False
+
+    def get_all_components(self) -> dict:
+        """Returns dict with lists of all components in the world by type name."""
+        return self.components
+
+    def get_all_barriers(self) -> list:
+        """Returns list with all Barriers in the world."""
+        return self.barriers
+
+    def get_all_locations(self) -> list:
+        """Returns list with all Locations in the world."""
+        return self.locations
+
+    def get_player(self):
+        """Returns the world's player. There's only one player per world."""
+        return self.components['Player'][0]
+
+    def add_component(self, component):
+        """Adds a new component to the world's list of its type."""
+        self.components[type(component).__name__].append(component)
+
+    def add_barrier(self, barrier):
+        """Adds a new barrier or door to the world."""
+        self.barriers.append(barrier)
+
+    def add_location(self, location):
+        """Adds a new location to the world and its doors with the side they are on to the door index."""
+        self.locations.append(location)
+        for side in ('north_wall', 'south_wall', 'west_wall', 'east_wall'):
+            wall = getattr(location, side)
+            if isinstance(wall, Door):
+                self.door_index.setdefault(wall, []).append((location, side))
+
+    def get_journal(self):
+        """Returns the SaveGame that records the changes of the game currently played in the world, or None if they
+        are not recorded. With an overlay set, that's the journal of the overlay's session."""
+        if self.overlay is not None:
+            return self.overlay.journal
+        return self.journal
+
+    def update_name_index(self, obj, old_keys: set, new_keys: set):
+        """Moves the object from the index entries of its old case-folded names to the entries of the new ones. Each
+        entry is a dict used as an ordered set, so adding and removing objects is O(1)."""
+        type_index = self.name_index.setdefault(type(obj).__name__, {})
+        for key in old_keys - new_keys:
+            entry = type_index[key]
+            entry.pop(obj, None)
+            if len(entry) == 0:
+                del type_index[key]
+        for key in new_keys - old_keys:
+            type_index.setdefault(key, {})[obj] = None
+
+    def get_objects_by_name(self, name: str, type_names=None) -> list:
+        """Returns all objects whose name or alias matches the given name, ignoring case. Takes an iterable of type
+        names (e.g. 'Item', 'Door') to limit the lookup to those types, otherwise all types are searched."""
+        if type_names is None:
+            type_names = self.name_index.keys()
+        name = name.casefold()
+        found = []
+        for type_name in type_names:
+            entry = self.name_index.get(type_name, {}).get(name)
+            if entry is not None:
+                found.extend(entry)
+        return found
+
+    def get_occupants(self, location) -> dict:
+        """Returns the components in the location, as the current session's overlay sees them, as keys of a dict. The
+        dict must not be changed."""
+        if self.overlay is not None:
+            occupants = self.overlay.occupants.get(location)
+            if occupants is not None:
+                return occupants
+        return self.occupants.get(location, {})
+
+    def move_occupant(self, component, old_location, new_location):
+        """Moves the component from the occupants of its old location to those of the new one. With an overlay set,
+        the overlay gets its own copies of both entries first."""
+        if old_location is not None:
+            self.__get_occupants_for_change(old_location).pop(component, None)
+        if new_location is not None:
+            self.__get_occupants_for_change(new_location)[component] = None
+            if self.regions is not None:
+                self.regions.touch(new_location)
+
+    def __get_occupants_for_change(self, location) -> dict:
+        """Returns the occupants entry of the location that may be changed."""
+        if self.overlay is None:
+            return self.occupants.setdefault(location, {})
+        occupants = self.overlay.occupants.get(location)
+        if occupants is None:
+            occupants = self.overlay.occupants[location] = dict(self.occupants.get(location, {}))
+        return occupants
+
+    def get_door_connections(self, door) -> list:
+        """Returns a list of (location, side) tuples for all locations that have the door as a wall. In a split world
+        the regions on both sides of the door are loaded first."""
+        if self.regions is not None:
+            self.regions.load_across(door)
+        return self.door_index.get(door, [])
+
+    def remove_objects(self, objects: set):
+        """Removes game objects from the world and all of its indexes, e.g. when a region of a split world is
+        unloaded. Takes a set of objects."""
+        for type_name in {type(obj).__name__ for obj in objects}:
+            if type_name in self.components:
+                self.components[type_name][:] = [obj for obj in self.components[type_name] if obj not in objects]
+        self.barriers[:] = [barrier for barrier in self.barriers if barrier not in objects]
+        self.locations[:] = [location for location in self.locations if location not in objects]
+        for obj in objects:
+            self.update_name_index(obj, obj._get_name_keys(), set())
+            self.occupants.pop(obj, None)
+        for door in list(self.door_index):
+            if door in objects:
+                del self.door_index[door]
+            else:
+                self.door_index[door] = [connection for connection in self.door_index[door]
+                                         if connection[0] not in objects]
+        # cached texts reference the objects they were built from
+        self.render_cache.clear()
+
+    def get_misconnected_doors(self) -> dict:
+        """Returns a dict with all doors that do not connect exactly two locations and the number of locations they
+        do connect."""
+        misconnected = {}
+        for barrier in self.barriers:
+            if isinstance(barrier, Door):
+                connections = len(self.get_door_connections(barrier))
+                if connections != 2:
+                    misconnected[barrier] = connections
+        return misconnected
+
+    def close(self):
+        """Releases all game objects of the world. Every game object references the world, which references it back
+        through its lists and indexes, so they form cycles only the garbage collector could free. Clearing the lists
+        and indexes breaks those cycles, so the objects are freed right away once nothing else uses them."""
+        for component_list in self.components.values():
+            component_list.clear()
+        self.barriers.clear()
+        self.locations.clear()
+        self.name_index.clear()
+        self.door_index.clear()
+        self.occupants.clear()
+        self.render_cache.clear()
+        self.overlay = None
+        self.regions = None
+        self.economy = None
+        self.simulation = None
+        if self.strings is not None:
+            self.strings.close()
+            self.strings = None
+        self.is_closed = True
+        log.debug('World closed.')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
@@ -0,0 +1,39 @@
+import pytest
+
+from src import config
+from src import output
+from src.savegame import SaveGame
+
+
+@pytest.fixture
+def sink():
+    """Sends the game's messages to a MemorySink for the test, returns the sink."""
+    previous_sink = output.get_sink()
+    memory_sink = output.MemorySink()
+    output.set_sink(memory_sink)
+    yield memory_sink
+    output.set_sink(previous_sink)
+
+
+@pytest.fixture
+def load_world(tmp_path, sink):
+    """Returns a function loading a new copy of the game's world. The snapshot is kept in the test's directory, so the
+    one next to the JSON is left alone."""
+    snapshot_file = str(tmp_path / 'init.snapshot')
+
+    def load(player_name='Tester'):
+        return config.load_world(player_name, config.INIT_FILE, snapshot_file)
+    return load
+
+
+@pytest.fixture
+def open_save(tmp_path):
+    """Returns a function creating the SaveGame of a world in the test's directory and restoring it."""
+    save_file = str(tmp_path / 'tester.save')
+
+    def open_and_restore(world, compact_every=10000) -> SaveGame:
+        save_game = SaveGame(world, save_file, config.get_world_hash(), compact_every)
+        save_game.restore()
+        return save_game
+    return open_and_restore
+
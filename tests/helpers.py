@@ -0,0 +1,24 @@
+"""Functions and commands shared by the tests."""
+from src.commands import Command
+
+# The start of a game: out of the cell, buying from Henry and through the shed into the hall
+WALKTHROUGH = (
+    'look around', 'open wooden chest', 'take wooden key', 'take gold coin', 'unlock wooden chest',
+    'take cell key from wooden chest', 'take gold coin from wooden chest', 'go north', 'unlock cell door', 'go north',
+    'talk to henry', 'take gold coin from fountain', 'take gold coin from fountain', 'go north',
+    'go east', 'take gold coin', 'go west', 'go south', 'buy shed key', 'unlock shed door', 'go west', 'open cabinet',
+    'take metal key from cabinet', 'take all from cabinet', 'drop gold coin', 'go east', 'go north', 'unlock metal door'
+)
+
+
+def get_object(world, name: str, type_name: str):
+    """Returns the only object of the type with the given name."""
+    found = world.get_objects_by_name(name, (type_name,))
+    assert len(found) == 1
+    return found[0]
+
+
+def run(world, *lines):
+    """Runs the commands in the world."""
+    for line in lines:
+        Command(line, world).analyze()
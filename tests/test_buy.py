@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from src import config
+from src.commands import Command
+from .helpers import get_object, run
+
+
+@pytest.fixture
+def load_two_merchants(tmp_path, sink):
+    """Returns a function loading a new copy of the game's world in which Greta sells trophies next to Henry in the
+    courtyard. The first copy is loaded from JSON, the ones after it from the snapshot."""
+    with open(config.INIT_FILE, 'r') as f:
+        init_json = json.load(f)
+    init_json['Character']['merchant_greta'] = {'description': 'Another merchant.', 'name': 'Greta',
+                                                'text': 'Trophies! Get your trophies!', 'inventory': ['trophy(2)'],
+                                                'location': 'courtyard'}
+    world_file = str(tmp_path / 'merchants.json')
+    with open(world_file, 'w') as f:
+        json.dump(init_json, f)
+
+    def load():
+        world = config.load_world('Tester', world_file, str(tmp_path / 'merchants.snapshot'))
+        player = world.get_player()
+        player.location = get_object(world, 'Courtyard', 'Location')
+        player.money = 1000
+        return world
+    return load
+
+
+def test_buy_from_the_merchant_who_has_the_item(load_two_merchants, sink):
+    world = load_two_merchants()
+    henry = get_object(world, 'Henry', 'Character')
+    greta = get_object(world, 'Greta', 'Character')
+    courtyard = get_object(world, 'Courtyard', 'Location')
+    assert Command('buy apple', world).get_characters_in_location(courtyard) == [henry, greta]
+
+    run(world, 'buy trophy', 'buy 2 apple', 'buy wooden key')
+    text = sink.get_text()
+    assert 'Trophy added to inventory' in text
+    assert '2x Apple added to inventory' in text
+    assert 'Nobody here has "Wooden Key" for sale!' in text
+    assert greta.get_item_amount(get_object(world, 'Trophy', 'Item')) == 1
+    assert henry.get_item_amount(get_object(world, 'Apple', 'Item')) == 4
+
+
+def test_moved_merchant_is_found_in_the_new_location(load_two_merchants, sink):
+    load_two_merchants().close()
+    # loaded from the snapshot, with the occupants as they were compiled
+    world = load_two_merchants()
+    greta = get_object(world, 'Greta', 'Character')
+    courtyard = get_object(world, 'Courtyard', 'Location')
+    hall = get_object(world, 'Hall', 'Location')
+    greta.location = hall
+    command = Command('buy trophy', world)
+    assert command.get_characters_in_location(courtyard) == [get_object(world, 'Henry', 'Character')]
+    assert command.get_characters_in_location(hall) == [greta]
+
+    run(world, 'buy trophy')
+    assert 'Henry does not have "Trophy" for sale!' in sink.get_text()
+    world.get_player().location = hall
+    run(world, 'buy trophy')
+    assert 'Trophy added to inventory' in sink.get_text()
@@ -0,0 +1,87 @@
+import pytest
+
+from src import commands
+from src.commands import Command
+from .helpers import get_object, run
+
+
+@pytest.fixture
+def world(load_world):
+    """Returns a new copy of the game's world in which the wooden chest next to the cell door is called 'Cell Door
+    Cabinet', so 'cell door' is the exact name of the door and the start of the container's name."""
+    world = load_world()
+    get_object(world, 'Wooden Chest', 'Container').name = 'Cell Door Cabinet'
+    return world
+
+
+@pytest.fixture
+def grammar(monkeypatch):
+    """Lets the test register verbs in a copy of the grammar, the game's grammar is used again afterwards."""
+    monkeypatch.setattr(commands, '_dispatch_table', dict(commands._dispatch_table))
+    commands.parse.cache_clear()
+    yield
+    commands.parse.cache_clear()
+
+
+def test_exact_name_of_any_type_wins_over_completion(world):
+    door = get_object(world, 'Cell Door', 'Door')
+    command = Command('unlock cell door', world)
+    assert command.get_obj_from_name('cell door', ('Container', 'Door')) is door
+    assert command.suggestions == {}
+    assert 'resolution_failures' not in world.metrics.counters
+
+
+def test_unlock_finds_door_named_like_start_of_container(world, sink):
+    player = world.get_player()
+    player.add_item(get_object(world, 'Cell Key', 'Key'))
+    run(world, 'unlock cell door')
+    assert 'Cell Door has been unlocked' in sink.get_text()
+    assert get_object(world, 'Cell Door', 'Door').lock.is_unlocked
+    assert world.metrics.counters.get('fuzzy_completions', 0) == 0
+
+
+def test_completion_when_no_type_has_the_exact_name(world):
+    command = Command('unlock cell door cab', world)
+    cabinet = get_object(world, 'Cell Door Cabinet', 'Container')
+    assert command.get_obj_from_name('cell door cab', ('Container', 'Door')) is cabinet
+    assert world.metrics.counters['fuzzy_completions'] == 1
+    assert 'resolution_failures' not in world.metrics.counters
+
+
+def test_failure_is_counted_once_under_the_requested_types(world, sink):
+    run(world, 'unlock flying carpet')
+    assert '"Flying carpet" is not something that can be unlocked!' in sink.get_text()
+    assert world.metrics.counters['resolution_failures'] == 1
+    assert world.metrics.counters['resolution_failures.Container/Door'] == 1
+    assert 'resolution_failures.Container' not in world.metrics.counters
+
+
+def test_item_name_starting_with_all_is_taken(world, sink):
+    key = get_object(world, 'Wooden Key', 'Key')
+    key.name = 'All Purpose Key'
+    run(world, 'take all purpose key')
+    assert 'All Purpose Key added to inventory.' in sink.get_text()
+    assert world.get_player().is_item_in_inventory(key)
+
+
+@pytest.mark.parametrize('line, handler', [('take all', Command.take_all),
+                                           ('take all from cell door cabinet', Command.take_all),
+                                           ('take all purpose key', Command.take)])
+def test_take_all_only_for_everything(line, handler):
+    assert commands.parse(line)[1].handler is handler
+
+
+def test_registered_verbs_are_dispatched(world, sink, grammar):
+    calls = []
+
+    def wave(command, player):
+        calls.append(('wave', command.get_obj_name(1, len(command.command_list))))
+
+    def wave_at(command, player):
+        calls.append(('wave at', command.get_obj_name(2, len(command.command_list))))
+    commands.register_verb('wave', wave)
+    commands.register_verb('wave', wave_at, 'at')
+    run(world, 'wave hello', 'wave at henry', 'Wave AT Henry!')
+    assert calls == [('wave', 'hello'), ('wave at', 'henry'), ('wave at', 'henry')]
+    assert world.metrics.counters.get('unknown_commands', 0) == 0
+
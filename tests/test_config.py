@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from src import config
+
+
+def test_dangling_references_are_named(tmp_path, sink):
+    with open(config.INIT_FILE) as f:
+        init_json = json.load(f)
+    init_json['Door']['co_south_d']['key'] = 'golden_key'
+    init_json['Container']['cabinet']['location'] = 'attic'
+    world_file = tmp_path / 'dangling.json'
+    world_file.write_text(json.dumps(init_json))
+
+    with pytest.raises(config.WorldLoadError) as error:
+        config.initialize('Tester', str(world_file))
+    message = str(error.value)
+    assert message.startswith(f'2 dangling reference(s) in {world_file}')
+    assert 'Door "co_south_d" references unknown Key "golden_key"' in message
+    assert 'Container "cabinet" references unknown Location "attic"' in message
@@ -0,0 +1,62 @@
+import pytest
+
+from src.savegame import get_state_hash
+from .helpers import get_object, run
+
+np = pytest.importorskip('numpy')
+from src import economy  # noqa: E402
+
+
+def start_game(world, save_game):
+    """Starts the economy, attaches the save and puts the player next to Henry with some money."""
+    economy.start_economy(world, 2)
+    save_game.restore()
+    save_game.attach()
+    player = world.get_player()
+    if player.location.internal_name != 'courtyard':
+        player.location = get_object(world, 'Courtyard', 'Location')
+        player.money = 100
+
+
+@pytest.mark.parametrize('compact_every', [10000, 3])
+def test_economy_round_trip(load_world, open_save, compact_every):
+    world = load_world()
+    save_game = open_save(world, compact_every)
+    start_game(world, save_game)
+    run(world, 'buy 2 apple', 'look around', 'buy sword', 'buy apple', 'look around')
+    save_game.close()
+    henry = get_object(world, 'Henry', 'Character')
+    apple = get_object(world, 'Apple', 'Item')
+    assert world.economy.ticks > 0
+    assert world.economy.get_stock(henry, apple) < 6
+    expected_hash = get_state_hash(world)
+    expected_listing = world.economy.get_listing(henry)
+
+    restarted = load_world()
+    restored_save = open_save(restarted, compact_every)
+    start_game(restarted, restored_save)
+    restored_save.close()
+    assert get_state_hash(restarted) == expected_hash
+    restored_listing = restarted.economy.get_listing(get_object(restarted, 'Henry', 'Character'))
+    assert [(item.internal_name, amount) for item, amount in restored_listing[0]] == \
+        [(item.internal_name, amount) for item, amount in expected_listing[0]]
+    assert restored_listing[1] == expected_listing[1]
+
+
+def test_failed_hand_over_gives_stock_back(load_world, monkeypatch):
+    world = load_world()
+    economy.start_economy(world)
+    player = world.get_player()
+    player.location = get_object(world, 'Courtyard', 'Location')
+    player.money = 100
+    henry = get_object(world, 'Henry', 'Character')
+    apple = get_object(world, 'Apple', 'Item')
+
+    def fail(*args):
+        raise RuntimeError('inventory full')
+    monkeypatch.setattr(type(player), 'add_item', fail)
+    with pytest.raises(RuntimeError):
+        run(world, 'buy 2 apple')
+    assert world.economy.get_stock(henry, apple) == 6
+    assert world.economy.sold == {}
+    assert player.money == 100
@@ -0,0 +1,128 @@
+import pytest
+
+from src import inventory
+from .helpers import get_object
+
+
+class FailingHolder:
+
+    def __init__(self, holder, fail_after: int):
+        """Wraps an inventory whose 'add_item' fails once it was called 'fail_after' times."""
+        self.holder = holder
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def get_item_amount(self, item_obj) -> int:
+        """Returns the amount of the wrapped inventory."""
+        return self.holder.get_item_amount(item_obj)
+
+    def remove_item(self, item_obj, amount=1):
+        """Removes from the wrapped inventory."""
+        self.holder.remove_item(item_obj, amount)
+
+    def add_item(self, item_obj, amount=1):
+        """Adds to the wrapped inventory or raises a RuntimeError."""
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise RuntimeError('inventory full')
+        self.holder.add_item(item_obj, amount)
+
+
+def get_content(holder) -> list:
+    """Returns the (internal name, amount) tuples of the holder's items."""
+    return [(item_obj.internal_name, amount) for item_obj, amount in holder.inventory_list]
+
+
+@pytest.fixture
+def world(load_world):
+    """Returns a new copy of the game's world."""
+    return load_world()
+
+
+def test_transfer_moves_the_whole_amount(world):
+    henry = get_object(world, 'Henry', 'Character')
+    player = world.get_player()
+    apple = get_object(world, 'Apple', 'Item')
+    inventory.transfer(henry.inventory, player.inventory, apple, 4)
+    assert henry.get_item_amount(apple) == 2
+    assert player.get_item_amount(apple) == 4
+
+
+def test_transfer_of_too_many_moves_nothing(world):
+    henry = get_object(world, 'Henry', 'Character')
+    player = world.get_player()
+    apple = get_object(world, 'Apple', 'Item')
+    with pytest.raises(inventory.TransferError) as error:
+        inventory.transfer(henry.inventory, player.inventory, apple, 7)
+    assert error.value.available == 6
+    assert henry.get_item_amount(apple) == 6
+    assert player.get_item_amount(apple) == 0
+
+
+def test_transfer_puts_items_back_when_adding_fails(world):
+    henry = get_object(world, 'Henry', 'Character')
+    apple = get_object(world, 'Apple', 'Item')
+    target = FailingHolder(world.get_player().inventory, 0)
+    with pytest.raises(RuntimeError):
+        inventory.transfer(henry.inventory, target, apple, 3)
+    assert henry.get_item_amount(apple) == 6
+    assert world.get_player().get_item_amount(apple) == 0
+
+
+def test_transfer_all_puts_moved_stacks_back_when_one_fails(world):
+    henry = get_object(world, 'Henry', 'Character')
+    before = get_content(henry.inventory)
+    assert len(before) > 2
+    target = FailingHolder(world.get_player().inventory, 2)
+    with pytest.raises(RuntimeError):
+        inventory.transfer_all(henry.inventory, target)
+    assert get_content(henry.inventory) == before
+    assert get_content(world.get_player().inventory) == []
+
+
+def test_transfer_all_empties_the_source(world):
+    henry = get_object(world, 'Henry', 'Character')
+    before = get_content(henry.inventory)
+    moved = inventory.transfer_all(henry.inventory, world.get_player().inventory)
+    assert [(item_obj.internal_name, amount) for item_obj, amount in moved] == before
+    assert get_content(henry.inventory) == []
+    assert get_content(world.get_player().inventory) == before
+
+
+def test_stack_is_removed_at_zero(world):
+    player = world.get_player()
+    apple = get_object(world, 'Apple', 'Item')
+    player.add_item(apple, 2)
+    player.add_item(apple, 3)
+    assert get_content(player.inventory) == [('apple', 5)]
+
+    player.remove_item(apple, 4)
+    assert get_content(player.inventory) == [('apple', 1)]
+    player.remove_item(apple, 1)
+    assert get_content(player.inventory) == []
+    assert player.get_item_amount(apple) == 0
+    assert 'apple' not in player.inventory._stacks.stacks
+
+
+def test_removing_too_many_keeps_the_stack(world, sink):
+    player = world.get_player()
+    apple = get_object(world, 'Apple', 'Item')
+    player.add_item(apple, 2)
+    player.remove_item(apple, 3)
+    sink.flush()
+    assert 'Not enough apple available!' in sink.get_text()
+    assert get_content(player.inventory) == [('apple', 2)]
+
+
+def test_inventory_list_is_sorted_by_internal_name(world):
+    player = world.get_player()
+    for name in ('Trophy', 'Apple', 'Sword'):
+        player.add_item(get_object(world, name, 'Item'))
+    assert get_content(player.inventory) == [('apple', 1), ('sword', 1), ('trophy', 1)]
+
+    # the cached list is rebuilt when a stack is added or removed, but kept when only an amount changes
+    sorted_list = player.inventory.inventory_list
+    player.add_item(get_object(world, 'Apple', 'Item'))
+    assert player.inventory.inventory_list is sorted_list
+    player.remove_item(get_object(world, 'Sword', 'Item'))
+    assert get_content(player.inventory) == [('apple', 2), ('trophy', 1)]
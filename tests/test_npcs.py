@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from src import config
+from src.locations import Door
+from src.savegame import SaveGame
+from .helpers import get_object, run
+
+np = pytest.importorskip('numpy')
+from src import npcs  # noqa: E402
+
+MOVEMENTS = {
+    'merchant_henry': {'mode': 'schedule', 'schedule': [[0, 'courtyard'], [10, 'hall'], [20, 'courtyard']]},
+    'guard': {'mode': 'patrol', 'route': ['foyer', 'staircase']},
+    'cat': {'mode': 'wander', 'chance': 0.7}
+}
+
+
+@pytest.fixture
+def world_file(tmp_path) -> str:
+    """Writes the game's world with Henry on a schedule, a patrolling guard and a wandering cat, returns its file."""
+    with open(config.INIT_FILE, 'r') as f:
+        init_json = json.load(f)
+    characters = init_json['Character']
+    characters['guard'] = {'description': 'A guard.', 'name': 'Guard', 'text': 'Move along.', 'inventory': [],
+                           'location': 'foyer'}
+    characters['cat'] = {'description': 'A cat.', 'name': 'Cat', 'text': 'Meow.', 'inventory': [],
+                         'location': 'courtyard'}
+    for internal_name, movement in MOVEMENTS.items():
+        characters[internal_name]['movement'] = movement
+    world_file = str(tmp_path / 'npcs.json')
+    with open(world_file, 'w') as f:
+        json.dump(init_json, f)
+    return world_file
+
+
+@pytest.fixture
+def load_npc_world(world_file, tmp_path, sink):
+    """Returns a function loading a new copy of the world with the moving characters."""
+    def load():
+        return config.load_world('Tester', world_file, str(tmp_path / 'npcs.snapshot'))
+    return load
+
+
+def unlock_all_doors(world):
+    """Unlocks every door of the world."""
+    for barrier in world.get_all_barriers():
+        if isinstance(barrier, Door):
+            barrier.lock.is_unlocked = True
+
+
+def check_positions(world, simulation):
+    """Checks that the positions array, the characters' locations and the occupant index agree."""
+    for npc, position in zip(simulation.npcs, simulation.positions.tolist()):
+        location = simulation.locations[position]
+        assert npc.location is location
+        assert npc in world.get_occupants(location)
+        assert sum(npc in world.get_occupants(other) for other in world.get_all_locations()) == 1
+
+
+def test_characters_only_move_through_open_doors(load_npc_world):
+    world = load_npc_world()
+    unlock_all_doors(world)
+    # the shed stays closed, nobody may go in or out
+    get_object(world, 'Shed Door', 'Door').lock.is_unlocked = False
+    simulation = npcs.start_simulation(world, seed=1)
+    moves = 0
+    for _ in range(60):
+        moved, targets, doors = simulation.advance()
+        origins = simulation.positions[moved]
+        for origin, target, door_id in zip(origins.tolist(), targets.tolist(), doors.tolist()):
+            door = simulation.doors[door_id]
+            assert door.lock.is_unlocked
+            connected = {location for location, side in world.get_door_connections(door)}
+            assert connected == {simulation.locations[origin], simulation.locations[target]}
+        simulation.apply_moves(moved, targets, doors)
+        check_positions(world, simulation)
+        moves += len(moved)
+    assert moves > 0
+    assert world.get_player().location.internal_name == 'small_cell'
+
+
+def test_locked_doors_block_the_way(load_npc_world):
+    world = load_npc_world()
+    simulation = npcs.start_simulation(world, seed=1)
+    # as loaded, all doors that have a key are locked, doors without one can't be locked
+    locked = {door for door in simulation.doors if door.lock.key is not None}
+    assert len(locked) > 0 and not any(door.lock.is_unlocked for door in locked)
+    guard = get_object(world, 'Guard', 'Character')
+    guard_start = guard.location
+    for _ in range(60):
+        moved, targets, doors = simulation.advance()
+        assert not any(simulation.doors[door_id] in locked for door_id in doors.tolist())
+        simulation.apply_moves(moved, targets, doors)
+    # the guard's way to the staircase leads through a locked door, he waits in front of it
+    assert guard.location is guard_start
+    check_positions(world, simulation)
+
+
+def test_patrol_follows_its_way(load_npc_world):
+    world = load_npc_world()
+    unlock_all_doors(world)
+    simulation = npcs.start_simulation(world, seed=1)
+    guard = get_object(world, 'Guard', 'Character')
+    foyer = simulation.location_ids[get_object(world, 'Foyer', 'Location')]
+    staircase = simulation.location_ids[get_object(world, 'Staircase', 'Location')]
+    way = simulation.find_way(foyer, staircase)
+    visited = [guard.location.internal_name]
+    for _ in range(2 * len(way)):
+        simulation.tick()
+        visited.append(guard.location.internal_name)
+    expected = ['foyer'] + [simulation.locations[location].internal_name for door, location in way]
+    assert visited[:len(expected)] == expected
+    # and back along the same way
+    assert visited[len(expected) - 1:] == expected[::-1]
+
+
+def test_schedule_waits_for_its_time(load_npc_world):
+    world = load_npc_world()
+    unlock_all_doors(world)
+    simulation = npcs.start_simulation(world, seed=1)
+    henry = get_object(world, 'Henry', 'Character')
+    for _ in range(10):
+        simulation.tick()
+        assert henry.location.internal_name == 'courtyard'
+    for _ in range(10):
+        simulation.tick()
+    assert henry.location.internal_name == 'hall'
+
+
+def test_same_seed_gives_same_moves(load_npc_world):
+    positions = []
+    for _ in range(2):
+        world = load_npc_world()
+        unlock_all_doors(world)
+        simulation = npcs.start_simulation(world, seed=7)
+        for _ in range(25):
+            simulation.tick()
+        positions.append(simulation.positions.tolist())
+    assert positions[0] == positions[1]
+
+
+def test_positions_are_restored_from_save(load_npc_world, tmp_path, world_file):
+    save_file = str(tmp_path / 'npcs.save')
+    world_hash = config.get_world_hash(world_file)
+    world = load_npc_world()
+    save_game = SaveGame(world, save_file, world_hash)
+    save_game.restore()
+    save_game.attach()
+    unlock_all_doors(world)
+    simulation = npcs.start_simulation(world, seed=3)
+    for _ in range(15):
+        run(world, 'look around')
+        save_game.save()
+    save_game.close()
+    expected = [simulation.locations[position].internal_name for position in simulation.positions.tolist()]
+    assert expected != ['courtyard', 'foyer', 'courtyard']
+
+    restored = load_npc_world()
+    assert SaveGame(restored, save_file, world_hash).restore()
+    restored_simulation = npcs.start_simulation(restored, seed=3)
+    assert [npc.internal_name for npc in restored_simulation.npcs] == [npc.internal_name for npc in simulation.npcs]
+    assert [restored_simulation.locations[position].internal_name
+            for position in restored_simulation.positions.tolist()] == expected
+    check_positions(restored, restored_simulation)
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from src import config
+from src import regions
+from .helpers import WALKTHROUGH, get_object, run
+
+# after the walkthrough: back to the shed, where a coin was dropped, and into the cell
+WAY_BACK = ('go south', 'go west', 'look around', 'go east', 'go south', 'look around', 'look in wooden chest',
+            'show inventory')
+
+
+@pytest.fixture
+def world_dir(tmp_path) -> str:
+    """Splits the game's world into one region per location and returns its directory."""
+    with open(config.INIT_FILE, 'r') as f:
+        init_json = json.load(f)
+    world_dir = str(tmp_path / 'world')
+    regions.write_split_world(init_json, world_dir, 1)
+    return world_dir
+
+
+def get_region_name(world, location_name: str) -> str:
+    """Returns the name of the region the loaded location belongs to."""
+    for location, name in world.regions.location_regions.items():
+        if location.internal_name == location_name:
+            return name
+    raise KeyError(location_name)
+
+
+def test_split_world_puts_neighbours_together():
+    with open(config.INIT_FILE, 'r') as f:
+        init_json = json.load(f)
+    manifest, region_json = regions.split_world(init_json, 3)
+    assert sum(len(region['Location']) for region in region_json.values()) == len(init_json['Location'])
+    assert all(len(region['Location']) <= 3 for region in region_json.values())
+    # every door between two regions is known on both sides
+    for name, region in region_json.items():
+        for door, neighbour in region['Boundary'].items():
+            assert region_json[neighbour]['Boundary'][door] == name
+    assert manifest['Player']['player']['region'] in region_json
+
+
+def test_least_recently_used_region_is_evicted(world_dir, tmp_path, sink):
+    world = config.load_world('Tester', world_dir, max_regions=2, spill_dir=str(tmp_path / 'spill'))
+    manager = world.regions
+    assert list(manager.loaded) == ['region_0']
+    manager.load('region_1')
+    manager.load('region_2')
+    # the player's cell stays loaded, the least recently used other region goes
+    assert list(manager.loaded) == ['region_0', 'region_2']
+    manager.touch(world.get_player().location)
+    manager.load('region_3')
+    assert list(manager.loaded) == ['region_0', 'region_3']
+    assert world.metrics.counters['regions.evictions'] == 2
+    assert all(location.internal_name in ('small_cell', 'basement') for location in world.get_all_locations())
+    # unchanged regions are not written anywhere
+    assert manager.spilled == set()
+
+
+def test_changed_region_stays_loaded_without_spill_directory(world_dir, sink):
+    world = config.load_world('Tester', world_dir, max_regions=2)
+    run(world, 'take gold coin')
+    world.get_player().location = None
+    world.regions.load('region_1')
+    world.regions.load('region_2')
+    assert 'region_0' in world.regions.loaded
+    assert not world.regions.unload('region_0')
+
+
+def test_spilled_region_comes_back_as_it_was_left(world_dir, tmp_path, sink):
+    world = config.load_world('Tester', world_dir, max_regions=2, spill_dir=str(tmp_path / 'spill'))
+    run(world, 'open wooden chest', 'take wooden key', 'take gold coin', 'unlock wooden chest',
+        'take cell key from wooden chest')
+    player = world.get_player()
+    player.location = None
+    world.regions.load('region_1')
+    world.regions.load('region_2')
+    assert 'region_0' not in world.regions.loaded
+    assert 'region_0' in world.regions.spilled
+
+    region = world.regions.load('region_0')
+    player.location = region.locations['small_cell']
+    chest = get_object(world, 'Wooden Chest', 'Container')
+    assert chest.lock.is_unlocked
+    assert [item_w_amount[0].internal_name for item_w_amount in chest.inventory_list] == ['money']
+    assert region.locations['small_cell'].inventory.inventory_list == []
+    assert player.is_item_in_inventory(get_object(world, 'Cell Key', 'Key'))
+
+
+def test_door_between_regions_stays_unlocked_after_eviction(world_dir, tmp_path, sink):
+    world = config.load_world('Tester', world_dir, max_regions=2, spill_dir=str(tmp_path / 'spill'))
+    run(world, *WALKTHROUGH[:WALKTHROUGH.index('go east') + 1])
+    # the cell and the courtyard on both sides of the cell door were unloaded
+    assert 'region_0' not in world.regions.loaded
+    assert 'region_1' not in world.regions.loaded
+    assert world.regions.boundary_locks == {'co_south_d': True}
+    assert len(world.get_objects_by_name('Cell Door')) == 0
+
+    run(world, 'go west', 'go south')
+    assert get_object(world, 'Cell Door', 'Door').lock.is_unlocked
+    run(world, 'go south')
+    assert world.get_player().location.internal_name == 'small_cell'
+    assert 'co_south_d' not in world.regions.boundary_locks
+
+
+def test_walkthrough_is_the_same_on_split_and_whole_world(world_dir, tmp_path, load_world, sink):
+    split = config.load_world('Tester', world_dir, max_regions=2, spill_dir=str(tmp_path / 'spill'))
+    whole = load_world()
+    for line in WALKTHROUGH + WAY_BACK:
+        run(split, line)
+        split_text = sink.get_text()
+        sink.clear()
+        run(whole, line)
+        assert sink.get_text() == split_text, line
+        sink.clear()
+        assert split.get_player().location.internal_name == whole.get_player().location.internal_name
+        assert split.get_player().money == whole.get_player().money
+    assert split.metrics.counters['regions.spills'] > 0
+    assert len(split.regions.loaded) <= 2
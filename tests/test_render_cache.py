@@ -0,0 +1,31 @@
+from .helpers import get_object, run
+
+
+def test_inventory_shows_new_price_and_name(load_world, sink):
+    world = load_world()
+    player = world.get_player()
+    player.location = get_object(world, 'Courtyard', 'Location')
+    apple = get_object(world, 'Apple', 'Item')
+    run(world, 'talk to henry')
+    assert f'{apple.price} ' in sink.get_text()
+    sink.clear()
+    run(world, 'talk to henry')
+    assert world.render_cache.get_stats()['hits'] > 0
+
+    apple.price = 77
+    apple.name = 'Green Apple'
+    sink.clear()
+    run(world, 'talk to henry')
+    assert 'Green Apple' in sink.get_text()
+    assert '77 ' in sink.get_text()
+
+
+def test_location_description_shows_new_name(load_world, sink):
+    world = load_world()
+    location = world.get_player().location
+    run(world, 'look around')
+    item = location.inventory.inventory_list[0][0]
+    item.name = 'Shiny Thing'
+    sink.clear()
+    run(world, 'look around')
+    assert 'Shiny Thing' in sink.get_text()
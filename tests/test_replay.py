@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import config
+from src import game
+from src import replay
+from .helpers import WALKTHROUGH
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def event_file(tmp_path, sink):
+    """Plays the start of the game with 'run_batch' and returns the event log it was recorded in."""
+    event_file = str(tmp_path / 'game.events')
+    game.run_batch('Tester', WALKTHROUGH, config.INIT_FILE, str(tmp_path / 'init.snapshot'), event_file)
+    return event_file
+
+
+def run_replay(tmp_path, *args) -> subprocess.CompletedProcess:
+    """Runs 'py -m src.replay' with the arguments in the repository."""
+    return subprocess.run([sys.executable, '-m', 'src.replay', *args, '--snapshot', str(tmp_path / 'init.snapshot')],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+
+
+def test_event_log_holds_the_commands(event_file):
+    world_hash, player_name, lines, state_hash = replay.read_event_log(event_file)
+    assert world_hash == config.get_world_hash()
+    assert player_name == 'Tester'
+    assert lines == list(WALKTHROUGH)
+    assert state_hash is not None
+
+
+def test_replay_verifies_the_final_state(tmp_path, event_file):
+    result = replay.replay(event_file, snapshot_file=str(tmp_path / 'init.snapshot'))
+    assert result.events_run == len(WALKTHROUGH)
+    assert result.is_verified
+    assert 'Metal Door has been unlocked' in result.sink.get_text()
+
+    completed = run_replay(tmp_path, event_file)
+    assert completed.returncode == 0
+    assert 'Final state verified' in completed.stdout
+
+
+def test_replay_stops_at(tmp_path, event_file):
+    result = replay.replay(event_file, stop_at=3, snapshot_file=str(tmp_path / 'init.snapshot'))
+    assert result.events_run == 3
+    assert result.expected_state_hash is None
+    assert not result.is_verified
+
+    completed = run_replay(tmp_path, event_file, '--stop-at', '3')
+    assert completed.returncode == 0
+    assert 'Commands: 3 in' in completed.stdout
+    assert 'not verified' in completed.stdout
+
+
+def test_replay_of_a_different_game_fails(tmp_path, event_file):
+    with open(event_file, 'r+b') as f:
+        # the state hash is the last event
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xff]))
+    assert not replay.replay(event_file, snapshot_file=str(tmp_path / 'init.snapshot')).is_verified
+
+    completed = run_replay(tmp_path, event_file)
+    assert completed.returncode == 1
+    assert 'differs' in completed.stdout
+
+
+def test_replay_in_another_world_is_refused(tmp_path, event_file):
+    other_world = tmp_path / 'other.json'
+    with open(config.INIT_FILE, 'rb') as f:
+        other_world.write_bytes(f.read() + b'\n')
+    with pytest.raises(replay.ReplayError):
+        replay.replay(event_file, init_file=str(other_world), snapshot_file=str(tmp_path / 'other.snapshot'))
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from src import savegame
+from .helpers import WALKTHROUGH, run
+
+
+def play_in_sessions(load_world, open_save, lines, sessions: int, compact_every: int):
+    """Plays the lines in several sessions, each one restoring the save of the one before and saving after every
+    command."""
+    for i in range(sessions):
+        world = load_world()
+        save_game = open_save(world, compact_every)
+        save_game.attach()
+        for line in lines[i * len(lines) // sessions:(i + 1) * len(lines) // sessions]:
+            run(world, line)
+            save_game.save()
+        save_game.close()
+
+
+@pytest.mark.parametrize('compact_every', [10000, 7, 1])
+@pytest.mark.parametrize('count', [0, 1, 10, len(WALKTHROUGH)])
+def test_restored_game_has_the_played_state(load_world, open_save, compact_every, count):
+    lines = WALKTHROUGH[:count]
+    play_in_sessions(load_world, open_save, lines, 3, compact_every)
+    played = load_world()
+    run(played, *lines)
+
+    restored = load_world()
+    assert open_save(restored).restore()
+    assert savegame.get_state_hash(restored) == savegame.get_state_hash(played)
+
+
+def test_partly_written_record_is_ignored(load_world, open_save):
+    play_in_sessions(load_world, open_save, WALKTHROUGH, 1, 10000)
+    restored = load_world()
+    save_game = open_save(restored)
+    expected_hash = savegame.get_state_hash(restored)
+    with open(save_game.journal_file, 'ab') as f:
+        f.write(bytes([savegame.STACK, 1]))
+
+    restored = load_world()
+    save_game = open_save(restored)
+    assert savegame.get_state_hash(restored) == expected_hash
+    # attaching cuts the partly written record off, new records follow the complete ones
+    length = os.path.getsize(save_game.journal_file)
+    save_game.attach()
+    save_game.close()
+    assert os.path.getsize(save_game.journal_file) == length - 2
+
+
+def test_save_of_another_world_is_kept(load_world, tmp_path):
+    save_file = str(tmp_path / 'other.save')
+    world = load_world()
+    save_game = savegame.SaveGame(world, save_file, b'\0' * 32)
+    save_game.attach()
+    run(world, 'take gold coin')
+    save_game.close()
+    with open(save_file, 'rb') as f:
+        state = f.read()
+
+    other = savegame.SaveGame(load_world(), save_file, b'\1' * 32)
+    assert not other.restore()
+    other.attach()
+    other.close()
+    with open(f'{save_file}.other-world', 'rb') as f:
+        assert f.read() == state
+    assert os.path.exists(f'{save_file}.other-world.journal')
+    # the old world's save still restores from where it was kept
+    kept = savegame.SaveGame(load_world(), f'{save_file}.other-world', b'\0' * 32)
+    assert kept.restore()
+    assert kept.world.get_player().money == 1
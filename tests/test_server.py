@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from src import config
+from src import savegame
+from src.server import GameServer, Session
+from .helpers import get_object
+
+
+class Connection:
+
+    def __init__(self):
+        """Collects what a session sends to its player."""
+        self.data = bytearray()
+
+    def write(self, data: bytes):
+        """Keeps the data."""
+        self.data += data
+
+    def get_text(self) -> str:
+        """Returns everything sent so far and forgets it."""
+        text = self.data.decode().replace('\r\n', '\n')
+        self.data.clear()
+        return text
+
+
+@pytest.fixture
+def server(tmp_path, sink):
+    """Returns a server with the game's world."""
+    return GameServer(config.INIT_FILE, str(tmp_path / 'init.snapshot'))
+
+
+def start_session(server, player_name) -> tuple:
+    """Returns a session of the server and the connection it writes to."""
+    connection = Connection()
+    return Session(server.world, player_name, connection), connection
+
+
+def test_sessions_keep_their_changes_apart(server):
+    world = server.world
+    shared_hash = savegame.get_state_hash(world)
+    alice, alice_connection = start_session(server, 'Alice')
+    bob, bob_connection = start_session(server, 'Bob')
+    for line in ('open wooden chest', 'take wooden key', 'unlock wooden chest', 'take cell key from wooden chest'):
+        alice.run_command(line)
+        bob.run_command('look around')
+    assert 'Cell Key added to inventory.' in alice_connection.get_text()
+    # Bob still finds everything where it was
+    assert "'Wooden Key'" in bob_connection.get_text()
+    alice.run_command('unlock cell door')
+    alice.run_command('go north')
+    bob.run_command('go north')
+    assert 'You go through Cell Door' in alice_connection.get_text()
+    assert 'locked' in bob_connection.get_text()
+
+    cell_key = get_object(world, 'Cell Key', 'Key')
+    world.overlay = alice.overlay
+    assert world.get_player().is_item_in_inventory(cell_key)
+    assert world.get_player().location.internal_name == 'courtyard'
+    world.overlay = bob.overlay
+    assert not world.get_player().is_item_in_inventory(cell_key)
+    assert world.get_player().location.internal_name == 'small_cell'
+    world.overlay = None
+    # the shared world itself never changes
+    assert savegame.get_state_hash(world) == shared_hash
+    assert not get_object(world, 'Cell Door', 'Door').lock.is_unlocked
+
+
+def test_connections_over_tcp_are_separate_sessions(server):
+    async def play(port: int, name: str, lines) -> str:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'{name}\n'.encode())
+        for line in lines:
+            writer.write(f'{line}\n'.encode())
+        await writer.drain()
+        writer.write_eof()
+        text = (await reader.read()).decode()
+        writer.close()
+        return text
+
+    async def main() -> tuple:
+        tcp_server = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        async with tcp_server:
+            return await asyncio.gather(play(port, 'Alice', ['take gold coin', 'show inventory']),
+                                        play(port, 'Bob', ['show inventory', 'look around']))
+
+    alice_text, bob_text = asyncio.run(main())
+    assert 'Current money: 1 Gold Coins' in alice_text
+    # the coin Alice took is still lying in Bob's cell
+    assert 'Current money: 0 Gold Coins' in bob_text
+    assert "'Gold Coin'" in bob_text
+    assert server.session_count == 0
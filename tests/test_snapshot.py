@@ -0,0 +1,54 @@
+import pytest
+
+from src import config
+
+
+@pytest.mark.parametrize('keep', [0.5, 0.9])
+def test_damaged_snapshot_is_rebuilt(tmp_path, sink, keep):
+    snapshot_file = str(tmp_path / 'init.snapshot')
+    first = config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    with open(snapshot_file, 'rb') as f:
+        data = f.read()
+    with open(snapshot_file, 'wb') as f:
+        f.write(data[:int(len(data) * keep)])
+
+    world = config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    assert world.get_player().location.internal_name == first.get_player().location.internal_name
+    # the rebuilt snapshot can be used again
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is not None
+
+
+def test_snapshot_of_changed_classes_is_rebuilt(tmp_path, sink):
+    snapshot_file = str(tmp_path / 'init.snapshot')
+    config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    with open(snapshot_file, 'rb') as f:
+        data = f.read()
+    # a class that no longer exists under its old name
+    with open(snapshot_file, 'wb') as f:
+        f.write(data.replace(b'ItemStacks', b'ItemHeapsX'))
+
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is None
+    world = config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    assert world.get_player() is not None
+
+
+def test_snapshot_of_other_code_is_rebuilt(tmp_path, sink, monkeypatch):
+    snapshot_file = str(tmp_path / 'init.snapshot')
+    config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is not None
+
+    monkeypatch.setattr(config, 'CODE_HASH', bytes(32))
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is None
+    config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is not None
+
+
+def test_any_error_while_loading_loads_json(tmp_path, sink, monkeypatch):
+    snapshot_file = str(tmp_path / 'init.snapshot')
+    config.load_world('Tester', config.INIT_FILE, snapshot_file)
+
+    def fail(f):
+        raise ValueError('broken')
+    monkeypatch.setattr(config.pickle, 'load', fail)
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is None
+    assert config.load_world('Tester', config.INIT_FILE, snapshot_file).get_player() is not None
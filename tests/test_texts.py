@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from src import config
+from src import texts
+
+
+def get_descriptions(world) -> dict:
+    """Returns the description of every component of the world by its internal name."""
+    return {obj.internal_name: obj.description
+            for component_list in world.get_all_components().values() for obj in component_list}
+
+
+def test_texts_round_trip(tmp_path, sink):
+    world = config.initialize('Tester')
+    short, long = world.get_all_components()['Item'][:2]
+    short.description = 'A coin.'
+    long.description = 'A rather long description that goes into the table.'
+    descriptions = get_descriptions(world)
+
+    texts.write_string_table(world, str(tmp_path / 'init.strings'), config.get_world_hash())
+    assert short._description == 'A coin.'
+    assert type(long._description) is int
+    assert get_descriptions(world) == descriptions
+    world.close()
+
+
+def test_table_of_another_world_is_refused(tmp_path, sink):
+    strings_file = str(tmp_path / 'init.strings')
+    with config.initialize('Tester') as world:
+        texts.write_string_table(world, strings_file, config.get_world_hash())
+
+    with pytest.raises(texts.StringTableError):
+        texts.StringTable(strings_file, b'\0' * 32)
+
+
+@pytest.mark.parametrize('stale', [False, True])
+def test_missing_or_stale_table_loads_json(tmp_path, sink, stale):
+    snapshot_file = str(tmp_path / 'init.snapshot')
+    strings_file = config.get_strings_file(snapshot_file)
+    config.compile_world(config.INIT_FILE, snapshot_file)
+    os.remove(strings_file)
+    if stale:
+        with config.initialize('Tester') as world:
+            texts.write_string_table(world, strings_file, b'\0' * 32)
+
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is None
+    world = config.load_world('Tester', config.INIT_FILE, snapshot_file)
+    with config.initialize('Tester') as json_world:
+        assert get_descriptions(world) == get_descriptions(json_world)
+    # the table is written again with the snapshot
+    assert config.read_snapshot(snapshot_file, config.get_world_hash()) is not None
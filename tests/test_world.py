@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src import config
+from src.commands import Command
+from .helpers import get_object
+
+
+@pytest.fixture
+def world(load_world):
+    """Returns a new copy of the game's world."""
+    return load_world()
+
+
+def test_shared_name_resolves_to_the_object_in_the_location(world, sink):
+    chest = get_object(world, 'Wooden Chest', 'Container')
+    cabinet = get_object(world, 'Cabinet', 'Container')
+    cabinet.name = 'Wooden Chest'
+    assert world.get_objects_by_name('wooden chest', ('Container',)) == [chest, cabinet]
+
+    command = Command('open wooden chest', world)
+    assert command.get_obj_from_name('wooden chest', 'Container', chest.location) is chest
+    assert command.get_obj_from_name('wooden chest', 'Container', cabinet.location) is cabinet
+    # nowhere near either of them, the first one is taken
+    assert command.get_obj_from_name('wooden chest', 'Container') is chest
+
+
+def test_rename_moves_the_index_entry(world):
+    apple = get_object(world, 'Apple', 'Item')
+    apple.name = 'Pear'
+    assert world.get_objects_by_name('apple') == []
+    assert world.get_objects_by_name('PEAR', ('Item',)) == [apple]
+    # entries without objects are removed
+    assert 'apple' not in world.name_index['Item']
+
+
+def test_aliases_are_indexed(world):
+    apple = get_object(world, 'Apple', 'Item')
+    apple.aliases = ['Fruit', 'Red Thing']
+    assert world.get_objects_by_name('fruit', ('Item',)) == [apple]
+    assert world.get_objects_by_name('red thing') == [apple]
+
+    apple.aliases = ['Fruit']
+    assert world.get_objects_by_name('red thing') == []
+    apple.aliases = None
+    assert world.get_objects_by_name('fruit') == []
+    assert world.get_objects_by_name('apple', ('Item',)) == [apple]
+
+
+def test_door_connects_both_locations(world):
+    door = get_object(world, 'Cell Door', 'Door')
+    cell = get_object(world, 'Small Cell', 'Location')
+    courtyard = get_object(world, 'Courtyard', 'Location')
+    assert sorted(world.get_door_connections(door), key=lambda connection: connection[1]) == \
+        [(cell, 'north_wall'), (courtyard, 'south_wall')]
+    assert cell.get_adjacent_location(door) is courtyard
+    assert courtyard.get_adjacent_location(door) is cell
+
+
+def test_misconnected_door_is_reported(tmp_path, sink, caplog):
+    with open(config.INIT_FILE) as f:
+        init_json = json.load(f)
+    # the cell has a plain wall where the cell door was, and the basement gets the large wooden door as a third side
+    init_json['Location']['small_cell']['north_wall'] = 'ch_south'
+    init_json['Location']['basement']['west_wall'] = 'co_north_d'
+    world_file = tmp_path / 'misconnected.json'
+    world_file.write_text(json.dumps(init_json))
+
+    world = config.initialize('Tester', str(world_file))
+    misconnected = {door.internal_name: connections for door, connections in world.get_misconnected_doors().items()}
+    assert misconnected == {'co_south_d': 1, 'co_north_d': 3}
+    assert 'co_south_d connects 1 locations instead of 2!' in caplog.text
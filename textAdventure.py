@@ -1,14 +1,35 @@
+import src.config
 import src.game
+import src.profiling
+import argparse
 import logging
 
 log = logging.getLogger(__name__)
 
 
 def main():
-    src.game.start_text_adventure()
+    parser = argparse.ArgumentParser(description='Play the text adventure.')
+    parser.add_argument('--save', '--save-dir', dest='save_dir', nargs='?', const=src.config.SAVE_DIR, metavar='DIR',
+                        help=f'save the game after every command in DIR (default "{src.config.SAVE_DIR}") and continue '
+                             f'a saved game of the same player')
+    parser.add_argument('--record', help='event log to record the commands in, see "py -m src.replay"')
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='profile every command, write PREFIX.collapsed (flamegraph stacks) and PREFIX.txt at exit')
+    parser.add_argument('--economy', type=int, metavar='COMMANDS',
+                        help='run the merchants\' economy (needs NumPy), it ticks every that many commands')
+    parser.add_argument('--npcs', type=int, metavar='COMMANDS',
+                        help='let characters with a movement move (needs NumPy), a step every that many commands')
+    args = parser.parse_args()
+    profiler = src.profiling.Profiler() if args.profile is not None else None
+    try:
+        src.game.start_text_adventure(args.save_dir, args.record, profiler, args.economy, args.npcs)
+    finally:
+        if profiler is not None:
+            profiler.write_reports(args.profile)
+            print(f'Profile written to {args.profile}.collapsed and {args.profile}.txt')
 
 
 if __name__ == '__main__':
-    # used for playing as messages to the Player
-    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # messages to the Player are written to the output sink, logging only shows problems of the game itself
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
     main()
@@ -0,0 +1,80 @@
+import src.game
+import src.config
+import src.output
+import src.profiling
+import argparse
+import logging
+import os
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    """Runs a file of commands (one per line) for a player without any input or pauses and reports how long they
+    took. Used for regression runs and throughput tests."""
+    parser = argparse.ArgumentParser(description='Run text adventure commands from a file or stdin.')
+    parser.add_argument('player_name', help='name of the player')
+    parser.add_argument('commands', nargs='?', default='-', help='file with one command per line, "-" for stdin')
+    parser.add_argument('--world', default=src.config.INIT_FILE,
+                        help='JSON file of the world or directory of a world split into regions')
+    parser.add_argument('--snapshot', default=src.config.SNAPSHOT_FILE, help='compiled snapshot of the world')
+    parser.add_argument('--quiet', action='store_true', help='do not show the game\'s messages')
+    parser.add_argument('--per-command', action='store_true', help='report the time of every single command')
+    parser.add_argument('--record', help='event log to record the commands in, see "py -m src.replay"')
+    parser.add_argument('--metrics-interval', type=float, help='write the metrics to stderr every that many seconds')
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='profile every command, write PREFIX.collapsed (flamegraph stacks) and PREFIX.txt')
+    parser.add_argument('--max-regions', type=int, default=src.config.MAX_REGIONS,
+                        help='regions of a split world kept in memory at most')
+    parser.add_argument('--spill-dir', help='directory changed regions of a split world are written to when they are '
+                                            'unloaded, otherwise they stay in memory')
+    parser.add_argument('--economy', type=int, metavar='COMMANDS',
+                        help='run the merchants\' economy (needs NumPy), it ticks every that many commands')
+    parser.add_argument('--npcs', type=int, metavar='COMMANDS',
+                        help='let characters with a movement move (needs NumPy), a step every that many commands')
+    args = parser.parse_args()
+
+    if args.commands == '-':
+        command_file = sys.stdin
+    else:
+        command_file = open(args.commands, 'r')
+
+    # only problems of the engine itself are logged, messages to the player go to the output sink
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    if args.quiet:
+        src.output.set_sink(src.output.StdoutSink(open(os.devnull, 'w')))
+
+    profiler = src.profiling.Profiler() if args.profile is not None else None
+    start = time.perf_counter()
+    with command_file:
+        timings = src.game.run_batch(args.player_name, command_file, args.world, args.snapshot, args.record,
+                                     args.metrics_interval, profiler, args.max_regions, args.spill_dir,
+                                     args.economy, args.npcs)
+    total = time.perf_counter() - start
+    if profiler is not None:
+        profiler.write_reports(args.profile)
+        print(f'Profile written to {args.profile}.collapsed and {args.profile}.txt', file=sys.stderr)
+
+    report_timings(timings, total, args.per_command)
+
+
+def report_timings(timings, total, per_command=False):
+    """Prints a summary of the command timings to stderr, and the time of every single command if wanted."""
+    command_time = sum(seconds for line, seconds in timings)
+    if per_command:
+        for line, seconds in timings:
+            print(f'{seconds * 1000:10.3f} ms  {line}', file=sys.stderr)
+    print(f'Commands:           {len(timings)}', file=sys.stderr)
+    print(f'Total wall time:    {total:.3f} s (including world loading)', file=sys.stderr)
+    print(f'Command wall time:  {command_time:.3f} s', file=sys.stderr)
+    if len(timings) > 0:
+        print(f'Mean per command:   {command_time / len(timings) * 1000:.3f} ms', file=sys.stderr)
+        print(f'Max per command:    {max(seconds for line, seconds in timings) * 1000:.3f} ms', file=sys.stderr)
+    if command_time > 0:
+        print(f'Commands/second:    {len(timings) / command_time:.0f}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()